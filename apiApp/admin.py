@@ -2,13 +2,16 @@ from django.contrib import admin
 from .models import (
     Cart, CartItem, Category, CustomUser, Order, OrderItem, Product, 
     ProductRating, Review, Wishlist, CustomerAddress, Notification,
-    ContactMessage, HelpCenterArticle, ProductImage, ProductVariant
+    ContactMessage, HelpCenterArticle, ProductImage, ProductVariant, OutboundEmail, Task, SalesRollup
 )
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
 from django.utils.safestring import mark_safe
 from django.urls import reverse
 from django.utils.http import urlencode
+from django.utils import timezone
+
+from .order_lookup import find_orders, orders_for_email
 
 
 class CustomUserAdmin(UserAdmin):
@@ -379,11 +382,25 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ('product', 'quantity')
 
 class OrderAdmin(admin.ModelAdmin):
-    list_display = ("paystack_checkout_id", "customer_email", "amount", "status", "created_at")
+    list_display = ("order_number", "paystack_checkout_id", "customer_email", "amount", "status", "created_at")
     list_filter = ("status", "created_at")
-    search_fields = ("paystack_checkout_id", "customer_email")
+    search_fields = ("order_number", "paystack_checkout_id", "customer_email")
     inlines = [OrderItemInline]
-    readonly_fields = ('created_at',)
+    readonly_fields = ('order_number', 'created_at')
+
+    def get_search_results(self, request, queryset, search_term):
+        # Indexed lookups first; the default icontains scans every order, so it
+        # only runs when they find nothing (partial emails, numbers, references)
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        if '@' in term:
+            found = orders_for_email(term, queryset)
+        else:
+            found = queryset.filter(id__in=[order.id for order in find_orders(term, queryset, prefix=True)])
+        if found.exists():
+            return found, False
+        return super().get_search_results(request, queryset, search_term)
 
 class CustomerAddressAdmin(admin.ModelAdmin):
     list_display = ('id', 'customer', 'address_line1', 'city', 'state', 'country', 'is_default')
@@ -410,6 +427,54 @@ class HelpCenterArticleAdmin(admin.ModelAdmin):
     prepopulated_fields = {"slug": ("title",)}
     readonly_fields = ('created_at', 'updated_at')
 
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("subject", "recipients", "status", "attempts", "next_attempt_at", "created_at", "sent_at")
+    list_filter = ("status", "created_at")
+    search_fields = ("subject", "to")
+    readonly_fields = ('created_at', 'sent_at', 'claimed_at', 'last_error')
+    actions = ['retry_now']
+
+    def recipients(self, obj):
+        return ", ".join(obj.to)
+
+    @admin.action(description="Retry selected emails now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=OutboundEmail.STATUS_SENT).update(
+            status=OutboundEmail.STATUS_PENDING, attempts=0, next_attempt_at=timezone.now(),
+            claim_token=None, claimed_at=None,
+        )
+        self.message_user(request, f"{updated} email(s) queued for another attempt")
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("name", "queue", "status", "attempts", "max_attempts", "run_at", "locked_by", "finished_at")
+    list_filter = ("status", "queue", "name")
+    search_fields = ("name", "last_error")
+    readonly_fields = ('created_at', 'finished_at', 'locked_by', 'locked_until', 'last_error')
+    actions = ['retry_now']
+
+    @admin.action(description="Retry selected tasks now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Task.STATUS_RUNNING).update(
+            status=Task.STATUS_QUEUED, attempts=0, run_at=timezone.now(), lock_token=None, locked_until=None,
+        )
+        self.message_user(request, f"{updated} task(s) queued again")
+
+class SalesRollupAdmin(admin.ModelAdmin):
+    list_display = ("date", "dimension", "key", "currency", "orders", "units", "revenue")
+    list_filter = ("dimension", "currency")
+    date_hierarchy = "date"
+    ordering = ("-date", "dimension", "-revenue")
+
+    # Maintained by apiApp/sales.py; read-only here
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
 # Register all models with their admin classes
 admin.site.register(CustomUser, CustomUserAdmin)
 admin.site.register(Product, ProductAdmin)
@@ -426,4 +491,7 @@ admin.site.register(Notification, NotificationAdmin)
 admin.site.register(ContactMessage, ContactMessageAdmin)
 admin.site.register(HelpCenterArticle, HelpCenterArticleAdmin)
 admin.site.register(ProductImage)
-admin.site.register(ProductVariant, ProductVariantAdmin)
\ No newline at end of file
+admin.site.register(ProductVariant, ProductVariantAdmin)
+admin.site.register(OutboundEmail, OutboundEmailAdmin)
+admin.site.register(Task, TaskAdmin)
+admin.site.register(SalesRollup, SalesRollupAdmin)
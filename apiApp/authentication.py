@@ -0,0 +1,169 @@
+# apiApp/authentication.py
+import copy
+import hashlib
+import logging
+import threading
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _digest(key):
+    # Raw tokens never end up in cache keys
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def _fresh(pair):
+    """A copy of a cached (user, token) pair, so concurrent requests never share (and mutate) one User."""
+    user, token = copy.copy(pair[0]), copy.copy(pair[1])
+    token.user = user
+    return user, token
+
+
+def _marker_key(digest):
+    return f'auth:token:{digest}'
+
+
+def _entry_key(digest):
+    return f'auth:token-user:{digest}'
+
+
+class _LRU:
+    """Small thread-safe LRU of already-unpickled (user, token) pairs for this process."""
+
+    def __init__(self):
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, digest):
+        with self._lock:
+            entry = self._data.get(digest)
+            if entry is not None:
+                self._data.move_to_end(digest)
+            return entry
+
+    def set(self, digest, entry):
+        with self._lock:
+            self._data[digest] = entry
+            self._data.move_to_end(digest)
+            while len(self._data) > _setting('TOKEN_AUTH_LRU_SIZE', 1024):
+                self._data.popitem(last=False)
+
+    def discard(self, digest):
+        with self._lock:
+            self._data.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_tokens = _LRU()
+
+
+_process_local_warned = False
+
+
+def _backing_cache():
+    """
+    The TOKEN_AUTH_CACHE cache, or None when it is process-local. Logout in
+    one worker could not reach the markers in another, which would keep
+    accepting the revoked token until the TTL ran out.
+    """
+    global _process_local_warned
+    cache = caches[_setting('TOKEN_AUTH_CACHE', 'default')]
+    if isinstance(cache, (LocMemCache, DummyCache)):
+        if not _process_local_warned:
+            _process_local_warned = True
+            logger.warning(
+                f"Token cache disabled: TOKEN_AUTH_CACHE uses {type(cache).__name__}, "
+                f"which is not shared between processes"
+            )
+        return None
+    return cache
+
+
+def invalidate_token(key):
+    """Forget a token everywhere; every process re-checks the database on its next request."""
+    digest = _digest(key)
+    local_tokens.discard(digest)
+    cache = _backing_cache()
+    if cache is not None:
+        cache.delete_many([_marker_key(digest), _entry_key(digest)])
+
+
+def invalidate_user_tokens(user_id):
+    for key in Token.objects.filter(user_id=user_id).values_list('key', flat=True):
+        invalidate_token(key)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    TokenAuthentication without the Token JOIN user query on every request.
+
+    Resolved (user, token) pairs live in two tiers:
+      * the backing cache (TOKEN_AUTH_CACHE, which must be shared between
+        processes: Redis/Memcached/file/db based) holds a small marker
+        `auth:token:<sha256>` -> generation, plus the pickled pair;
+      * an in-process LRU holds the unpickled pair with the generation it
+        was built from; each request gets its own copy of it.
+
+    Every request reads the marker. A missing marker means the token was
+    revoked, its user changed, or the TTL ran out, so the database is asked
+    again and a new generation is written. An LRU entry is only used while
+    its generation matches the marker, which is what makes logout and
+    deactivation take effect immediately in every process. With a
+    process-local TOKEN_AUTH_CACHE nothing is cached at all.
+    """
+
+    def authenticate_credentials(self, key):
+        if not _setting('TOKEN_AUTH_CACHE_ENABLED', True):
+            return super().authenticate_credentials(key)
+
+        digest = _digest(key)
+        cache = _backing_cache()
+        if cache is None:
+            return super().authenticate_credentials(key)
+        try:
+            generation = cache.get(_marker_key(digest))
+        except Exception as e:
+            logger.warning(f"Token cache unavailable, falling back to the database: {str(e)}")
+            return super().authenticate_credentials(key)
+
+        if generation is not None:
+            local = local_tokens.get(digest)
+            if local is not None and local[0] == generation:
+                return _fresh(local[1])
+            shared = cache.get(_entry_key(digest))
+            if shared is not None and shared[0] == generation:
+                local_tokens.set(digest, shared)
+                return _fresh(shared[1])
+
+        try:
+            token = Token.objects.select_related('user').get(key=key)
+        except Token.DoesNotExist:
+            raise exceptions.AuthenticationFailed(_('Invalid token.'))
+        if not token.user.is_active:
+            raise exceptions.AuthenticationFailed(_('User inactive or deleted.'))
+
+        entry = (uuid.uuid4().hex, (token.user, token))
+        ttl = _setting('TOKEN_AUTH_CACHE_TTL', 300)
+        cache.set(_entry_key(digest), entry, ttl)
+        cache.set(_marker_key(digest), entry[0], ttl)
+        local_tokens.set(digest, entry)
+        return _fresh(entry[1])
+
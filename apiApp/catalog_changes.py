@@ -0,0 +1,174 @@
+# apiApp/catalog_changes.py
+"""
+Delta sync for catalog clients.
+
+Signals (signals.py) append a CatalogChange row for every save or delete
+of a Product, ProductVariant, ProductImage or Category, inside the same
+transaction as the change. A client keeps the id of the last change it
+applied as its cursor and asks for everything after it. Changes newer than
+CATALOG_CHANGES_SETTLE_SECONDS are held back so that an id committed after
+a higher one (concurrent transactions on Postgres) is not skipped.
+
+Queryset.update(), bulk_create and raw SQL bypass signals; code doing bulk
+catalog edits should call record_changes() itself.
+
+`manage.py compact_catalog_changes` keeps only the newest change per
+object and drops changes older than the retention window. Cursors from
+before the window get a 410 and must resync from /api/products/.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Exists, Max, OuterRef, Prefetch
+from django.utils import timezone
+
+from .models import CatalogChange, CatalogChangeHorizon, Category, Product, ProductImage, ProductVariant
+
+
+class CursorExpired(Exception):
+    pass
+
+
+def record_change(kind, object_id, action=CatalogChange.ACTION_UPSERT, product_id=None):
+    CatalogChange.objects.create(kind=kind, object_id=object_id, action=action, product_id=product_id)
+
+
+def record_changes(kind, object_ids, action=CatalogChange.ACTION_UPSERT):
+    CatalogChange.objects.bulk_create(
+        [CatalogChange(kind=kind, object_id=object_id, action=action) for object_id in object_ids],
+        batch_size=1000,
+    )
+
+
+def horizon():
+    return CatalogChangeHorizon.objects.values_list('cursor', flat=True).first() or 0
+
+
+def _settled():
+    return CatalogChange.objects.filter(
+        created_at__lte=timezone.now() - timedelta(seconds=settings.CATALOG_CHANGES_SETTLE_SECONDS)
+    )
+
+
+def current_cursor():
+    """Cursor to start from after a full download."""
+    return _settled().aggregate(latest=Max('id'))['latest'] or horizon()
+
+
+def _serialize(kind, ids, request):
+    """
+    Current representation of the given objects, keyed by id. Missing ones
+    are left out, as are unpublished products and their variants and images:
+    the endpoint is public, so drafts must not leak through it.
+    """
+    from .serializers import (
+        CategoryListSerializer, ProductImageSerializer, ProductListSerializer, ProductVariantSerializer,
+    )
+
+    context = {'request': request}
+    if kind == CatalogChange.KIND_PRODUCT:
+        products = Product.objects.filter(id__in=ids, status='published').prefetch_related(
+            'variants', 'images', 'category', 'variants__images',
+        )
+        return {product.id: ProductListSerializer(product, context=context).data for product in products}
+    if kind == CatalogChange.KIND_VARIANT:
+        variants = ProductVariant.objects.filter(id__in=ids, product__status='published').prefetch_related('images')
+        return {
+            variant.id: {**ProductVariantSerializer(variant, context=context).data, 'product': variant.product_id}
+            for variant in variants
+        }
+    if kind == CatalogChange.KIND_IMAGE:
+        return {
+            image.id: {
+                'id': image.id,
+                'product': image.product_id,
+                'variant': image.variant_id,
+                'is_primary': image.is_primary,
+                'alt_text': image.alt_text,
+                **ProductImageSerializer(image, context=context).data,
+            }
+            for image in ProductImage.objects.filter(id__in=ids, product__status='published')
+        }
+    categories = Category.objects.filter(id__in=ids).prefetch_related(
+        Prefetch('children', queryset=Category.objects.order_by('display_order', 'name')),
+    )
+    return {
+        category.id: {**CategoryListSerializer(category, context=context).data, 'parent': category.parent_id}
+        for category in categories
+    }
+
+
+def changes_since(cursor, request, limit=None):
+    """
+    Up to `limit` log entries after `cursor`, collapsed to the newest entry
+    per object, with the object's current data for upserts. An upsert whose
+    object is gone, or is (or belongs to) a product that is not published,
+    is sent as a delete.
+    """
+    if cursor < horizon():
+        raise CursorExpired(cursor)
+    limit = min(limit or settings.CATALOG_CHANGES_PAGE_SIZE, settings.CATALOG_CHANGES_PAGE_SIZE)
+
+    rows = list(_settled().filter(id__gt=cursor).order_by('id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+
+    latest = {}
+    for row in rows:
+        latest[(row.kind, row.object_id)] = row
+
+    wanted = {}
+    for (kind, object_id), row in latest.items():
+        if row.action == CatalogChange.ACTION_UPSERT:
+            wanted.setdefault(kind, []).append(object_id)
+    data = {kind: _serialize(kind, ids, request) for kind, ids in wanted.items()}
+
+    changes = []
+    for (kind, object_id), row in sorted(latest.items(), key=lambda item: item[1].id):
+        payload = data.get(kind, {}).get(object_id) if row.action == CatalogChange.ACTION_UPSERT else None
+        change = {
+            'cursor': row.id,
+            'type': kind,
+            'id': object_id,
+            'action': CatalogChange.ACTION_UPSERT if payload is not None else CatalogChange.ACTION_DELETE,
+            'data': payload,
+        }
+        if row.product_id is not None:
+            change['product'] = row.product_id
+        changes.append(change)
+
+    return {
+        'cursor': rows[-1].id if rows else cursor,
+        'has_more': has_more,
+        'changes': changes,
+    }
+
+
+def compact(retention_days=None, dry_run=False):
+    """
+    Drop entries superseded by a newer entry for the same object, then
+    entries older than the retention window, moving the horizon past them.
+    Returns (superseded, expired) counts.
+    """
+    retention_days = settings.CATALOG_CHANGES_RETENTION_DAYS if retention_days is None else retention_days
+    superseded = CatalogChange.objects.filter(Exists(CatalogChange.objects.filter(
+        kind=OuterRef('kind'), object_id=OuterRef('object_id'), id__gt=OuterRef('id'),
+    )))
+    superseded_count = superseded.count()
+
+    cutoff = timezone.now() - timedelta(days=retention_days)
+    expired = CatalogChange.objects.filter(created_at__lt=cutoff)
+    expired_count = expired.count()
+    expired_upto = expired.aggregate(last=Max('id'))['last']
+
+    if not dry_run:
+        superseded.delete()
+        if expired_upto is not None:
+            state, _ = CatalogChangeHorizon.objects.get_or_create(pk=1)
+            if expired_upto > state.cursor:
+                # Move the horizon first: a reader must never see the entries
+                # gone while its cursor still looks valid
+                state.cursor = expired_upto
+                state.save(update_fields=['cursor', 'updated_at'])
+            CatalogChange.objects.filter(id__lte=expired_upto).delete()
+    return superseded_count, expired_count
@@ -0,0 +1,148 @@
+# apiApp/db_router.py
+"""
+Primary/replica routing.
+
+Writes always go to `default`. Inside a request, reads of the models listed
+in DATABASE_REPLICA_MODELS (catalog, blog, help center) go to one of the
+DATABASE_REPLICAS aliases, chosen once per request so a response is built
+from a single snapshot. Everything else, and all reads outside a request
+(management commands, the task worker), stays on the primary.
+
+A request that writes is pinned to the primary for the rest of the request.
+After a POST/PUT/PATCH/DELETE that wrote, ReplicaPinningMiddleware keeps
+the client pinned for DATABASE_PRIMARY_PIN_SECONDS so users see their own
+cart, order and review changes before the replicas catch up. Writes made
+while serving a GET (session saves, view counters) are bookkeeping the
+client did not ask to see, so they do not pin it.
+"""
+import contextvars
+import hashlib
+import logging
+import random
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+logger = logging.getLogger(__name__)
+
+PIN_COOKIE = 'db_primary_until'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_state = contextvars.ContextVar('db_routing_state', default=None)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RoutingState:
+    __slots__ = ('pinned', 'wrote', 'replica')
+
+    def __init__(self, pinned=False):
+        self.pinned = pinned
+        self.wrote = False
+        self.replica = None
+
+
+def replica_aliases():
+    return [alias for alias in _setting('DATABASE_REPLICAS', []) if alias in settings.DATABASES]
+
+
+def _replica_model(model):
+    labels = _setting('DATABASE_REPLICA_MODELS', [])
+    return model._meta.app_label in labels or model._meta.label_lower in labels
+
+
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db:
+            # Follow relations on the database the instance came from
+            return instance._state.db
+        state = _state.get()
+        if state is None or state.pinned or not _replica_model(model):
+            return 'default'
+        if state.replica is None:
+            replicas = replica_aliases()
+            state.replica = random.choice(replicas) if replicas else 'default'
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+            state.pinned = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        databases = {'default', *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema from the primary (replication or sync_replica)
+        return db == 'default'
+
+
+class ReplicaPinningMiddleware:
+    """
+    Sets up per-request routing state. Clients are recognised by a cookie
+    (browsers) and by their Authorization header (token API clients, which
+    often do not keep cookies); either one keeps them on the primary for a
+    while after a write.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not replica_aliases():
+            return self.get_response(request)
+
+        state = RoutingState(pinned=self._is_pinned(request))
+        token = _state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _state.reset(token)
+
+        if state.wrote and request.method not in SAFE_METHODS:
+            self._pin(request, response)
+        return response
+
+    def _client_key(self, request):
+        authorization = request.META.get('HTTP_AUTHORIZATION')
+        if not authorization:
+            return None
+        return 'db:pin:' + hashlib.sha256(authorization.encode()).hexdigest()
+
+    def _is_pinned(self, request):
+        try:
+            if float(request.COOKIES.get(PIN_COOKIE, 0)) > time.time():
+                return True
+        except ValueError:
+            pass
+        key = self._client_key(request)
+        if key is None:
+            return False
+        try:
+            return bool(cache.get(key))
+        except Exception as e:
+            logger.warning(f"Could not read primary pin, using primary: {str(e)}")
+            return True
+
+    def _pin(self, request, response):
+        seconds = _setting('DATABASE_PRIMARY_PIN_SECONDS', 5)
+        response.set_cookie(
+            PIN_COOKIE, f'{time.time() + seconds:.3f}', max_age=seconds,
+            httponly=True, samesite='Lax', secure=request.is_secure(),
+        )
+        key = self._client_key(request)
+        if key is not None:
+            try:
+                cache.set(key, 1, timeout=seconds)
+            except Exception as e:
+                logger.warning(f"Could not store primary pin: {str(e)}")
@@ -0,0 +1,37 @@
+# apiApp/db_tuning.py
+"""
+Per-connection database settings, applied from the connection_created
+signal. On SQLite this switches to WAL (readers no longer block the writer),
+relaxes fsyncs to synchronous=NORMAL (safe with WAL), waits busy_timeout ms
+for the write lock instead of failing with "database is locked", and sizes
+the page cache and mmap window. See SQLITE_PRAGMAS in settings.
+"""
+import logging
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+def pragma_statements(pragmas):
+    statements = []
+    for name, value in pragmas.items():
+        if value is None or value == '':
+            continue
+        if not name.isidentifier():
+            raise ValueError(f"Invalid SQLite pragma name: {name!r}")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def configure_connection(connection):
+    if connection.vendor != 'sqlite':
+        # Postgres needs nothing per connection; CONN_MAX_AGE and
+        # CONN_HEALTH_CHECKS are set in DATABASES
+        return
+    try:
+        with connection.cursor() as cursor:
+            for statement in pragma_statements(getattr(settings, 'SQLITE_PRAGMAS', {})):
+                cursor.execute(statement)
+    except Exception as e:
+        logger.warning(f"Could not apply SQLite pragmas on {connection.alias}: {str(e)}")
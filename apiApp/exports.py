@@ -0,0 +1,131 @@
+# apiApp/exports.py
+"""
+Whole-catalog export as NDJSON or CSV, generated incrementally.
+
+Products are read in keyset pages (`pk > last_pk ORDER BY pk LIMIT n`)
+and each page is walked with `.iterator(chunk_size=n)`, which runs the
+prefetches per chunk. At most one page of products and their related rows
+is in memory at a time. No cursor or transaction stays open between pages,
+so a slow client cannot hold a database snapshot for the whole download.
+"""
+import csv
+import json
+
+from django.conf import settings
+from django.db.models import Prefetch
+
+from .models import Category, Product, ProductImage, ProductVariant
+
+CSV_FIELDS = [
+    'id', 'name', 'slug', 'status', 'price', 'old_price', 'discount', 'gender', 'categories',
+    'sub_category', 'colors', 'sizes', 'quantity', 'rating', 'review_count', 'is_featured',
+    'is_exclusive', 'image', 'variants', 'description', 'created_at', 'updated_at',
+]
+
+
+def export_queryset(status=None):
+    products = Product.objects.prefetch_related(
+        Prefetch('category', queryset=Category.objects.only('id', 'slug', 'name')),
+        Prefetch('variants', queryset=ProductVariant.objects.only(
+            'id', 'product_id', 'color', 'size', 'quantity', 'price_override',
+        ).order_by('id')),
+        Prefetch('images', queryset=ProductImage.objects.only(
+            'id', 'product_id', 'image', 'is_primary',
+        ).order_by('-is_primary', 'id')),
+    )
+    if status:
+        products = products.filter(status=status)
+    return products
+
+
+def iter_products(queryset, chunk_size=None):
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    queryset = queryset.order_by('pk')
+    last_pk = None
+    while True:
+        page = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        seen = 0
+        for product in page[:chunk_size].iterator(chunk_size=chunk_size):
+            seen += 1
+            last_pk = product.pk
+            yield product
+        if seen < chunk_size:
+            return
+
+
+def product_record(product, build_url=None):
+    variants = list(product.variants.all())
+    images = list(product.images.all())
+    image = images[0].image.url if images else (product.thumbnail or '')
+    return {
+        'id': product.id,
+        'name': product.name,
+        'slug': product.slug,
+        'status': product.status,
+        'price': str(product.price),
+        'old_price': str(product.old_price) if product.old_price is not None else None,
+        'discount': product.discount,
+        'gender': product.gender,
+        'categories': [category.slug for category in product.category.all()],
+        'sub_category': product.sub_category,
+        'colors': product.colors,
+        'sizes': product.sizes,
+        'quantity': sum(variant.quantity for variant in variants),
+        'rating': product.rating,
+        'review_count': product.review_count,
+        'is_featured': product.is_featured,
+        'is_exclusive': product.is_exclusive,
+        'image': build_url(image) if build_url and image.startswith('/') else image,
+        'variants': [
+            {
+                'id': variant.id,
+                'color': variant.color,
+                'size': variant.size,
+                'quantity': variant.quantity,
+                'price': str(variant.price_override) if variant.price_override is not None else None,
+            }
+            for variant in variants
+        ],
+        'description': product.description,
+        'created_at': product.created_at.isoformat(),
+        'updated_at': product.updated_at.isoformat(),
+    }
+
+
+def ndjson_lines(records):
+    for record in records:
+        yield json.dumps(record, ensure_ascii=False) + '\n'
+
+
+class _Echo:
+    """File-like object whose write() returns the line, for csv.writer."""
+
+    def write(self, value):
+        return value
+
+
+def csv_lines(records):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_FIELDS)
+    for record in records:
+        row = []
+        for field in CSV_FIELDS:
+            value = record[field]
+            if field == 'variants':
+                value = json.dumps(value, ensure_ascii=False)
+            elif isinstance(value, list):
+                value = '|'.join(str(item) for item in value)
+            row.append(value)
+        yield writer.writerow(row)
+
+
+FORMATS = {
+    'ndjson': ('application/x-ndjson', ndjson_lines),
+    'csv': ('text/csv; charset=utf-8', csv_lines),
+}
+
+
+def export_lines(output='ndjson', status=None, chunk_size=None, build_url=None):
+    _, writer = FORMATS[output]
+    records = (product_record(product, build_url) for product in iter_products(export_queryset(status), chunk_size))
+    return writer(records)
@@ -0,0 +1,250 @@
+# apiApp/feeds.py
+"""
+Shopping channel feeds (Google Merchant XML, Meta catalog CSV) of the
+published catalog, built incrementally.
+
+Every feed keeps a small SQLite side file (<feed>.rows.sqlite3) holding one
+rendered row per product. A build re-renders only products whose
+`updated_at` moved since the previous build (saving a variant or image,
+saving or deleting a category and changing a product's categories touch
+the products concerned, see signals.py), drops products that are no longer
+published, then streams the stored rows in id order into a gzip file
+written next to the target and renamed over it. Readers therefore always
+see a complete feed, and a failed build leaves both the feed and the side
+file as they were.
+"""
+import csv
+import gzip
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+from xml.sax.saxutils import escape
+
+from django.conf import settings
+from django.utils import timezone
+
+from .exports import export_queryset, iter_products, product_record
+from .models import Product
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rendered rows change shape, to force a full rebuild
+FEED_FORMAT_VERSION = 2
+
+
+class GoogleMerchantFeed:
+    filename = 'google.xml.gz'
+    content_type = 'application/gzip'
+
+    def header(self):
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>\n'
+            '<rss version="2.0" xmlns:g="http://base.google.com/ns/1.0">\n<channel>\n'
+            f'<title>{escape(settings.PRODUCT_FEED_TITLE)}</title>\n'
+            f'<link>{escape(settings.FRONTEND_URL)}</link>\n'
+            f'<description>{escape(settings.PRODUCT_FEED_TITLE)} product feed</description>\n'
+        )
+
+    def footer(self):
+        return '</channel>\n</rss>\n'
+
+    def render(self, item):
+        fields = [
+            ('g:id', item['id']),
+            ('title', item['title']),
+            ('description', item['description']),
+            ('link', item['link']),
+            ('g:image_link', item['image_link']),
+            ('g:availability', item['availability'].replace(' ', '_')),
+            ('g:condition', 'new'),
+            ('g:price', item['price']),
+            ('g:sale_price', item['sale_price']),
+            ('g:brand', item['brand']),
+            ('g:product_type', item['product_type']),
+            ('g:gender', item['gender']),
+        ]
+        return '<item>' + ''.join(
+            f'<{tag}>{escape(str(value))}</{tag}>' for tag, value in fields if value not in (None, '')
+        ) + '</item>\n'
+
+
+class MetaCatalogFeed:
+    filename = 'meta.csv.gz'
+    content_type = 'application/gzip'
+    columns = [
+        'id', 'title', 'description', 'availability', 'condition', 'price', 'sale_price',
+        'link', 'image_link', 'brand', 'product_type', 'gender', 'quantity_to_sell_on_facebook',
+    ]
+
+    def _line(self, values):
+        buffer = io.StringIO()
+        csv.writer(buffer).writerow(values)
+        return buffer.getvalue()
+
+    def header(self):
+        return self._line(self.columns)
+
+    def footer(self):
+        return ''
+
+    def render(self, item):
+        item = {**item, 'condition': 'new', 'quantity_to_sell_on_facebook': item['quantity']}
+        return self._line([item[column] if item[column] is not None else '' for column in self.columns])
+
+
+FEEDS = {
+    'google': GoogleMerchantFeed(),
+    'meta': MetaCatalogFeed(),
+}
+
+
+def feed_item(product, build_url=None):
+    """Channel-neutral fields of one product from exports.export_queryset()."""
+    record = product_record(product, build_url)
+    currency = settings.PRODUCT_FEED_CURRENCY
+    on_sale = record['old_price'] is not None and float(record['old_price']) > float(record['price'])
+    return {
+        'id': record['id'],
+        'title': record['name'][:150],
+        'description': (record['description'] or record['name'])[:5000],
+        'link': settings.PRODUCT_FEED_LINK.format(slug=record['slug'], id=record['id']),
+        'image_link': record['image'],
+        'availability': 'in stock' if record['quantity'] > 0 else 'out of stock',
+        'quantity': record['quantity'],
+        'price': f"{record['old_price'] if on_sale else record['price']} {currency}",
+        'sale_price': f"{record['price']} {currency}" if on_sale else None,
+        'brand': settings.PRODUCT_FEED_BRAND,
+        # Shoppers see product_type, so category names rather than the slugs exports use
+        'product_type': ' > '.join(category.name for category in product.category.all()),
+        'gender': {'men': 'male', 'women': 'female'}.get(record['gender'], 'unisex'),
+    }
+
+
+def feed_path(name):
+    return os.path.join(settings.PRODUCT_FEEDS_DIR, FEEDS[name].filename)
+
+
+def _signature():
+    """Settings that change every row; when they differ the feed is rebuilt from scratch."""
+    parts = [
+        FEED_FORMAT_VERSION, settings.PRODUCT_FEED_LINK, settings.PRODUCT_FEED_CURRENCY,
+        settings.PRODUCT_FEED_BRAND, settings.SITE_URL,
+    ]
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _open_store(name):
+    store = sqlite3.connect(
+        os.path.join(settings.PRODUCT_FEEDS_DIR, f'{name}.rows.sqlite3'), timeout=60, isolation_level=None,
+    )
+    store.execute('CREATE TABLE IF NOT EXISTS rows (id INTEGER PRIMARY KEY, row TEXT NOT NULL)')
+    store.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+    return store
+
+
+def _write_feed(feed, store, target):
+    """Stream the stored rows into <target>.tmp, gzipped, then rename it over the target."""
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(target), prefix=f'.{os.path.basename(target)}.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as raw:
+            with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=6, mtime=0) as gz:
+                gz.write(feed.header().encode())
+                for (row,) in store.execute('SELECT row FROM rows ORDER BY id'):
+                    gz.write(row.encode())
+                gz.write(feed.footer().encode())
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, target)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+
+def build_feed(name, full=False, chunk_size=None):
+    """
+    Bring one feed up to date. Returns counts of rendered and removed rows,
+    the feed size and whether it was a full build.
+    """
+    feed = FEEDS[name]
+    chunk_size = chunk_size or settings.EXPORT_CHUNK_SIZE
+    os.makedirs(settings.PRODUCT_FEEDS_DIR, exist_ok=True)
+    target = feed_path(name)
+    started = time.perf_counter()
+    build_started = timezone.now()
+    build_url = lambda path: f"{settings.SITE_URL.rstrip('/')}{path}"
+
+    store = _open_store(name)
+    try:
+        # One builder per feed at a time; a second one waits here
+        store.execute('BEGIN IMMEDIATE')
+        meta = dict(store.execute('SELECT key, value FROM meta'))
+        signature = _signature()
+        full = full or meta.get('signature') != signature or 'built_at' not in meta or not os.path.exists(target)
+
+        published = Product.objects.filter(status='published')
+        rendered = removed = 0
+        if full:
+            store.execute('DELETE FROM rows')
+            for product in iter_products(export_queryset('published'), chunk_size):
+                store.execute(
+                    'INSERT INTO rows (id, row) VALUES (?, ?)',
+                    (product.id, feed.render(feed_item(product, build_url))),
+                )
+                rendered += 1
+        else:
+            # Products saved since the last build started, with some slack for clock skew
+            since = datetime.fromisoformat(meta['built_at']) - timedelta(seconds=settings.PRODUCT_FEED_CHANGE_SLACK)
+            published_ids = set(published.values_list('id', flat=True))
+            stored_ids = {row[0] for row in store.execute('SELECT id FROM rows')}
+
+            gone = stored_ids - published_ids
+            store.executemany('DELETE FROM rows WHERE id = ?', [(pk,) for pk in gone])
+            removed = len(gone)
+
+            changed = set(published.filter(updated_at__gte=since).values_list('id', flat=True))
+            changed |= published_ids - stored_ids
+            changed = sorted(changed)
+            for offset in range(0, len(changed), chunk_size):
+                chunk = changed[offset:offset + chunk_size]
+                rows = [
+                    (product.id, feed.render(feed_item(product, build_url)))
+                    for product in export_queryset('published').filter(id__in=chunk)
+                ]
+                store.executemany('INSERT OR REPLACE INTO rows (id, row) VALUES (?, ?)', rows)
+                rendered += len(rows)
+
+        if full or rendered or removed:
+            _write_feed(feed, store, target)
+
+        total = store.execute('SELECT COUNT(*) FROM rows').fetchone()[0]
+        store.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)', [
+            ('built_at', build_started.isoformat()),
+            ('signature', signature),
+            ('products', str(total)),
+        ])
+        store.execute('COMMIT')
+    except BaseException:
+        if store.in_transaction:
+            store.execute('ROLLBACK')
+        raise
+    finally:
+        store.close()
+
+    stats = {
+        'feed': name,
+        'full': full,
+        'rendered': rendered,
+        'removed': removed,
+        'products': total,
+        'bytes': os.path.getsize(target),
+        'seconds': round(time.perf_counter() - started, 2),
+    }
+    logger.info(f"Built {name} feed: {stats}")
+    return stats
@@ -3,7 +3,7 @@ from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from allauth.account.forms import SignupForm
 from django.conf import settings
-from django.core.mail import send_mail
+from .mail import queue_mail
 from django.urls import reverse
 from django.utils import timezone
 from datetime import timedelta
@@ -67,7 +67,7 @@ class CustomSignupForm(SignupForm):
             verification_url=verification_url
         )
         
-        send_mail(
+        queue_mail(
             subject=subject,
             message=message.strip(),
             from_email=settings.DEFAULT_FROM_EMAIL,
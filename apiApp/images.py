@@ -0,0 +1,204 @@
+# apiApp/images.py
+import base64
+import logging
+import posixpath
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps, features
+
+logger = logging.getLogger(__name__)
+
+# Pillow save() arguments per output format
+FORMAT_OPTIONS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 4},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+    'avif': {'format': 'AVIF', 'quality': 60},
+}
+EXTENSIONS = {'webp': 'webp', 'jpeg': 'jpg', 'avif': 'avif'}
+
+
+def derivative_widths():
+    return sorted(getattr(settings, 'IMAGE_DERIVATIVE_WIDTHS', (200, 400, 800, 1600)))
+
+
+def derivative_formats():
+    formats = getattr(settings, 'IMAGE_DERIVATIVE_FORMATS', ('webp', 'jpeg'))
+    # AVIF needs a Pillow build with libavif, skip it quietly otherwise
+    return [f for f in formats if f != 'avif' or features.check('avif')]
+
+
+def derivative_name(source_name, width, fmt):
+    """product_images/kaftan.jpg -> derivatives/product_images/kaftan/400.webp"""
+    stem, _ = posixpath.splitext(source_name)
+    return posixpath.join('derivatives', stem, f'{width}.{EXTENSIONS[fmt]}')
+
+
+def _encode(image, fmt):
+    if fmt == 'jpeg' and image.mode != 'RGB':
+        # JPEG has no alpha channel, flatten transparent PNGs onto white
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        if image.mode in ('RGBA', 'LA', 'P'):
+            image = image.convert('RGBA')
+            background.paste(image, mask=image.split()[-1])
+        else:
+            background.paste(image.convert('RGB'))
+        image = background
+    buffer = BytesIO()
+    image.save(buffer, **FORMAT_OPTIONS[fmt])
+    return buffer.getvalue()
+
+
+def open_image(source_name, storage=None):
+    """Load an upload fully into memory with EXIF rotation applied."""
+    storage = storage or default_storage
+    with storage.open(source_name, 'rb') as fh:
+        image = Image.open(fh)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    return image
+
+
+def image_metadata(image):
+    """
+    Width, height, dominant colour and a ~200 byte blurred placeholder for
+    an opened Pillow image, so clients can reserve layout space and paint
+    something before the real file arrives.
+    """
+    rgb = image.convert('RGB')
+
+    # Most common colour of a 5-colour palette taken from a small copy
+    sample = rgb.copy()
+    sample.thumbnail((64, 64))
+    palette_image = sample.quantize(colors=5, method=Image.Quantize.MEDIANCUT)
+    _, index = max(palette_image.getcolors())
+    palette = palette_image.getpalette()
+    r, g, b = palette[index * 3:index * 3 + 3]
+
+    placeholder = rgb.copy()
+    placeholder.thumbnail((16, 16))
+    buffer = BytesIO()
+    placeholder.save(buffer, format='WEBP', quality=30)
+
+    return {
+        'width': image.width,
+        'height': image.height,
+        'dominant_color': f'#{r:02x}{g:02x}{b:02x}',
+        'placeholder': 'data:image/webp;base64,' + base64.b64encode(buffer.getvalue()).decode('ascii'),
+    }
+
+
+def build_derivatives(source_name, storage=None, overwrite=False, original=None):
+    """
+    Write resized copies of `source_name` for every configured width and
+    format, and return the map stored on ProductImage.derivatives:
+
+        {"source": "product_images/a.jpg", "width": 2400, "height": 3600,
+         "webp": {"200": "derivatives/product_images/a/200.webp", ...}, ...}
+
+    Widths larger than the original are skipped (an image narrower than
+    every bucket gets one copy at its own width). Files that already exist
+    on disk are reused unless `overwrite` is set. Pass `original` to reuse
+    an image that is already open.
+    """
+    storage = storage or default_storage
+    if original is None:
+        original = open_image(source_name, storage)
+
+    width, height = original.size
+    widths = [w for w in derivative_widths() if w <= width] or [width]
+
+    result = {'source': source_name, 'width': width, 'height': height}
+    for fmt in derivative_formats():
+        outputs = {}
+        for target in widths:
+            name = derivative_name(source_name, target, fmt)
+            if overwrite or not storage.exists(name):
+                resized = original.copy()
+                resized.thumbnail((target, round(height * target / width)), Image.LANCZOS)
+                if storage.exists(name):
+                    storage.delete(name)
+                storage.save(name, ContentFile(_encode(resized, fmt)))
+            outputs[str(target)] = name
+        result[fmt] = outputs
+    return result
+
+
+def refresh_image_assets(product_image, image_changed=False, derivatives=True):
+    """
+    Fill in metadata and derivatives for a saved ProductImage, decoding the
+    upload at most once. Metadata is computed when missing or when the
+    upload changed, derivatives when their recorded source is stale.
+    Never raises, a broken upload only gets logged.
+    """
+    if not product_image.image:
+        return
+    name = product_image.image.name
+    needs_metadata = image_changed or product_image.width is None
+    needs_derivatives = derivatives and (product_image.derivatives or {}).get('source') != name
+    if not (needs_metadata or needs_derivatives):
+        return
+
+    updates = {}
+    try:
+        original = open_image(name)
+        if needs_metadata:
+            updates.update(image_metadata(original))
+        if needs_derivatives:
+            updates['derivatives'] = build_derivatives(name, original=original)
+    except Exception as e:
+        logger.error(f"Could not process image {name}: {str(e)}")
+    if updates:
+        type(product_image).objects.filter(pk=product_image.pk).update(**updates)
+        for field, value in updates.items():
+            setattr(product_image, field, value)
+
+
+def image_srcset(product_image, request=None):
+    """
+    srcset-style structure for a ProductImage, built from the stored
+    derivative map without touching the filesystem:
+
+        {"url": ".../a.jpg", "alt": "...", "width": 818, "height": 936,
+         "dominantColor": "#2b3a55", "placeholder": "data:image/webp;base64,...",
+         "srcset": {"webp": ".../200.webp 200w, .../400.webp 400w", ...}}
+    """
+    if not product_image.image:
+        return None
+
+    def absolute(name):
+        url = default_storage.url(name)
+        return request.build_absolute_uri(url) if request else url
+
+    derivatives = product_image.derivatives or {}
+    srcset = {}
+    if derivatives.get('source') == product_image.image.name:
+        for fmt in derivative_formats():
+            outputs = derivatives.get(fmt) or {}
+            srcset[fmt] = ', '.join(
+                f"{absolute(name)} {width}w"
+                for width, name in sorted(outputs.items(), key=lambda item: int(item[0]))
+            )
+    return {
+        'url': absolute(product_image.image.name),
+        'alt': product_image.alt_text,
+        'width': product_image.width,
+        'height': product_image.height,
+        'dominantColor': product_image.dominant_color,
+        'placeholder': product_image.placeholder,
+        'srcset': srcset,
+    }
+
+
+def thumbnail_url(product_image, request=None):
+    """URL of the smallest JPEG derivative, falling back to the original upload."""
+    if not product_image.image:
+        return None
+    derivatives = product_image.derivatives or {}
+    name = product_image.image.name
+    if derivatives.get('source') == name and derivatives.get('jpeg'):
+        name = min(derivatives['jpeg'].items(), key=lambda item: int(item[0]))[1]
+    url = default_storage.url(name)
+    return request.build_absolute_uri(url) if request else url
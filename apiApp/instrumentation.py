@@ -0,0 +1,281 @@
+# apiApp/instrumentation.py
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.cache.backends.base import BaseCache
+from django.db import connections
+
+from . import metrics as metrics_export
+
+logger = logging.getLogger('apiApp.perf')
+
+_current = contextvars.ContextVar('request_metrics', default=None)
+_MISSING = object()
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class RequestMetrics:
+    __slots__ = ('started', 'view_started', 'endpoint', 'db_queries', 'db_time',
+                 'serializer_time', 'serializer_depth', 'cache_hits', 'cache_misses', 'cache_depth')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.endpoint = None
+        self.db_queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.serializer_depth = 0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self.cache_depth = 0
+
+
+def current_metrics():
+    """Metrics of the request being handled in this thread/task, or None outside a request."""
+    return _current.get()
+
+
+# --- Hooks --------------------------------------------------------------------
+
+def _db_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.db_time += time.perf_counter() - started
+        metrics.db_queries += 1
+
+
+def _timed_property(prop):
+    """Wrap a serializer `.data` property so only the outermost access is timed."""
+    getter = prop.fget
+
+    def data(self):
+        metrics = _current.get()
+        if metrics is None or metrics.serializer_depth:
+            return getter(self)
+        metrics.serializer_depth += 1
+        started = time.perf_counter()
+        try:
+            return getter(self)
+        finally:
+            metrics.serializer_time += time.perf_counter() - started
+            metrics.serializer_depth -= 1
+
+    data._perf_instrumented = True
+    return property(data)
+
+
+def _counted_get(get):
+    def wrapper(self, key, default=None, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics.cache_depth:
+            # Outside a request, or called by the backend's own get_many()
+            return get(self, key, default, version=version)
+        metrics.cache_depth += 1
+        try:
+            value = get(self, key, _MISSING, version=version)
+        finally:
+            metrics.cache_depth -= 1
+        if value is _MISSING:
+            metrics.cache_misses += 1
+            return default
+        metrics.cache_hits += 1
+        return value
+
+    wrapper._perf_instrumented = True
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    def wrapper(self, keys, version=None):
+        metrics = _current.get()
+        if metrics is None or metrics.cache_depth:
+            # Outside a request, or called by the backend's own get() (DatabaseCache)
+            return get_many(self, keys, version=version)
+        keys = list(keys)
+        metrics.cache_depth += 1
+        try:
+            found = get_many(self, keys, version=version)
+        finally:
+            metrics.cache_depth -= 1
+        metrics.cache_hits += len(found)
+        metrics.cache_misses += len(keys) - len(found)
+        return found
+
+    wrapper._perf_instrumented = True
+    return wrapper
+
+
+_install_lock = threading.Lock()
+
+
+def install():
+    """Patch DRF serializers and the configured cache backends once per process."""
+    from rest_framework import serializers
+
+    with _install_lock:
+        for cls in (serializers.BaseSerializer, serializers.Serializer, serializers.ListSerializer):
+            prop = cls.__dict__.get('data')
+            if prop is not None and not getattr(prop.fget, '_perf_instrumented', False):
+                cls.data = _timed_property(prop)
+
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            if not getattr(backend.get, '_perf_instrumented', False):
+                backend.get = _counted_get(backend.get)
+            # BaseCache.get_many just loops over get(), which is already counted. Where
+            # one of the two calls the other, only the outer call counts (cache_depth)
+            if backend.get_many is not BaseCache.get_many and not getattr(backend.get_many, '_perf_instrumented', False):
+                backend.get_many = _counted_get_many(backend.get_many)
+
+
+# --- Rolling latency histograms --------------------------------------------
+
+class LatencyHistograms:
+    """
+    Last PERF_HISTOGRAM_SAMPLES latencies per endpoint, dropped after
+    PERF_HISTOGRAM_WINDOW seconds. Per process, so with several gunicorn
+    workers each one only knows its own requests; the fleet-wide
+    percentiles come from http_request_duration_seconds on /metrics, which
+    aggregates every worker. Cheap enough to keep on for every request.
+    """
+
+    def __init__(self):
+        self._samples = defaultdict(lambda: deque(maxlen=_setting('PERF_HISTOGRAM_SAMPLES', 2000)))
+        self._lock = threading.Lock()
+
+    def record(self, endpoint, duration_ms):
+        with self._lock:
+            self._samples[endpoint].append((time.time(), duration_ms))
+
+    def snapshot(self):
+        cutoff = time.time() - _setting('PERF_HISTOGRAM_WINDOW', 900)
+        with self._lock:
+            samples = {endpoint: [d for ts, d in values if ts >= cutoff] for endpoint, values in self._samples.items()}
+        stats = {}
+        for endpoint, durations in samples.items():
+            if not durations:
+                continue
+            durations.sort()
+            stats[endpoint] = {
+                'count': len(durations),
+                'p50': round(_percentile(durations, 50), 2),
+                'p95': round(_percentile(durations, 95), 2),
+                'p99': round(_percentile(durations, 99), 2),
+                'max': round(durations[-1], 2),
+            }
+        return stats
+
+    def reset(self):
+        with self._lock:
+            self._samples.clear()
+
+
+def _percentile(sorted_values, pct):
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+latency_histograms = LatencyHistograms()
+
+
+def endpoint_name(request):
+    match = getattr(request, 'resolver_match', None)
+    if match is None:
+        return f'{request.method} <unresolved>'
+    return f'{request.method} {match.view_name or match.route}'
+
+
+# --- Middleware ----------------------------------------------------------------
+
+class PerformanceMiddleware:
+    """
+    Records, for every request, DB query count and time, DRF serializer
+    time, view time, total time and cache hits/misses. Adds them as a
+    `Server-Timing` header (visible in browser dev tools), writes one JSON
+    log line to the `apiApp.perf` logger and feeds the per-endpoint
+    latency histograms served by `performance_stats`.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        install()
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = _current.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for conn in connections.all():
+                    stack.enter_context(conn.execute_wrapper(_db_wrapper))
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+
+        total_ms = (time.perf_counter() - metrics.started) * 1000
+        # From URL resolution to the response leaving the view (and inner middleware)
+        view_ms = (time.perf_counter() - metrics.view_started) * 1000 if metrics.view_started else 0.0
+        endpoint = endpoint_name(request)
+        latency_histograms.record(endpoint, total_ms)
+        match = getattr(request, 'resolver_match', None)
+        metrics_export.observe_request(
+            request.method,
+            (match.view_name or match.route) if match else '<unresolved>',
+            response.status_code,
+            total_ms / 1000,
+            metrics.db_queries,
+            metrics.db_time,
+            metrics.cache_hits,
+            metrics.cache_misses,
+        )
+
+        if self._show_header(request):
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={metrics.db_time * 1000:.1f};desc="{metrics.db_queries} queries"',
+                f'ser;dur={metrics.serializer_time * 1000:.1f};desc="serializers"',
+                f'view;dur={view_ms:.1f}',
+                f'cache;desc="{metrics.cache_hits} hits, {metrics.cache_misses} misses"',
+                f'total;dur={total_ms:.1f}',
+            ])
+
+        logger.info(json.dumps({
+            'endpoint': endpoint,
+            'path': request.path,
+            'status': response.status_code,
+            'total_ms': round(total_ms, 2),
+            'view_ms': round(view_ms, 2),
+            'db_queries': metrics.db_queries,
+            'db_ms': round(metrics.db_time * 1000, 2),
+            'serializer_ms': round(metrics.serializer_time * 1000, 2),
+            'cache_hits': metrics.cache_hits,
+            'cache_misses': metrics.cache_misses,
+        }))
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = _current.get()
+        if metrics is not None:
+            metrics.view_started = time.perf_counter()
+            metrics.endpoint = endpoint_name(request)
+        return None
+
+    def _show_header(self, request):
+        if not _setting('PERF_SERVER_TIMING_STAFF_ONLY', False):
+            return True
+        user = getattr(request, 'user', None)
+        return bool(user is not None and user.is_authenticated and user.is_staff)
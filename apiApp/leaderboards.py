@@ -0,0 +1,138 @@
+# apiApp/leaderboards.py
+"""
+Best-seller and top-rated rails, served from ProductLeaderboard.
+
+Units sold in the last 30 days and all time are summed from the product
+rows of the daily sales rollups (apiApp/sales.py), never from OrderItem.
+The rating score is a Bayesian average:
+
+    score = (C * m + n * average) / (C + n)
+
+for n reviews averaging `average`, with m the shop-wide mean rating and
+C = LEADERBOARD_RATING_PRIOR. Two 5-star reviews therefore rank below two
+hundred averaging 4.8.
+
+- sales.record_orders() calls update_sales() for the products of the
+  orders it counts or uncounts, in its transaction.
+- Saving or deleting a review calls update_rating() after commit (signals.py).
+- refresh() recomputes every row. The 30-day window slides and the mean
+  drifts, so it runs daily: queued by the first rail request of the day,
+  or from cron with `manage.py refresh_leaderboards`.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Avg, Count, Q, Sum
+from django.utils import timezone
+
+from .models import Product, ProductLeaderboard, Review, SalesRollup
+
+SALES_WINDOW_DAYS = 30
+MEAN_CACHE_KEY = 'leaderboards:rating-mean'
+
+
+def _sales(product_ids=None):
+    """{product_id: (units in the window, units all time)}"""
+    window_start = timezone.localdate() - timedelta(days=SALES_WINDOW_DAYS - 1)
+    rows = SalesRollup.objects.filter(dimension=SalesRollup.DIMENSION_PRODUCT)
+    if product_ids is not None:
+        rows = rows.filter(key__in=product_ids)
+    totals = rows.values('key').annotate(
+        recent=Sum('units', filter=Q(date__gte=window_start)), total=Sum('units'),
+    ).order_by()
+    return {row['key']: (row['recent'] or 0, row['total'] or 0) for row in totals}
+
+
+def rating_mean(refresh=False):
+    mean = None if refresh else cache.get(MEAN_CACHE_KEY)
+    if mean is None:
+        mean = Review.objects.aggregate(mean=Avg('rating'))['mean'] or 0.0
+        cache.set(MEAN_CACHE_KEY, mean, 2 * 24 * 3600)
+    return mean
+
+
+def bayesian_score(average, count, mean):
+    if not count:
+        return 0.0
+    prior = settings.LEADERBOARD_RATING_PRIOR
+    return (prior * mean + count * average) / (prior + count)
+
+
+def _ratings(product_ids=None, mean=None):
+    """{product_id: score} for products with reviews"""
+    reviews = Review.objects.all()
+    if product_ids is not None:
+        reviews = reviews.filter(product_id__in=product_ids)
+    mean = rating_mean() if mean is None else mean
+    return {
+        row['product_id']: bayesian_score(row['average'], row['count'], mean)
+        for row in reviews.values('product_id').annotate(average=Avg('rating'), count=Count('id')).order_by()
+    }
+
+
+def _upsert(rows, fields):
+    ProductLeaderboard.objects.bulk_create(
+        rows, batch_size=500, update_conflicts=True, unique_fields=['product'], update_fields=fields + ['updated_at'],
+    )
+
+
+def update_sales(product_ids):
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+    sales = _sales(product_ids)
+    _upsert([
+        ProductLeaderboard(product_id=pk, units_sold_30d=sales.get(pk, (0, 0))[0], units_sold_all=sales.get(pk, (0, 0))[1])
+        for pk in product_ids
+    ], ['units_sold_30d', 'units_sold_all'])
+
+
+def update_rating(product_id):
+    if not Product.objects.filter(pk=product_id).exists():
+        return
+    score = _ratings([product_id]).get(product_id, 0.0)
+    _upsert([ProductLeaderboard(product_id=product_id, rating_score=score)], ['rating_score'])
+
+
+def refresh():
+    """Recompute every row from the rollups and reviews. Returns the number of rows."""
+    mean = rating_mean(refresh=True)
+    sales = _sales()
+    ratings = _ratings(mean=mean)
+    existing = set(Product.objects.values_list('id', flat=True))
+    rows = [
+        ProductLeaderboard(
+            product_id=pk,
+            units_sold_30d=sales.get(pk, (0, 0))[0],
+            units_sold_all=sales.get(pk, (0, 0))[1],
+            rating_score=ratings.get(pk, 0.0),
+        )
+        for pk in sorted((set(sales) | set(ratings)) & existing)
+    ]
+    with transaction.atomic():
+        ProductLeaderboard.objects.all().delete()
+        ProductLeaderboard.objects.bulk_create(rows, batch_size=500)
+    return len(rows)
+
+
+def schedule_daily_refresh():
+    """Queue refresh() once per day, from whichever request notices first."""
+    from .tasks import refresh_leaderboards
+
+    if cache.add(f'leaderboards:refreshed:{timezone.localdate().isoformat()}', 1, 2 * 24 * 3600):
+        refresh_leaderboards.delay()
+
+
+def best_sellers():
+    """Published products sold in the last 30 days, by units; all-time units break ties."""
+    return Product.objects.filter(status='published', leaderboard__units_sold_30d__gt=0).order_by(
+        '-leaderboard__units_sold_30d', '-leaderboard__units_sold_all', 'leaderboard__product_id',
+    )
+
+
+def top_rated():
+    return Product.objects.filter(status='published', leaderboard__rating_score__gt=0).order_by(
+        '-leaderboard__rating_score', 'leaderboard__product_id',
+    )
@@ -0,0 +1,209 @@
+# apiApp/mail.py
+import logging
+import random
+import smtplib
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def queue_mail(subject, message, from_email, recipient_list, fail_silently=False, html_message=None):
+    """
+    Drop-in replacement for django.core.mail.send_mail that only writes the
+    message to the outbox; `manage.py send_queued_mail` delivers it. Returns
+    1 like send_mail so callers can keep checking the result.
+    """
+    try:
+        OutboundEmail.objects.create(
+            subject=subject,
+            body=message,
+            html_body=html_message or '',
+            from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(recipient_list),
+        )
+    except Exception as e:
+        if not fail_silently:
+            raise
+        logger.error(f"Could not queue email '{subject}': {str(e)}")
+        return 0
+    return 1
+
+
+def queue_messages(messages):
+    """Queue already-built EmailMessage objects (used by OutboxEmailBackend)."""
+    rows = []
+    for msg in messages:
+        html = next((content for content, mimetype in getattr(msg, 'alternatives', []) if mimetype == 'text/html'), '')
+        if getattr(msg, 'content_subtype', 'plain') == 'html':
+            body, html = '', msg.body
+        else:
+            body = msg.body
+        if msg.attachments:
+            logger.warning(f"Outbox drops {len(msg.attachments)} attachment(s) on '{msg.subject}'")
+        rows.append(OutboundEmail(
+            subject=msg.subject,
+            body=body,
+            html_body=html,
+            from_email=msg.from_email or settings.DEFAULT_FROM_EMAIL,
+            to=list(msg.to),
+            cc=list(msg.cc),
+            bcc=list(msg.bcc),
+            reply_to=list(msg.reply_to),
+            headers=dict(msg.extra_headers),
+        ))
+    OutboundEmail.objects.bulk_create(rows)
+    return len(rows)
+
+
+class OutboxEmailBackend(BaseEmailBackend):
+    """
+    EMAIL_BACKEND for mail sent by third-party code (allauth confirmations,
+    the social account adapter, admin password resets): messages go to the
+    outbox instead of opening an SMTP connection inside the request.
+    """
+
+    def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        try:
+            return queue_messages(email_messages)
+        except Exception as e:
+            if not self.fail_silently:
+                raise
+            logger.error(f"Could not queue {len(email_messages)} email(s): {str(e)}")
+            return 0
+
+
+def build_message(row, connection=None):
+    msg = EmailMultiAlternatives(
+        subject=row.subject,
+        body=row.body,
+        from_email=row.from_email,
+        to=row.to,
+        cc=row.cc,
+        bcc=row.bcc,
+        reply_to=row.reply_to,
+        headers=row.headers,
+        connection=connection,
+    )
+    if row.html_body:
+        msg.attach_alternative(row.html_body, 'text/html')
+    return msg
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: 30s, 60s, 120s ... capped at OUTBOX_MAX_BACKOFF."""
+    base = _setting('OUTBOX_RETRY_BASE_SECONDS', 30)
+    delay = min(base * 2 ** (attempts - 1), _setting('OUTBOX_MAX_BACKOFF_SECONDS', 3600))
+    return timedelta(seconds=delay * random.uniform(0.8, 1.2))
+
+
+def claim_batch(batch_size):
+    """
+    Mark up to `batch_size` due messages as sending under a fresh claim token
+    and return them. The conditional UPDATE means two workers never claim the
+    same row; rows left in `sending` by a crashed worker are released after
+    OUTBOX_CLAIM_TIMEOUT seconds.
+    """
+    now = timezone.now()
+    stale = now - timedelta(seconds=_setting('OUTBOX_CLAIM_TIMEOUT', 600))
+    OutboundEmail.objects.filter(status=OutboundEmail.STATUS_SENDING, claimed_at__lt=stale).update(
+        status=OutboundEmail.STATUS_PENDING, claim_token=None, claimed_at=None,
+    )
+
+    due = list(
+        OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING, next_attempt_at__lte=now)
+        .order_by('next_attempt_at', 'id')
+        .values_list('id', flat=True)[:batch_size]
+    )
+    if not due:
+        return []
+    token = uuid.uuid4()
+    OutboundEmail.objects.filter(id__in=due, status=OutboundEmail.STATUS_PENDING).update(
+        status=OutboundEmail.STATUS_SENDING, claim_token=token, claimed_at=now,
+    )
+    return list(OutboundEmail.objects.filter(claim_token=token).order_by('id'))
+
+
+def deliver_batch(rows, connection=None):
+    """
+    Send claimed rows over one connection (`send_messages`), reopening it
+    only if the server drops it. Returns (sent, retried, failed).
+    """
+    if not rows:
+        return 0, 0, 0
+    connection = connection or get_connection(
+        backend=_setting('OUTBOX_DELIVERY_BACKEND', 'django.core.mail.backends.smtp.EmailBackend'),
+        fail_silently=False,
+    )
+    max_attempts = _setting('OUTBOX_MAX_ATTEMPTS', 5)
+    sent, retried, failed = [], [], []
+
+    try:
+        connection.open()
+    except Exception as e:
+        logger.error(f"Outbox could not connect to the mail server: {str(e)}")
+        connection = None
+        error = e
+
+    for row in rows:
+        if connection is not None:
+            try:
+                connection.send_messages([build_message(row, connection)])
+                sent.append(row.id)
+                continue
+            except smtplib.SMTPServerDisconnected as e:
+                # Server hung up mid-batch; reconnect once for the remaining rows
+                error = e
+                try:
+                    connection.close()
+                    connection.open()
+                    connection.send_messages([build_message(row, connection)])
+                    sent.append(row.id)
+                    continue
+                except Exception as e:
+                    error = e
+            except Exception as e:
+                error = e
+
+        row.attempts += 1
+        row.last_error = str(error)[:2000]
+        row.claim_token = None
+        row.claimed_at = None
+        if row.attempts >= max_attempts:
+            row.status = OutboundEmail.STATUS_FAILED
+            failed.append(row)
+            logger.error(f"Giving up on email {row.id} to {row.to} after {row.attempts} attempts: {row.last_error}")
+        else:
+            row.status = OutboundEmail.STATUS_PENDING
+            row.next_attempt_at = timezone.now() + retry_delay(row.attempts)
+            retried.append(row)
+            logger.warning(f"Email {row.id} failed (attempt {row.attempts}), retrying at {row.next_attempt_at}")
+
+    if connection is not None:
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    with transaction.atomic():
+        OutboundEmail.objects.filter(id__in=sent).update(
+            status=OutboundEmail.STATUS_SENT, sent_at=timezone.now(), claim_token=None, claimed_at=None,
+        )
+        OutboundEmail.objects.bulk_update(
+            retried + failed, ['status', 'attempts', 'last_error', 'next_attempt_at', 'claim_token', 'claimed_at'],
+        )
+    return len(sent), len(retried), len(failed)
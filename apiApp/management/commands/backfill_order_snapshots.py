@@ -0,0 +1,33 @@
+# apiApp/management/commands/backfill_order_snapshots.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apiApp.models import OrderItem
+from apiApp.order_history import SNAPSHOT_FIELDS, fill_snapshots
+
+
+class Command(BaseCommand):
+    help = 'Fill the product name / variant / image snapshot of order items created before it existed'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--force', action='store_true', help='Re-snapshot items that already have one')
+        parser.add_argument('--batch-size', type=int, default=500, help='Items snapshotted per bulk_update')
+
+    def handle(self, *args, **options):
+        items = OrderItem.objects.only('id', 'product_id', 'variant_id', *SNAPSHOT_FIELDS).order_by('id')
+        if not options['force']:
+            items = items.filter(product_name='')
+
+        started = time.monotonic()
+        done, last_id = 0, 0
+        while True:
+            batch = list(items.filter(id__gt=last_id)[:options['batch_size']])
+            if not batch:
+                break
+            OrderItem.objects.bulk_update(fill_snapshots(batch), SNAPSHOT_FIELDS)
+            done += len(batch)
+            last_id = batch[-1].id
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {done} order items in {elapsed:.1f}s"))
@@ -0,0 +1,76 @@
+# apiApp/management/commands/bench_catalog_export.py
+import gc
+import resource
+import time
+
+from django.conf import settings
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+
+from apiApp.exports import FORMATS, export_lines
+from apiApp.models import Product
+
+
+def rss_mib():
+    """
+    (resident, anonymous) memory in MiB. Resident also counts the database
+    file pages SQLite maps in (SQLITE_PRAGMAS mmap_size); anonymous is the
+    Python heap plus SQLite's page cache, both bounded.
+    """
+    try:
+        with open('/proc/self/status') as fh:
+            fields = dict(line.split(':', 1) for line in fh)
+        return int(fields['VmRSS'].split()[0]) / 1024, int(fields['RssAnon'].split()[0]) / 1024
+    except (OSError, KeyError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+        return peak, peak
+
+
+class Command(BaseCommand):
+    help = 'Stream the catalog export to nowhere and check that memory stays flat as rows go by'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=100000, help='Seed the catalog up to this many products')
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE)
+        parser.add_argument('--checkpoints', type=int, default=10, help='RSS samples taken over the run')
+
+    def handle(self, *args, **options):
+        missing = options['products'] - Product.objects.count()
+        if missing > 0:
+            self.stdout.write(f"Seeding {missing} products...")
+            call_command(
+                'seed_catalog', products=missing, users=10, reviews=0, carts=0, orders=0,
+                seed=int(time.time()), stdout=self.stdout,
+            )
+
+        total = Product.objects.count()
+        step = max(1, total // options['checkpoints'])
+        gc.collect()
+        baseline = rss_mib()
+        self.stdout.write(f"Exporting {total} products as {options['format']}, chunk size {options['chunk_size']}")
+        self.stdout.write(f"{'rows':>9} {'seconds':>8} {'rows/s':>8} {'RSS MiB':>8} {'anon MiB':>9}")
+
+        started = time.perf_counter()
+        rows = size = 0
+        samples = []
+        lines = export_lines(options['format'], chunk_size=options['chunk_size'])
+        if options['format'] == 'csv':
+            size += len(next(lines))
+        for line in lines:
+            rows += 1
+            size += len(line)
+            if rows % step == 0 or rows == total:
+                elapsed = time.perf_counter() - started
+                rss, anon = rss_mib()
+                samples.append(anon)
+                self.stdout.write(f"{rows:>9} {elapsed:>8.1f} {rows / elapsed:>8.0f} {rss:>8.1f} {anon:>9.1f}")
+
+        if not samples:
+            self.stdout.write('Nothing exported.')
+            return
+        self.stdout.write(
+            f"\n{size / 2 ** 20:.1f} MiB written. Anonymous memory before {baseline[1]:.1f} MiB, "
+            f"at first checkpoint {samples[0]:.1f} MiB, peak {max(samples):.1f} MiB, "
+            f"growth after first checkpoint {max(samples) - samples[0]:+.1f} MiB"
+        )
@@ -0,0 +1,79 @@
+# apiApp/management/commands/bench_endpoints.py
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+
+from apiApp.authentication import invalidate_token, local_tokens
+
+User = get_user_model()
+
+AUTHENTICATED_ENDPOINTS = [
+    'api:user-profile',
+    'api:wishlist',
+    'api:order-list',
+    'api:notifications',
+    'api:user-address',
+]
+
+
+def _is_auth_query(sql):
+    return 'authtoken_token' in sql
+
+
+class Command(BaseCommand):
+    help = 'Measure queries and latency per request for authenticated endpoints, with and without the token cache'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=100, help='Requests per endpoint and mode')
+
+    def _run(self, client, url, n):
+        queries, auth_queries, timings, status = [], [], [], None
+        for _ in range(n):
+            with CaptureQueriesContext(connection) as ctx:
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append((time.perf_counter() - started) * 1000)
+            status = response.status_code
+            queries.append(len(ctx.captured_queries))
+            auth_queries.append(sum(1 for q in ctx.captured_queries if _is_auth_query(q['sql'])))
+        return status, statistics.mean(queries), statistics.mean(auth_queries), statistics.median(timings)
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        # Everything happens in a transaction that is rolled back, the database is left untouched
+        with transaction.atomic():
+            user = User.objects.create_user(email='bench-endpoints@example.com', password=None)
+            token = Token.objects.create(user=user)
+            client = Client(HTTP_HOST='localhost', HTTP_AUTHORIZATION=f'Token {token.key}')
+
+            self.stdout.write(
+                f"{'endpoint':<28} {'mode':<8} {'status':>6} {'queries':>8} {'auth q':>7} {'p50 ms':>8}"
+            )
+            totals = {}
+            for name in AUTHENTICATED_ENDPOINTS:
+                url = reverse(name)
+                for mode, enabled in (('db', False), ('cached', True)):
+                    local_tokens.clear()
+                    with override_settings(TOKEN_AUTH_CACHE_ENABLED=enabled):
+                        client.get(url)  # warm up, fills the cache in cached mode
+                        status, queries, auth, p50 = self._run(client, url, n)
+                    totals.setdefault(mode, []).append((queries, auth))
+                    self.stdout.write(f"{name:<28} {mode:<8} {status:>6} {queries:>8.1f} {auth:>7.1f} {p50:>8.2f}")
+
+            before = sum(q for q, _ in totals['db'])
+            after = sum(q for q, _ in totals['cached'])
+            auth_saved = sum(a for _, a in totals['db']) - sum(a for _, a in totals['cached'])
+            self.stdout.write(self.style.SUCCESS(
+                f"Token cache saves {auth_saved / len(AUTHENTICATED_ENDPOINTS):.1f} auth queries per request "
+                f"({before:.0f} -> {after:.0f} queries across {len(AUTHENTICATED_ENDPOINTS)} endpoints)"
+            ))
+            # Rolling back skips post_delete, so drop the cached token by hand
+            invalidate_token(token.key)
+            transaction.set_rollback(True)
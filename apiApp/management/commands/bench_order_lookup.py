@@ -0,0 +1,104 @@
+# apiApp/management/commands/bench_order_lookup.py
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apiApp.models import ORDER_NUMBER_ALPHABET, ORDER_NUMBER_LENGTH, Order
+from apiApp.order_lookup import find_orders, orders_for_email, prefix_filter
+
+COLUMNS = [
+    'order_number', 'paystack_checkout_id', 'amount', 'currency', 'customer_email', 'status',
+    'created_at', 'updated_at',
+]
+
+
+class Command(BaseCommand):
+    help = 'Time order tracking lookups (legacy scans vs indexed) against a large Order table; rolled back afterwards'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--orders', type=int, default=1_000_000, help='Orders to insert')
+        parser.add_argument('--customers', type=int, default=50_000, help='Distinct customer emails')
+        parser.add_argument('--repeat', type=int, default=20, help='Lookups timed per query')
+        parser.add_argument('--batch-size', type=int, default=10_000, help='Rows per executemany')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(7)
+        with transaction.atomic():
+            self._insert(options['orders'], options['customers'], options['batch_size'])
+            self._run(options['orders'], options['customers'], options['repeat'])
+            transaction.set_rollback(True)
+
+    def _insert(self, count, customers, batch_size):
+        table = connection.ops.quote_name(Order._meta.db_table)
+        column_sql = ', '.join(connection.ops.quote_name(Order._meta.get_field(c).column) for c in COLUMNS)
+        sql = f"INSERT INTO {table} ({column_sql}) VALUES ({', '.join(['%s'] * len(COLUMNS))})"
+        now = timezone.now()
+
+        self.stdout.write(f"Inserting {count} orders for {customers} customers...")
+        started = time.perf_counter()
+        with connection.cursor() as cursor:
+            for start in range(0, count, batch_size):
+                rows = []
+                for i in range(start, min(start + batch_size, count)):
+                    created = now - timedelta(minutes=count - i)
+                    rows.append((
+                        self._number(i), self._reference(i), '15000.00', 'NGN',
+                        self._email(i % customers), 'paid', created, created,
+                    ))
+                cursor.executemany(sql, rows)
+        self.stdout.write(f"  done in {time.perf_counter() - started:.1f}s")
+
+    def _number(self, i):
+        # Unique and well spread without a collision check: a bijection of i
+        value = (i * 2_654_435_761 + 12_345) % (32 ** ORDER_NUMBER_LENGTH)
+        digits = []
+        for _ in range(ORDER_NUMBER_LENGTH):
+            value, digit = divmod(value, 32)
+            digits.append(ORDER_NUMBER_ALPHABET[digit])
+        return ''.join(digits)
+
+    def _reference(self, i):
+        return f"bench_order_{i}_{1_700_000_000 + i}"
+
+    def _email(self, customer):
+        return f"customer{customer}@bench.example.com"
+
+    def _run(self, count, customers, repeat):
+        picks = [self.rng.randrange(count) for _ in range(repeat)]
+        cases = [
+            ('reference icontains (legacy)', lambda i: list(
+                Order.objects.filter(paystack_checkout_id__icontains=self._reference(i)[6:20]))),
+            ('email iexact (legacy)', lambda i: list(
+                Order.objects.filter(customer_email__iexact=self._email(i % customers).upper()).order_by('-created_at')[:20])),
+            ('order number exact', lambda i: find_orders(self._number(i).lower())),
+            ('reference exact', lambda i: find_orders(self._reference(i))),
+            ('reference prefix', lambda i: find_orders(self._reference(i)[:-6], prefix=True)),
+            ('email, newest 20', lambda i: list(orders_for_email(self._email(i % customers).upper())[:20])),
+        ]
+
+        self.stdout.write(f"\n{'lookup':<30} {'rows':>5} {'median ms':>10} {'p95 ms':>8}")
+        for name, lookup in cases:
+            timings, rows = [], 0
+            for i in picks:
+                started = time.perf_counter()
+                rows = len(lookup(i))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+            p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+            self.stdout.write(f"{name:<30} {rows:>5} {statistics.median(timings):>10.2f} {p95:>8.2f}")
+
+        self.stdout.write('\nQuery plans:')
+        i = picks[0]
+        plans = [
+            ('reference icontains (legacy)', Order.objects.filter(paystack_checkout_id__icontains='x')),
+            ('order number exact', Order.objects.filter(order_number=self._number(i))),
+            ('reference prefix', Order.objects.filter(**prefix_filter('paystack_checkout_id', 'bench_order_1'))),
+            ('email, newest 20', orders_for_email(self._email(i % customers))[:20]),
+        ]
+        for name, queryset in plans:
+            self.stdout.write(f"  {name}: {' | '.join(queryset.explain().splitlines())}")
@@ -0,0 +1,112 @@
+# apiApp/management/commands/bench_sqlite_writers.py
+import os
+import sqlite3
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apiApp.db_tuning import pragma_statements
+
+SCHEMA = [
+    'CREATE TABLE cart (id INTEGER PRIMARY KEY, modified_at REAL)',
+    'CREATE TABLE cartitem (id INTEGER PRIMARY KEY, cart_id INTEGER, product_id INTEGER, quantity INTEGER)',
+    'CREATE INDEX cartitem_cart ON cartitem (cart_id, product_id)',
+]
+
+
+def _connect(path, mode):
+    # Django's defaults: 5s sqlite3 timeout, rollback journal, deferred transactions
+    conn = sqlite3.connect(path, timeout=5.0 if mode['timeout'] is None else mode['timeout'], isolation_level=None)
+    for statement in mode['pragmas']:
+        conn.execute(statement)
+    return conn
+
+
+def _writer(path, mode, transactions, worker):
+    """Add-to-cart shaped transactions: read the line, insert or bump it, touch the cart."""
+    conn = _connect(path, mode)
+    ok = errors = 0
+    latencies = []
+    for i in range(transactions):
+        cart_id = (worker * 7 + i) % 50 + 1
+        product_id = i % 20
+        started = time.perf_counter()
+        try:
+            conn.execute(mode['begin'])
+            row = conn.execute(
+                'SELECT id FROM cartitem WHERE cart_id = ? AND product_id = ?', (cart_id, product_id)
+            ).fetchone()
+            if row:
+                conn.execute('UPDATE cartitem SET quantity = quantity + 1 WHERE id = ?', (row[0],))
+            else:
+                conn.execute(
+                    'INSERT INTO cartitem (cart_id, product_id, quantity) VALUES (?, ?, 1)', (cart_id, product_id)
+                )
+            conn.execute('UPDATE cart SET modified_at = ? WHERE id = ?', (time.time(), cart_id))
+            conn.execute('COMMIT')
+            ok += 1
+            latencies.append(time.perf_counter() - started)
+        except sqlite3.OperationalError as e:
+            if 'locked' not in str(e) and 'busy' not in str(e):
+                raise
+            errors += 1
+            if conn.in_transaction:
+                conn.execute('ROLLBACK')
+    conn.close()
+    return ok, errors, latencies
+
+
+class Command(BaseCommand):
+    help = 'Concurrent SQLite writers: lock errors and throughput with default vs tuned connection settings'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--writers', default='1,4,8', help='Writer process counts to try')
+        parser.add_argument('--transactions', type=int, default=300, help='Transactions per writer')
+
+    def _modes(self):
+        return {
+            'default': {
+                'pragmas': pragma_statements({'journal_mode': 'DELETE', 'synchronous': 'FULL'}),
+                'begin': 'BEGIN', 'timeout': None,
+            },
+            'tuned': {
+                'pragmas': pragma_statements(settings.SQLITE_PRAGMAS),
+                'begin': f"BEGIN {settings.SQLITE_TRANSACTION_MODE or ''}".strip(),
+                'timeout': 0,  # busy_timeout comes from the pragmas
+            },
+        }
+
+    def handle(self, *args, **options):
+        self.stdout.write(
+            f"{'settings':<10} {'writers':>7} {'commits':>8} {'lock errors':>12} {'error rate':>11} "
+            f"{'tx/s':>8} {'p95 ms':>8}"
+        )
+        for name, mode in self._modes().items():
+            for writers in [int(w) for w in options['writers'].split(',')]:
+                with tempfile.TemporaryDirectory() as tmp:
+                    path = os.path.join(tmp, 'bench.sqlite3')
+                    conn = _connect(path, mode)
+                    for statement in SCHEMA:
+                        conn.execute(statement)
+                    conn.executemany('INSERT INTO cart (id, modified_at) VALUES (?, 0)', [(i,) for i in range(1, 51)])
+                    conn.close()
+
+                    started = time.perf_counter()
+                    with ProcessPoolExecutor(max_workers=writers) as pool:
+                        results = list(pool.map(
+                            _writer, [path] * writers, [mode] * writers,
+                            [options['transactions']] * writers, range(writers),
+                        ))
+                    elapsed = time.perf_counter() - started
+
+                ok = sum(r[0] for r in results)
+                errors = sum(r[1] for r in results)
+                latencies = sorted(lat for r in results for lat in r[2])
+                p95 = latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0
+                self.stdout.write(
+                    f"{name:<10} {writers:>7} {ok:>8} {errors:>12} {errors / (ok + errors):>10.1%} "
+                    f"{ok / elapsed:>8.0f} {p95:>8.2f}"
+                )
@@ -0,0 +1,117 @@
+# apiApp/management/commands/bench_static.py
+import os
+import tempfile
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.views.static import serve
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+from apiApp.media import serve_media
+
+STATIC_SAMPLES = [
+    'admin/css/base.css',
+    'admin/js/vendor/jquery/jquery.js',
+    'rest_framework/css/bootstrap.min.css',
+    'rest_framework/js/jquery-3.7.1.min.js',
+]
+
+
+def _wire_bytes(response):
+    body = b''.join(response.streaming_content) if response.streaming else response.content
+    if hasattr(response, 'close'):
+        response.close()
+    headers = sum(len(k) + len(v) + 4 for k, v in response.items())
+    return response.status_code, len(body) + headers
+
+
+class Command(BaseCommand):
+    help = 'Compare bytes on the wire and latency for static/media before and after WhiteNoise + serve_media'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=200, help='Requests per scenario')
+        parser.add_argument('--media', help='Media file (relative to MEDIA_ROOT) to use, default is the largest image')
+
+    def _time(self, view, request, n):
+        status, size = _wire_bytes(view(request))
+        started = time.perf_counter()
+        for _ in range(n):
+            _wire_bytes(view(request))
+        return status, size, (time.perf_counter() - started) * 1000 / n
+
+    def _row(self, label, before, after):
+        (b_status, b_bytes, b_ms), (a_status, a_bytes, a_ms) = before, after
+        saved = f"{100 * (1 - a_bytes / b_bytes):>5.1f}% fewer bytes" if b_bytes else ''
+        self.stdout.write(
+            f"{label:<44} {b_status:>4} {b_bytes:>10,} {b_ms:>7.3f}ms | "
+            f"{a_status:>4} {a_bytes:>10,} {a_ms:>7.3f}ms | {saved}"
+        )
+
+    def handle(self, *args, **options):
+        n = options['requests']
+        factory = RequestFactory()
+        self.stdout.write(f"{'scenario':<44} {'before (status, bytes, mean)':>29} | {'after':>27}")
+
+        # Static: plain django serve over the source files vs WhiteNoise over a fresh collectstatic
+        with tempfile.TemporaryDirectory() as static_root, \
+                override_settings(STATIC_ROOT=static_root, WHITENOISE_USE_FINDERS=False, WHITENOISE_AUTOREFRESH=False):
+            self.stdout.write('Running collectstatic into a temporary STATIC_ROOT (Brotli at max quality takes a while)...')
+            call_command('collectstatic', interactive=False, verbosity=0)
+            whitenoise = WhiteNoiseMiddleware(lambda request: HttpResponse(status=404))
+
+            for name in STATIC_SAMPLES:
+                source = finders.find(name)
+                if not source:
+                    continue
+                hashed_url = settings.STATIC_URL + staticfiles_storage.stored_name(name)
+                if not os.path.exists(os.path.join(static_root, staticfiles_storage.stored_name(name) + '.br')):
+                    self.stderr.write(self.style.WARNING(f"  no .br sibling for {name} (is Brotli installed?)"))
+
+                def before_view(request, name=name, source=source):
+                    return serve(request, os.path.basename(source), document_root=os.path.dirname(source))
+
+                plain = factory.get(f'/static/{name}')
+                compressed = factory.get(hashed_url, HTTP_ACCEPT_ENCODING='gzip, deflate, br')
+                self._row(f'static {name}', self._time(before_view, plain, n), self._time(whitenoise, compressed, n))
+
+                # Repeat visit: revalidation before, none needed for an immutable hashed URL after
+                mtime = before_view(plain)['Last-Modified']
+                revalidate = factory.get(f'/static/{name}', HTTP_IF_MODIFIED_SINCE=mtime)
+                etag = whitenoise(compressed)['ETag']
+                revalidate_after = factory.get(hashed_url, HTTP_ACCEPT_ENCODING='br', HTTP_IF_NONE_MATCH=etag)
+                self._row('  revalidate', self._time(before_view, revalidate, n), self._time(whitenoise, revalidate_after, n))
+
+        # Media: django.views.static.serve (old DEBUG route) vs serve_media
+        media_name = options['media']
+        if not media_name:
+            candidates = []
+            for dirpath, _, filenames in os.walk(settings.MEDIA_ROOT):
+                for filename in filenames:
+                    if filename.lower().endswith(('.jpg', '.jpeg', '.png', '.webp')):
+                        path = os.path.join(dirpath, filename)
+                        candidates.append((os.path.getsize(path), path))
+            if not candidates:
+                raise CommandError(f'No images found under {settings.MEDIA_ROOT}')
+            media_name = os.path.relpath(max(candidates)[1], settings.MEDIA_ROOT).replace(os.sep, '/')
+
+        def old_media(request):
+            return serve(request, media_name, document_root=settings.MEDIA_ROOT)
+
+        def new_media(request):
+            return serve_media(request, media_name)
+
+        url = settings.MEDIA_URL + media_name
+        self._row(f'media {media_name[-37:]}', self._time(old_media, factory.get(url), n),
+                  self._time(new_media, factory.get(url), n))
+
+        etag = new_media(factory.get(url))['ETag']
+        self._row('  revalidate (ETag)', self._time(old_media, factory.get(url, HTTP_IF_NONE_MATCH=etag), n),
+                  self._time(new_media, factory.get(url, HTTP_IF_NONE_MATCH=etag), n))
+        self._row('  Range: bytes=0-65535', self._time(old_media, factory.get(url, HTTP_RANGE='bytes=0-65535'), n),
+                  self._time(new_media, factory.get(url, HTTP_RANGE='bytes=0-65535'), n))
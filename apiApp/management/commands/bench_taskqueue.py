@@ -0,0 +1,68 @@
+# apiApp/management/commands/bench_taskqueue.py
+import io
+import time
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from apiApp.models import Task
+from apiApp.taskqueue import claim_tasks, enqueue_many, execute, task
+
+
+@task(queue='bench', max_attempts=1)
+def noop(*args, **kwargs):
+    """Does nothing; the queue's own overhead is all that gets measured."""
+    return None
+
+
+class Command(BaseCommand):
+    help = 'Measure enqueue and dequeue throughput of the database task queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=2000, help='Tasks per scenario')
+        parser.add_argument('--concurrency', default='1,4,8', help='Worker pool sizes to try')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+
+    def _report(self, label, count, seconds):
+        self.stdout.write(f"{label:<44} {count:>7} tasks {seconds:>7.2f}s {count / seconds:>9.0f} tasks/s")
+
+    def handle(self, *args, **options):
+        n = options['tasks']
+        Task.objects.filter(queue=noop.queue).delete()
+        self.stdout.write(f"Database: {connection.vendor}, skip locked: {connection.features.has_select_for_update_skip_locked}")
+
+        try:
+            started = time.perf_counter()
+            for i in range(n):
+                noop.delay(i)
+            self._report('enqueue, one delay() per task', n, time.perf_counter() - started)
+
+            started = time.perf_counter()
+            enqueue_many(noop.name, [(i,) for i in range(n)])
+            self._report('enqueue, enqueue_many()', n, time.perf_counter() - started)
+
+            # Claim + execute in this thread: the queue's own overhead with no pool
+            started = time.perf_counter()
+            processed = 0
+            while True:
+                batch = claim_tasks(100, queues=[noop.queue])
+                if not batch:
+                    break
+                for task_obj in batch:
+                    execute(task_obj)
+                processed += len(batch)
+            self._report('dequeue, claim 100 + execute inline', processed, time.perf_counter() - started)
+
+            for concurrency in [int(c) for c in options['concurrency'].split(',')]:
+                enqueue_many(noop.name, [(i,) for i in range(n)])
+                started = time.perf_counter()
+                call_command(
+                    'run_worker', queues=noop.queue, concurrency=concurrency, pool=options['pool'],
+                    burst=True, stdout=io.StringIO(),
+                )
+                elapsed = time.perf_counter() - started
+                leftover = Task.objects.filter(queue=noop.queue).exclude(status=Task.STATUS_DONE).count()
+                self._report(f"dequeue, run_worker {options['pool']} x{concurrency}", n - leftover, elapsed)
+        finally:
+            Task.objects.filter(queue=noop.queue).delete()
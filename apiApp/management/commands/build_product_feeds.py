@@ -0,0 +1,22 @@
+# apiApp/management/commands/build_product_feeds.py
+from django.core.management.base import BaseCommand
+
+from apiApp.feeds import FEEDS, build_feed
+
+
+class Command(BaseCommand):
+    help = 'Bring the Google Merchant / Meta catalog feeds up to date, re-rendering only changed products'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--feed', action='append', choices=sorted(FEEDS), help='Feed to build (default all; repeatable)')
+        parser.add_argument('--full', action='store_true', help='Re-render every product')
+        parser.add_argument('--chunk-size', type=int, help='Products rendered per query (default EXPORT_CHUNK_SIZE)')
+
+    def handle(self, *args, **options):
+        for name in options['feed'] or FEEDS:
+            stats = build_feed(name, full=options['full'], chunk_size=options['chunk_size'])
+            self.stdout.write(
+                f"{name}: {'full' if stats['full'] else 'incremental'} build, {stats['rendered']} rendered, "
+                f"{stats['removed']} removed, {stats['products']} products, "
+                f"{stats['bytes'] / 1024:.0f} KiB gzipped in {stats['seconds']:.2f}s"
+            )
@@ -0,0 +1,20 @@
+# apiApp/management/commands/build_recommendations.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apiApp.recommendations import build
+
+
+class Command(BaseCommand):
+    help = 'Rebuild "customers also bought" neighbors from orders, carts and wishlists (run daily)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Rewrite every product, not only those whose neighbors changed')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products, rows = build(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Rewrote neighbors of {products} products ({rows} rows) in {time.monotonic() - started:.1f}s"
+        ))
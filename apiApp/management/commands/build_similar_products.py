@@ -0,0 +1,20 @@
+# apiApp/management/commands/build_similar_products.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apiApp.similarity import update
+
+
+class Command(BaseCommand):
+    help = 'Bring "similar items" up to date with catalog edits since the last run, or rebuild them all with --full'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help='Recompute every product, not only those edits can affect')
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        products, rows = update(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Recomputed similar items of {products} products ({rows} rows) in {time.monotonic() - started:.1f}s"
+        ))
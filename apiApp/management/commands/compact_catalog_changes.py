@@ -0,0 +1,26 @@
+# apiApp/management/commands/compact_catalog_changes.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apiApp.catalog_changes import compact, horizon
+from apiApp.models import CatalogChange
+
+
+class Command(BaseCommand):
+    help = 'Compact the catalog change log: keep the newest change per object and expire old ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--retention-days', type=int, default=settings.CATALOG_CHANGES_RETENTION_DAYS,
+            help='Changes older than this are dropped; clients behind them must resync',
+        )
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be removed')
+
+    def handle(self, *args, **options):
+        before = CatalogChange.objects.count()
+        superseded, expired = compact(options['retention_days'], dry_run=options['dry_run'])
+        verb = 'Would remove' if options['dry_run'] else 'Removed'
+        self.stdout.write(
+            f"{verb} {superseded} superseded and {expired} expired changes "
+            f"(log had {before}, now {CatalogChange.objects.count()}; cursors below #{horizon()} must resync)"
+        )
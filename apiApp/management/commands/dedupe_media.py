@@ -0,0 +1,103 @@
+# apiApp/management/commands/dedupe_media.py
+import os
+from collections import defaultdict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import models, transaction
+
+from apiApp.models import ProductImage
+from apiApp.storage import (
+    ContentAddressedStorage, content_addressed_name, file_digest, is_content_addressed,
+)
+
+
+class Command(BaseCommand):
+    help = 'Move media to content-addressed storage, merge duplicate files and report orphans'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--apply', action='store_true', help='Rewrite file references (default is a dry run)')
+        parser.add_argument('--delete-orphans', action='store_true', help='Delete files no row references (needs --apply)')
+
+    def handle(self, *args, **options):
+        media_root = settings.MEDIA_ROOT
+        storage = ContentAddressedStorage()
+
+        # 1. Hash every file under MEDIA_ROOT
+        digests, sizes = {}, {}
+        for dirpath, _, filenames in os.walk(media_root):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                name = os.path.relpath(path, media_root).replace(os.sep, '/')
+                if filename.startswith('.'):
+                    continue
+                with open(path, 'rb') as fh:
+                    digests[name] = file_digest(fh)
+                sizes[name] = os.path.getsize(path)
+
+        groups = defaultdict(list)
+        for name, digest in digests.items():
+            groups[digest].append(name)
+        duplicates = {d: names for d, names in groups.items() if len(names) > 1}
+        wasted = sum(sizes[names[0]] * (len(names) - 1) for names in duplicates.values())
+
+        self.stdout.write(f"Scanned {len(digests)} files ({sum(sizes.values()) / 1024 / 1024:.1f} MB)")
+        self.stdout.write(f"{len(duplicates)} sets of duplicates, {wasted / 1024 / 1024:.1f} MB reclaimable")
+        for names in duplicates.values():
+            self.stdout.write(f"  {', '.join(sorted(names))}")
+
+        # 2. Point every file field at the content-addressed copy
+        file_fields = [
+            (model, field.name)
+            for model in apps.get_models()
+            for field in model._meta.get_fields()
+            if isinstance(field, models.FileField)
+        ]
+        rewritten = 0
+        with transaction.atomic():
+            for model, field_name in file_fields:
+                rows = model._default_manager.exclude(**{field_name: ''}).exclude(**{f'{field_name}__isnull': True})
+                for obj in rows.iterator():
+                    name = getattr(obj, field_name).name
+                    if is_content_addressed(name) or name not in digests:
+                        continue
+                    target = content_addressed_name(digests[name], name)
+                    if options['apply']:
+                        if not storage.exists(target):
+                            with open(os.path.join(media_root, name), 'rb') as fh:
+                                storage.save(name, fh)
+                            digests[target] = digests[name]
+                        updates = {field_name: target}
+                        if isinstance(obj, ProductImage) and (obj.derivatives or {}).get('source') == name:
+                            # Same bytes, so the existing resized copies stay valid
+                            updates['derivatives'] = {**obj.derivatives, 'source': target}
+                        model._default_manager.filter(pk=obj.pk).update(**updates)
+                    rewritten += 1
+        verb = 'Rewrote' if options['apply'] else 'Would rewrite'
+        self.stdout.write(f"{verb} {rewritten} file references to content-addressed names")
+
+        # 3. Orphans: files on disk that no row points at
+        referenced = set()
+        for model, field_name in file_fields:
+            referenced.update(model._default_manager.values_list(field_name, flat=True))
+        for derivatives in ProductImage.objects.values_list('derivatives', flat=True):
+            for fmt_outputs in (derivatives or {}).values():
+                if isinstance(fmt_outputs, dict):
+                    referenced.update(fmt_outputs.values())
+
+        orphans = sorted(name for name in digests if name not in referenced)
+        orphan_bytes = sum(sizes.get(name, 0) for name in orphans)
+        self.stdout.write(f"{len(orphans)} orphaned files ({orphan_bytes / 1024 / 1024:.1f} MB)")
+        for name in orphans:
+            self.stdout.write(f"  {name}")
+
+        if options['delete_orphans']:
+            if not options['apply']:
+                self.stderr.write(self.style.WARNING('--delete-orphans needs --apply, nothing deleted'))
+                return
+            for name in orphans:
+                os.remove(os.path.join(media_root, name))
+            self.stdout.write(self.style.SUCCESS(f"Deleted {len(orphans)} orphaned files"))
+
+        self.stdout.write(self.style.SUCCESS('Done'))
@@ -0,0 +1,39 @@
+# apiApp/management/commands/export_catalog.py
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apiApp.exports import FORMATS, export_lines
+from apiApp.models import Product
+
+
+class Command(BaseCommand):
+    help = 'Write the whole catalog as NDJSON or CSV without loading it into memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(FORMATS), default='ndjson')
+        parser.add_argument('--output', help='File to write (default stdout)')
+        parser.add_argument('--status', choices=[choice for choice, _ in Product.STATUS_CHOICES])
+        parser.add_argument('--chunk-size', type=int, default=settings.EXPORT_CHUNK_SIZE, help='Products per keyset page')
+        parser.add_argument('--base-url', default=settings.SITE_URL, help='Prefix for relative image URLs')
+
+    def handle(self, *args, **options):
+        base_url = options['base_url'].rstrip('/')
+        lines = export_lines(
+            options['format'], status=options['status'], chunk_size=options['chunk_size'],
+            build_url=lambda path: f'{base_url}{path}',
+        )
+        out = open(options['output'], 'w', encoding='utf-8', newline='') if options['output'] else sys.stdout
+        rows = 0
+        try:
+            for line in lines:
+                out.write(line)
+                rows += 1
+        finally:
+            if out is not sys.stdout:
+                out.close()
+        if options['output']:
+            if options['format'] == 'csv':
+                rows -= 1  # header
+            self.stderr.write(f"Exported {rows} products to {options['output']}")
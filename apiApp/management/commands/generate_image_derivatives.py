@@ -0,0 +1,56 @@
+# apiApp/management/commands/generate_image_derivatives.py
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from django.core.management.base import BaseCommand
+
+from apiApp.images import build_derivatives
+from apiApp.models import ProductImage
+
+
+class Command(BaseCommand):
+    help = 'Backfill resized WebP/JPEG derivatives for existing product images'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=4, help='Images resized in parallel')
+        parser.add_argument('--force', action='store_true', help='Rebuild derivatives that already exist')
+        parser.add_argument('--batch-size', type=int, default=200, help='Rows saved per bulk_update')
+
+    def handle(self, *args, **options):
+        images = ProductImage.objects.exclude(image='').only('id', 'image', 'derivatives')
+        if not options['force']:
+            # Rows whose stored map still points at the current upload are done
+            images = [img for img in images.iterator() if (img.derivatives or {}).get('source') != img.image.name]
+        else:
+            images = list(images)
+
+        self.stdout.write(f"Building derivatives for {len(images)} images with {options['workers']} workers...")
+        started = time.monotonic()
+        done, failed, pending = 0, 0, []
+
+        # Pillow releases the GIL while resizing and encoding, so threads scale;
+        # only the main thread talks to the database.
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            futures = {
+                pool.submit(build_derivatives, img.image.name, overwrite=options['force']): img
+                for img in images
+            }
+            for future in as_completed(futures):
+                img = futures[future]
+                try:
+                    img.derivatives = future.result()
+                except Exception as e:
+                    failed += 1
+                    self.stderr.write(self.style.WARNING(f"  {img.image.name}: {str(e)}"))
+                    continue
+                pending.append(img)
+                done += 1
+                if len(pending) >= options['batch_size']:
+                    ProductImage.objects.bulk_update(pending, ['derivatives'])
+                    pending = []
+        ProductImage.objects.bulk_update(pending, ['derivatives'])
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Built derivatives for {done} images in {elapsed:.1f}s ({failed} failed)"
+        ))
@@ -0,0 +1,17 @@
+# apiApp/management/commands/refresh_leaderboards.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from apiApp.leaderboards import refresh
+
+
+class Command(BaseCommand):
+    help = 'Recompute best-seller and top-rated leaderboards (run daily; the 30-day window slides)'
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        rows = refresh()
+        self.stdout.write(self.style.SUCCESS(
+            f"Refreshed {rows} leaderboard rows in {time.monotonic() - started:.1f}s"
+        ))
@@ -0,0 +1,109 @@
+# apiApp/management/commands/run_worker.py
+import multiprocessing
+from collections import deque
+import signal
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+import django
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import OperationalError, connections
+from django.utils.module_loading import autodiscover_modules
+
+from apiApp.taskqueue import claim_tasks, execute_claimed, registry, release, worker_name
+
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks with a thread or process pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=getattr(settings, 'TASK_WORKER_CONCURRENCY', 4),
+                            help='Tasks executed at the same time')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread',
+                            help='Threads for I/O-bound tasks, processes for CPU-bound ones')
+        parser.add_argument('--queues', default='default', help='Comma separated queues to consume')
+        parser.add_argument('--prefetch', type=int, default=None,
+                            help='Tasks claimed per query (default 2 x concurrency)')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds to wait when the queue is empty')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queues are empty')
+        parser.add_argument('--max-tasks', type=int, default=0, help='Exit after this many tasks (0 = no limit)')
+
+    def _succeeded(self, future):
+        try:
+            return future.result()
+        except Exception as e:
+            # execute() records its own errors; this is the pool itself failing
+            self.stderr.write(self.style.ERROR(f"Worker pool error: {str(e)}"))
+            return False
+
+    def handle(self, *args, **options):
+        autodiscover_modules('tasks')
+        queues = [q.strip() for q in options['queues'].split(',') if q.strip()]
+        concurrency = options['concurrency']
+        name = worker_name()
+
+        stopping = []
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            signal.signal(sig, lambda *_: stopping.append(True))
+
+        if options['pool'] == 'process':
+            # Never share a parent DB socket with the children
+            connections.close_all()
+            # Spawned children start from a clean interpreter: django.setup() first,
+            # task modules are imported on demand by execute()
+            executor = ProcessPoolExecutor(
+                max_workers=concurrency, mp_context=multiprocessing.get_context('spawn'), initializer=django.setup,
+            )
+        else:
+            executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='task-worker')
+
+        self.stdout.write(
+            f"Worker {name} consuming {', '.join(queues)} with {concurrency} {options['pool']} workers "
+            f"({len(registry)} registered tasks)"
+        )
+        started = time.monotonic()
+        prefetch = options['prefetch'] or concurrency * 2
+        # Claimed rows wait here for a free slot; their visibility timeout already runs
+        backlog = deque()
+        in_flight, done, failed = set(), 0, 0
+        try:
+            while not stopping:
+                limit = prefetch
+                if options['max_tasks']:
+                    limit = min(limit, options['max_tasks'] - done - failed - len(in_flight) - len(backlog))
+                if not backlog and limit > 0:
+                    try:
+                        backlog.extend(claim_tasks(limit, queues, worker=name))
+                    except OperationalError as e:
+                        # e.g. SQLite busy while pool threads write results; just try again
+                        self.stderr.write(self.style.WARNING(f"Could not claim tasks: {str(e)}"))
+                while backlog and len(in_flight) < concurrency:
+                    in_flight.add(executor.submit(execute_claimed, backlog.popleft()))
+
+                if not in_flight:
+                    if options['burst'] or (options['max_tasks'] and done + failed >= options['max_tasks']):
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+
+                finished, in_flight = wait(in_flight, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if self._succeeded(future):
+                        done += 1
+                    else:
+                        failed += 1
+        finally:
+            release(backlog)
+            # Let running tasks finish; anything killed mid-run is reclaimed after its visibility timeout
+            for future in wait(in_flight).done:
+                if self._succeeded(future):
+                    done += 1
+                else:
+                    failed += 1
+            executor.shutdown()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Worker {name} stopped: {done} succeeded, {failed} failed in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,322 @@
+# apiApp/management/commands/seed_catalog.py
+import random
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apiApp.models import (
+    Cart, CartItem, Category, Order, OrderItem, Product,
+    ProductImage, ProductVariant, Review, new_order_number,
+)
+from apiApp.order_history import fill_snapshots
+from apiApp.signals import rebuild_product_rating_stats
+from apiApp.slugs import SlugAllocator, assign_unique_slugs
+
+User = get_user_model()
+
+COLORS = ['black', 'white', 'red', 'blue', 'green', 'gold', 'olive', 'burgundy', 'ivory', 'navy']
+SIZES = ['XS', 'S', 'M', 'L', 'XL', 'XXL']
+ADJECTIVES = ['Classic', 'Draped', 'Pleated', 'Silk', 'Asymmetric', 'Frilled', 'Metallic', 'Heirloom', 'Cascading', 'Bubu']
+NOUNS = ['Tee', 'Kaftan', 'Dress', 'Set', 'Pant', 'Top', 'Jumpsuit', 'Shirt', 'Skirt', 'Gown']
+
+
+class Command(BaseCommand):
+    help = 'Generate a synthetic catalog (products, variants, users, reviews, carts, orders) for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1000, help='Number of products to create')
+        parser.add_argument('--categories', type=int, default=20, help='Number of parent categories')
+        parser.add_argument('--subcategories', type=int, default=5, help='Subcategories per parent category')
+        parser.add_argument('--users', type=int, default=500, help='Number of customer accounts')
+        parser.add_argument('--reviews', type=int, default=2, help='Average reviews per product')
+        parser.add_argument('--carts', type=int, default=200, help='Number of carts')
+        parser.add_argument('--orders', type=int, default=1000, help='Number of paid orders')
+        parser.add_argument('--seed', type=int, default=42, help='Random seed, runs with the same seed are identical')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per bulk_create chunk')
+
+    def handle(self, *args, **options):
+        self.rng = random.Random(options['seed'])
+        self.order_numbers = set()
+        self.batch_size = options['batch_size']
+        self.tag = f"s{options['seed']}"
+        self.email_domain = f"seed{options['seed']}.example.com"
+        self.now = connection.ops.adapt_datetimefield_value(timezone.now())
+
+        if User.objects.filter(email__endswith=f"@{self.email_domain}").exists():
+            raise CommandError(
+                f"A catalog for seed {options['seed']} already exists. Use a different --seed."
+            )
+
+        started = time.monotonic()
+        with transaction.atomic():
+            categories = self._create_categories(options['categories'], options['subcategories'])
+            users = self._create_users(options['users'])
+            product_ids, variants_by_product = self._create_products(options['products'], categories)
+            self._create_reviews(product_ids, users, options['reviews'])
+            self._create_carts(options['carts'], users, product_ids, variants_by_product)
+            self._create_orders(options['orders'], users, product_ids, variants_by_product)
+
+            self.stdout.write('Rebuilding rating stats...')
+            rebuild_product_rating_stats(
+                Product.objects.filter(id__range=(product_ids[0], product_ids[-1])) if product_ids else Product.objects.none(),
+                batch_size=self.batch_size,
+            )
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(product_ids)} products, {len(users)} users in {elapsed:.1f}s"
+        ))
+
+    def _insert_rows(self, model, columns, rows):
+        """
+        Insert plain tuples with executemany. bulk_create builds a model
+        instance per row, which dominates the run time for child tables
+        whose primary keys we never need back.
+        """
+        table = connection.ops.quote_name(model._meta.db_table)
+        column_sql = ', '.join(
+            connection.ops.quote_name(model._meta.get_field(c).column) for c in columns
+        )
+        sql = f"INSERT INTO {table} ({column_sql}) VALUES ({', '.join(['%s'] * len(columns))})"
+        with connection.cursor() as cursor:
+            for chunk in self._chunks(rows):
+                cursor.executemany(sql, chunk)
+
+    def _chunks(self, items):
+        for start in range(0, len(items), self.batch_size):
+            yield items[start:start + self.batch_size]
+
+    def _create_categories(self, parents, children_per_parent):
+        parent_objs = [
+            Category(
+                name=f"Collection {i + 1}",
+                is_featured=i < 4,
+                display_order=i + 1,
+            )
+            for i in range(parents)
+        ]
+        Category.objects.bulk_create(assign_unique_slugs(parent_objs), batch_size=self.batch_size)
+
+        child_objs = [
+            Category(
+                name=f"{NOUNS[j % len(NOUNS)]}s",
+                parent=parent,
+                display_order=j + 1,
+            )
+            for i, parent in enumerate(parent_objs)
+            for j in range(children_per_parent)
+        ]
+        Category.objects.bulk_create(assign_unique_slugs(child_objs), batch_size=self.batch_size)
+        self.stdout.write(f"Created {len(parent_objs)} categories and {len(child_objs)} subcategories")
+        return [(parent, [c for c in child_objs if c.parent_id == parent.id]) for parent in parent_objs]
+
+    def _create_users(self, count):
+        # Hashing once keeps this fast; every seeded account uses the password "password"
+        password = make_password('password')
+        users = [
+            User(
+                email=f"customer{i + 1}@{self.email_domain}",
+                full_name=f"Customer {i + 1}",
+                password=password,
+                email_verified=True,
+                verification_token=None,
+            )
+            for i in range(count)
+        ]
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        self.stdout.write(f"Created {len(users)} users")
+        return [user.id for user in users]
+
+    def _create_products(self, count, categories):
+        rng = self.rng
+        through = Product.category.through
+        slugs = SlugAllocator(Product)
+        product_ids = []
+        variants_by_product = {}
+
+        for chunk_start in range(0, count, self.batch_size):
+            chunk_end = min(chunk_start + self.batch_size, count)
+            products, product_variants = [], []
+
+            for i in range(chunk_start, chunk_end):
+                name = f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+                price = Decimal(rng.randrange(5000, 500000, 500)) / 100
+                old_price = price * Decimal('1.25') if rng.random() < 0.3 else None
+                colors = rng.sample(COLORS, k=rng.randint(1, 2))
+                sizes = rng.sample(SIZES, k=rng.randint(1, 3))
+                products.append(Product(
+                    name=name,
+                    description=f"{name} from the synthetic catalog.",
+                    price=price,
+                    old_price=old_price,
+                    discount=20 if old_price else 0,
+                    gender=rng.choice(['men', 'women', 'unisex']),
+                    colors=colors,
+                    sizes=sizes,
+                    is_featured=rng.random() < 0.05,
+                    is_exclusive=rng.random() < 0.02,
+                    status='published' if rng.random() < 0.9 else 'draft',
+                ))
+                product_variants.append([
+                    (color, size, rng.randint(0, 50)) for color in colors for size in sizes
+                ])
+
+            Product.objects.bulk_create(slugs.assign(products))
+
+            links, variants, images = [], [], []
+            for product, variant_specs in zip(products, product_variants):
+                parent, children = rng.choice(categories)
+                links.append((product.id, parent.id))
+                if children:
+                    links.append((product.id, rng.choice(children).id))
+                for color, size, quantity in variant_specs:
+                    variants.append((product.id, color, size, quantity))
+                for position in range(rng.randint(1, 2)):
+                    images.append((
+                        product.id,
+                        f"product_images/sample-{position + 1}.jpg",
+                        position == 0,
+                        f"{product.name} - Image {position + 1}",
+                        '{}',
+                        '',
+                        '',
+                        self.now,
+                        self.now,
+                    ))
+
+            self._insert_rows(through, ['product', 'category'], links)
+            self._insert_rows(ProductVariant, ['product', 'color', 'size', 'quantity'], variants)
+            self._insert_rows(
+                ProductImage,
+                ['product', 'image', 'is_primary', 'alt_text', 'derivatives', 'dominant_color', 'placeholder', 'created_at', 'updated_at'],
+                images,
+            )
+
+            # Carts and orders reference variants, so read back their ids
+            product_ids.extend(product.id for product in products)
+            for variant in ProductVariant.objects.filter(
+                product_id__gte=products[0].id, product_id__lte=products[-1].id
+            ).only('id', 'product_id', 'price_override'):
+                variants_by_product.setdefault(variant.product_id, []).append(variant)
+
+            self.stdout.write(f"  products {chunk_end}/{count}")
+
+        return product_ids, variants_by_product
+
+    def _create_reviews(self, product_ids, users, per_product):
+        if not users or per_product <= 0:
+            return
+        rng = self.rng
+        reviews = []
+        for product_id in product_ids:
+            count = min(len(users), rng.randint(0, per_product * 2))
+            for user_id in rng.sample(users, k=count):
+                reviews.append((
+                    product_id,
+                    user_id,
+                    rng.choices([1, 2, 3, 4, 5], weights=[1, 1, 3, 5, 6])[0],
+                    'Synthetic review.',
+                    self.now,
+                    self.now,
+                ))
+        self._insert_rows(Review, ['product', 'user', 'rating', 'review', 'created', 'updated'], reviews)
+        self.stdout.write(f"Created {len(reviews)} reviews")
+
+    def _random_line(self, product_ids, variants_by_product):
+        product_id = self.rng.choice(product_ids)
+        variants = variants_by_product.get(product_id) or [None]
+        return product_id, self.rng.choice(variants), self.rng.randint(1, 3)
+
+    def _order_number(self):
+        # bulk_create skips Order.save(); at a million orders random numbers
+        # collide about once, so remember the ones handed out
+        number = new_order_number()
+        while number in self.order_numbers:
+            number = new_order_number()
+        self.order_numbers.add(number)
+        return number
+
+    def _unit_price(self, prices, product_id, variant):
+        if variant and variant.price_override:
+            return variant.price_override
+        return prices[product_id]
+
+    def _create_carts(self, count, users, product_ids, variants_by_product):
+        if not product_ids:
+            return
+        rng = self.rng
+        carts = [
+            Cart(
+                user_id=rng.choice(users) if users else None,
+                cart_code=uuid.UUID(int=rng.getrandbits(128)).hex[:11],
+            )
+            for _ in range(count)
+        ]
+        Cart.objects.bulk_create(carts, batch_size=self.batch_size)
+
+        items = []
+        for cart in carts:
+            seen = set()
+            for _ in range(rng.randint(1, 5)):
+                product_id, variant, quantity = self._random_line(product_ids, variants_by_product)
+                if (product_id, variant) in seen:
+                    continue
+                seen.add((product_id, variant))
+                items.append(CartItem(cart=cart, product_id=product_id, variant=variant, quantity=quantity))
+        CartItem.objects.bulk_create(items, batch_size=self.batch_size)
+        self.stdout.write(f"Created {len(carts)} carts with {len(items)} items")
+
+    def _create_orders(self, count, users, product_ids, variants_by_product):
+        if not product_ids:
+            return
+        rng = self.rng
+        prices = dict(Product.objects.filter(id__in=product_ids).values_list('id', 'price'))
+        created = 0
+
+        for chunk_start in range(0, count, self.batch_size):
+            chunk_end = min(chunk_start + self.batch_size, count)
+            orders, order_lines = [], []
+            for i in range(chunk_start, chunk_end):
+                lines = [
+                    self._random_line(product_ids, variants_by_product)
+                    for _ in range(rng.randint(1, 4))
+                ]
+                amount = sum(
+                    self._unit_price(prices, product_id, variant) * quantity
+                    for product_id, variant, quantity in lines
+                )
+                user_number = rng.randint(1, max(len(users), 1))
+                orders.append(Order(
+                    order_number=self._order_number(),
+                    paystack_checkout_id=f"seed_{self.tag}_{i + 1}",
+                    amount=amount,
+                    currency='NGN',
+                    customer_email=f"customer{user_number}@{self.email_domain}",
+                    status=rng.choice(['paid', 'paid', 'shipped', 'delivered']),
+                ))
+                order_lines.append(lines)
+
+            Order.objects.bulk_create(orders)
+            items = [
+                OrderItem(
+                    order=order,
+                    product_id=product_id,
+                    variant=variant,
+                    quantity=quantity,
+                    price=self._unit_price(prices, product_id, variant),
+                )
+                for order, lines in zip(orders, order_lines)
+                for product_id, variant, quantity in lines
+            ]
+            # bulk_create skips OrderItem.save(), which takes the snapshot
+            fill_snapshots(items)
+            OrderItem.objects.bulk_create(items, batch_size=self.batch_size)
+            created += len(orders)
+
+        self.stdout.write(f"Created {created} orders")
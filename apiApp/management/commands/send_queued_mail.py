@@ -0,0 +1,40 @@
+# apiApp/management/commands/send_queued_mail.py
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apiApp.mail import claim_batch, deliver_batch
+from apiApp.models import OutboundEmail
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued outbound email in batches over a reused SMTP connection'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=settings.OUTBOX_BATCH_SIZE,
+                            help='Messages sent per SMTP connection')
+        parser.add_argument('--loop', action='store_true', help='Keep polling the outbox instead of exiting when empty')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep between polls with --loop')
+
+    def handle(self, *args, **options):
+        totals = [0, 0, 0]
+        while True:
+            rows = claim_batch(options['batch_size'])
+            if rows:
+                started = time.monotonic()
+                sent, retried, failed = deliver_batch(rows)
+                totals = [totals[0] + sent, totals[1] + retried, totals[2] + failed]
+                self.stdout.write(
+                    f"Batch of {len(rows)}: {sent} sent, {retried} to retry, {failed} failed "
+                    f"in {time.monotonic() - started:.2f}s"
+                )
+                continue
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
+
+        pending = OutboundEmail.objects.filter(status=OutboundEmail.STATUS_PENDING).count()
+        self.stdout.write(self.style.SUCCESS(
+            f"Sent {totals[0]}, {totals[1]} scheduled for retry, {totals[2]} failed, {pending} still pending"
+        ))
@@ -0,0 +1,76 @@
+# apiApp/management/commands/slow_queries.py
+from collections import Counter, defaultdict
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.core.management.base import BaseCommand
+
+from apiApp.slow_queries import fingerprint, read_log_entries
+
+SORT_KEYS = {
+    'total': lambda g: g['total'],
+    'mean': lambda g: g['total'] / g['count'],
+    'count': lambda g: g['count'],
+    'max': lambda g: g['max'],
+}
+
+
+class Command(BaseCommand):
+    help = 'Summarise the slow-query log: the query shapes costing the most time, and where they come from'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top', type=int, default=10, help='Number of query shapes to show')
+        parser.add_argument('--sort', choices=sorted(SORT_KEYS), default='total', help='Rank by total, mean, count or max time')
+        parser.add_argument('--since-hours', type=float, help='Only look at entries newer than this')
+        parser.add_argument('--endpoint', help='Only entries recorded for this endpoint (e.g. "GET api:product-list")')
+        parser.add_argument('--file', help='Log file to read (default SLOW_QUERY_LOG_FILE and its backups)')
+        parser.add_argument('--plans', action='store_true', help='Print the captured EXPLAIN output')
+
+    def handle(self, *args, **options):
+        cutoff = None
+        if options['since_hours']:
+            cutoff = datetime.now(dt_timezone.utc) - timedelta(hours=options['since_hours'])
+
+        groups = defaultdict(lambda: {
+            'count': 0, 'total': 0.0, 'max': 0.0, 'origins': Counter(), 'endpoints': Counter(),
+            'sql': None, 'params': None, 'plan': None,
+        })
+        scanned = 0
+        for entry in read_log_entries(options['file']):
+            if cutoff and datetime.fromisoformat(entry['ts']) < cutoff:
+                continue
+            if options['endpoint'] and entry.get('endpoint') != options['endpoint']:
+                continue
+            scanned += 1
+            group = groups[fingerprint(entry['sql'])]
+            group['count'] += 1
+            group['total'] += entry['duration_ms']
+            if entry['duration_ms'] >= group['max']:
+                # Keep the slowest occurrence as the example
+                group['max'] = entry['duration_ms']
+                group['sql'], group['params'] = entry['sql'], entry.get('params')
+                group['plan'] = entry.get('plan') or group['plan']
+            group['origins'][entry.get('origin') or '?'] += 1
+            if entry.get('endpoint'):
+                group['endpoints'][entry['endpoint']] += 1
+
+        if not groups:
+            self.stdout.write('No slow queries recorded.')
+            return
+
+        ranked = sorted(groups.items(), key=lambda item: SORT_KEYS[options['sort']](item[1]), reverse=True)
+        self.stdout.write(f"{scanned} slow queries, {len(groups)} distinct shapes, ranked by {options['sort']} time\n")
+        for rank, (shape, group) in enumerate(ranked[:options['top']], 1):
+            self.stdout.write(self.style.MIGRATE_HEADING(
+                f"#{rank}  {group['count']}x  total {group['total']:.0f}ms  "
+                f"mean {group['total'] / group['count']:.1f}ms  max {group['max']:.1f}ms"
+            ))
+            self.stdout.write(f"  {shape[:500]}")
+            self.stdout.write(f"  params: {group['params']}")
+            for origin, count in group['origins'].most_common(3):
+                self.stdout.write(f"  from {origin} ({count}x)")
+            for endpoint, count in group['endpoints'].most_common(3):
+                self.stdout.write(f"  on {endpoint} ({count}x)")
+            if options['plans'] and group['plan']:
+                for line in group['plan']:
+                    self.stdout.write(f"    {line}")
+            self.stdout.write('')
@@ -0,0 +1,29 @@
+# apiApp/management/commands/smtp_stub.py
+from django.core.management.base import BaseCommand
+
+from apiApp.smtp_stub import SMTPStub
+
+
+class Command(BaseCommand):
+    help = 'Run a local SMTP server that prints received mail instead of delivering it'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--host', default='127.0.0.1')
+        parser.add_argument('--port', type=int, default=1025)
+
+    def handle(self, *args, **options):
+        def show(received):
+            message = received['message']
+            self.stdout.write(self.style.SUCCESS(
+                f"From {received['from']} to {', '.join(received['to'])}: {message['Subject']}"
+            ))
+
+        stub = SMTPStub(options['host'], options['port'], on_message=show)
+        self.stdout.write(
+            f"SMTP stub listening on {stub.host}:{stub.port} "
+            f"(EMAIL_HOST={stub.host} EMAIL_PORT={stub.port} EMAIL_USE_TLS=False)"
+        )
+        try:
+            stub.serve_forever()
+        except KeyboardInterrupt:
+            stub.stop()
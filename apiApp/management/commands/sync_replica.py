@@ -0,0 +1,49 @@
+# apiApp/management/commands/sync_replica.py
+import sqlite3
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from apiApp.db_router import replica_aliases
+
+
+class Command(BaseCommand):
+    help = (
+        'Copy the primary SQLite database onto the SQLite replicas (local testing of the '
+        'replica router). Postgres replicas are kept up to date by streaming replication.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--loop', action='store_true', help='Keep copying, simulating replication lag')
+        parser.add_argument('--interval', type=float, default=2.0, help='Seconds between copies with --loop')
+
+    def handle(self, *args, **options):
+        primary = settings.DATABASES['default']
+        if primary['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError('sync_replica only works with a SQLite primary')
+
+        replicas = [
+            alias for alias in replica_aliases()
+            if settings.DATABASES[alias]['ENGINE'] == 'django.db.backends.sqlite3'
+        ]
+        if not replicas:
+            raise CommandError('No SQLite replicas configured (set DATABASE_REPLICA_URLS)')
+
+        while True:
+            for alias in replicas:
+                self._copy(str(primary['NAME']), str(settings.DATABASES[alias]['NAME']))
+                self.stdout.write(f"Copied {primary['NAME']} -> {settings.DATABASES[alias]['NAME']} ({alias})")
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
+
+    def _copy(self, source, target):
+        # The backup API takes a consistent snapshot even while the server is writing
+        src = sqlite3.connect(source)
+        dst = sqlite3.connect(target)
+        try:
+            src.backup(dst)
+        finally:
+            dst.close()
+            src.close()
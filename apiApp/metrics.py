@@ -0,0 +1,122 @@
+# apiApp/metrics.py
+"""
+Prometheus metrics. Under gunicorn set PROMETHEUS_MULTIPROC_DIR to an
+empty, writable directory before the workers start (see gunicorn.conf.py):
+every worker then writes its samples to mmap'ed files there and /metrics
+aggregates all of them, whichever worker answers the scrape.
+"""
+import ipaddress
+import logging
+import os
+
+from django.conf import settings
+from django.db.models import Count
+from django.http import HttpResponse, HttpResponseForbidden
+from prometheus_client import (
+    CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+http_requests = Counter(
+    'http_requests_total', 'Requests handled, by URL name', ['method', 'view', 'status'],
+)
+http_latency = Histogram(
+    'http_request_duration_seconds', 'Request latency, by URL name', ['method', 'view'], buckets=LATENCY_BUCKETS,
+)
+db_queries = Histogram(
+    'http_request_db_queries', 'Database queries per request, by URL name', ['view'],
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 250),
+)
+db_time = Histogram(
+    'http_request_db_seconds', 'Time spent in the database per request, by URL name', ['view'],
+    buckets=LATENCY_BUCKETS,
+)
+cache_requests = Counter(
+    'cache_requests_total', 'Cache lookups made while serving requests', ['result'],
+)
+paystack_latency = Histogram(
+    'paystack_request_duration_seconds', 'Paystack API latency', ['operation'], buckets=LATENCY_BUCKETS,
+)
+paystack_errors = Counter(
+    'paystack_errors_total', 'Paystack calls that failed or returned status=false', ['operation', 'reason'],
+)
+checkouts = Counter(
+    'checkout_sessions_total', 'Checkout session attempts', ['result'],
+)
+fulfillments = Counter(
+    'order_fulfillments_total', 'Payment fulfilment attempts', ['result'],
+)
+trending_flushes = Counter(
+    'trending_flushes_total', 'Buffered trending events queued for the task worker', ['result'],
+)
+
+
+def observe_request(method, view, status, duration, queries, db_seconds, cache_hits, cache_misses):
+    """Called by PerformanceMiddleware once per request."""
+    try:
+        http_requests.labels(method, view, str(status)).inc()
+        http_latency.labels(method, view).observe(duration)
+        db_queries.labels(view).observe(queries)
+        db_time.labels(view).observe(db_seconds)
+        if cache_hits:
+            cache_requests.labels('hit').inc(cache_hits)
+        if cache_misses:
+            cache_requests.labels('miss').inc(cache_misses)
+    except Exception as e:
+        logger.warning(f"Could not record request metrics: {str(e)}")
+
+
+class QueueDepthCollector:
+    """Outbox and task queue depth, read from the database at scrape time."""
+
+    def collect(self):
+        from .models import OutboundEmail, Task
+
+        try:
+            email = GaugeMetricFamily('email_outbox_messages', 'Outbound emails by status', labels=['status'])
+            for row in OutboundEmail.objects.values('status').order_by().annotate(n=Count('id')):
+                email.add_metric([row['status']], row['n'])
+            yield email
+
+            tasks = GaugeMetricFamily('task_queue_tasks', 'Background tasks by queue and status', labels=['queue', 'status'])
+            for row in Task.objects.values('queue', 'status').order_by().annotate(n=Count('id')):
+                tasks.add_metric([row['queue'], row['status']], row['n'])
+            yield tasks
+        except Exception as e:
+            logger.warning(f"Could not read queue depth for metrics: {str(e)}")
+
+
+queue_registry = CollectorRegistry()
+queue_registry.register(QueueDepthCollector())
+
+
+def render_metrics():
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        # Aggregate the files written by every worker process
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry) + generate_latest(queue_registry)
+
+
+def _client_allowed(request):
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and user.is_staff:
+        return True
+    try:
+        address = ipaddress.ip_address(request.META.get('REMOTE_ADDR', ''))
+    except ValueError:
+        return False
+    return any(address in ipaddress.ip_network(net) for net in getattr(settings, 'METRICS_ALLOWED_IPS', []))
+
+
+def metrics_view(request):
+    """Prometheus text exposition; staff sessions or METRICS_ALLOWED_IPS only."""
+    if not _client_allowed(request):
+        return HttpResponseForbidden('Forbidden')
+    return HttpResponse(render_metrics(), content_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 11:12
+
+import apiApp.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiApp', '0005_productimage_derivatives'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='image',
+            field=models.ImageField(blank=True, null=True, storage=apiApp.storage.content_addressed_storage, upload_to='category_img/'),
+        ),
+        migrations.AlterField(
+            model_name='productimage',
+            name='image',
+            field=models.ImageField(storage=apiApp.storage.content_addressed_storage, upload_to='product_images/'),
+        ),
+    ]
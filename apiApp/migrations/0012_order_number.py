@@ -0,0 +1,57 @@
+# Generated by Django 5.2.18 on 2026-10-19 13:02
+
+import secrets
+
+from django.db import migrations, models
+from django.db.models.functions import Lower, Trim
+
+ALPHABET = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+
+def number_orders(apps, schema_editor):
+    Order = apps.get_model('apiApp', 'Order')
+    Order.objects.update(customer_email=Lower(Trim('customer_email')))
+
+    used = set()
+    last_id = 0
+    while True:
+        batch = list(Order.objects.filter(id__gt=last_id, order_number__isnull=True).only('id').order_by('id')[:2000])
+        if not batch:
+            break
+        for order in batch:
+            number = ''.join(secrets.choice(ALPHABET) for _ in range(8))
+            while number in used:
+                number = ''.join(secrets.choice(ALPHABET) for _ in range(8))
+            used.add(number)
+            order.order_number = number
+        Order.objects.bulk_update(batch, ['order_number'])
+        last_id = batch[-1].id
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiApp', '0011_order_item_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='order_number',
+            field=models.CharField(editable=False, max_length=8, null=True),
+        ),
+        migrations.RunPython(number_orders, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='order',
+            name='order_number',
+            field=models.CharField(editable=False, max_length=8, unique=True),
+        ),
+        migrations.RemoveIndex(
+            model_name='order',
+            name='order_history_idx',
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['customer_email', '-created_at', '-id'], name='order_history_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiApp', '0012_order_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cart',
+            name='order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='carts', to='apiApp.order'),
+        ),
+        migrations.AddField(
+            model_name='cart',
+            name='status',
+            field=models.CharField(choices=[('open', 'Open'), ('ordered', 'Ordered')], default='open', max_length=10),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 14:10
+
+from django.db import migrations, models
+
+
+def lowercase_paid(apps, schema_editor):
+    # fulfill_checkout used to store 'Paid', which is not one of the choices
+    Order = apps.get_model('apiApp', 'Order')
+    Order.objects.filter(status='Paid').update(status='paid')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiApp', '0013_cart_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='sales_recorded',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='SalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('currency', models.CharField(max_length=10)),
+                ('dimension', models.CharField(choices=[('total', 'Total'), ('product', 'Product'), ('variant', 'Product variant'), ('category', 'Category')], max_length=10)),
+                ('key', models.PositiveBigIntegerField(default=0)),
+                ('orders', models.IntegerField(default=0)),
+                ('units', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['dimension', 'key', 'date'], name='sales_rollup_key_idx')],
+                'constraints': [models.UniqueConstraint(fields=('dimension', 'currency', 'date', 'key'), name='sales_rollup_uniq')],
+            },
+        ),
+        migrations.RunPython(lowercase_paid, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiApp', '0014_sales_rollup'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductLeaderboard',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='leaderboard', serialize=False, to='apiApp.product')),
+                ('units_sold_30d', models.PositiveIntegerField(default=0)),
+                ('units_sold_all', models.PositiveIntegerField(default=0)),
+                ('rating_score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-units_sold_30d', '-units_sold_all'], name='leaderboard_sales_idx'), models.Index(fields=['-rating_score'], name='leaderboard_rating_idx')],
+            },
+        ),
+    ]
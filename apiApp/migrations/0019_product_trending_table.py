@@ -0,0 +1,45 @@
+# Generated by Django 5.2.18 on 2026-10-19 12:57
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_scores(apps, schema_editor):
+    # Product.trending_score moves to its own table; products without events get no row
+    Product = apps.get_model('apiApp', 'Product')
+    ProductTrending = apps.get_model('apiApp', 'ProductTrending')
+    ProductTrending.objects.bulk_create([
+        ProductTrending(product_id=pk, score=score)
+        for pk, score in Product.objects.exclude(trending_score=0).values_list('id', 'trending_score').iterator()
+    ], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('apiApp', '0018_product_trending_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTrending',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='trending', serialize=False, to='apiApp.product')),
+                ('score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(copy_scores, migrations.RunPython.noop),
+        migrations.RemoveIndex(
+            model_name='product',
+            name='product_trending_idx',
+        ),
+        migrations.RemoveField(
+            model_name='product',
+            name='trending_score',
+        ),
+        migrations.AddIndex(
+            model_name='producttrending',
+            index=models.Index(fields=['-score'], name='trending_score_idx'),
+        ),
+    ]
@@ -1,10 +1,14 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
 from django.conf import settings
-from django.utils.text import slugify
+from django.utils import timezone
+from .slugs import unique_slug
+from .images import refresh_image_assets
+from .storage import content_addressed_storage
 from django.contrib.auth.models import AbstractUser, BaseUserManager
 from django.db.models import Avg, Count
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
+import secrets
 import uuid
 
 class CustomUserManager(BaseUserManager):
@@ -67,6 +71,7 @@ class Category(models.Model):
         blank=True, 
         related_name='children'
     )
+    image = models.ImageField(upload_to='category_img/', storage=content_addressed_storage, blank=True, null=True)
     is_featured = models.BooleanField(default=False)
     display_order = models.PositiveIntegerField(default=0)
 
@@ -76,13 +81,7 @@ class Category(models.Model):
 
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.name)
-            unique_slug = self.slug
-            counter = 1
-            while Category.objects.filter(slug=unique_slug).exclude(pk=self.pk).exists():
-                unique_slug = f'{self.slug}-{counter}'
-                counter += 1
-            self.slug = unique_slug
+            self.slug = unique_slug(self, self.name)
         super().save(*args, **kwargs)
 
     @property
@@ -132,13 +131,7 @@ class Product(models.Model):
         is_new = self._state.adding  # Check if this is a new object
         
         if not self.slug:
-            self.slug = slugify(self.name)
-            unique_slug = self.slug
-            counter = 1
-            while Product.objects.filter(slug=unique_slug).exclude(pk=self.pk).exists():
-                unique_slug = f'{self.slug}-{counter}'
-                counter += 1
-            self.slug = unique_slug
+            self.slug = unique_slug(self, self.name)
         
         if self.old_price and self.old_price > self.price:
             discount = ((float(self.old_price) - float(self.price)) / float(self.old_price)) * 100
@@ -213,9 +206,14 @@ class ProductVariant(models.Model):
 class ProductImage(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='images')
     variant = models.ForeignKey(ProductVariant, on_delete=models.CASCADE, related_name='images', null=True, blank=True)
-    image = models.ImageField(upload_to='product_images/')
+    image = models.ImageField(upload_to='product_images/', storage=content_addressed_storage)
     is_primary = models.BooleanField(default=False)
     alt_text = models.CharField(max_length=255, blank=True, help_text='A description of the image for accessibility')
+    derivatives = models.JSONField(default=dict, blank=True, editable=False, help_text='Resized WebP/JPEG copies, see apiApp.images')
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    dominant_color = models.CharField(max_length=7, blank=True, editable=False)
+    placeholder = models.TextField(blank=True, editable=False, help_text='Tiny base64 data URI shown while the image loads')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -223,6 +221,9 @@ class ProductImage(models.Model):
         ordering = ['-is_primary', 'created_at']
 
     def save(self, *args, **kwargs):
+        image_changed = self._state.adding or not ProductImage.objects.filter(
+            pk=self.pk, image=self.image.name
+        ).exists()
         if self.is_primary:
             ProductImage.objects.filter(
                 product=self.product,
@@ -230,6 +231,13 @@ class ProductImage(models.Model):
             ).exclude(pk=self.pk).update(is_primary=False)
         super().save(*args, **kwargs)
 
+        # Measure the upload and build resized copies once, listings then serve those
+        refresh_image_assets(
+            self,
+            image_changed=image_changed,
+            derivatives=getattr(settings, 'IMAGE_DERIVATIVES_ON_SAVE', True),
+        )
+
     @property
     def image_url(self):
         if self.image and hasattr(self.image, 'url'):
@@ -240,6 +248,13 @@ class ProductImage(models.Model):
         return f"Image for {self.product.name}"
 
 class Cart(models.Model):
+    STATUS_OPEN = 'open'
+    STATUS_ORDERED = 'ordered'
+    STATUS_CHOICES = [
+        (STATUS_OPEN, 'Open'),
+        (STATUS_ORDERED, 'Ordered'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -248,6 +263,9 @@ class Cart(models.Model):
         blank=True
     )
     cart_code = models.CharField(max_length=11, unique=True, default=uuid.uuid4().hex[:11])
+    # Set together, in fulfill_checkout's transaction, once the cart is paid for
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_OPEN)
+    order = models.ForeignKey('Order', on_delete=models.SET_NULL, null=True, blank=True, related_name='carts')
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -296,8 +314,23 @@ class ProductRating(models.Model):
     def __str__(self):
         return f"{self.product.name} - {self.average_rating}★ ({self.total_reviews})"
 
+def deleted_with_product(review, origin):
+    """
+    True for a review removed by its product's delete(). `origin` is what
+    delete() was called on; recreating the product's ProductRating then
+    would make the whole delete fail on its foreign key.
+    """
+    if isinstance(origin, models.QuerySet):
+        if issubclass(origin.model, Product):
+            return True
+    elif isinstance(origin, Product):
+        return True
+    return not Product.objects.filter(pk=review.product_id).exists()
+
 @receiver([post_save, post_delete], sender=Review)
-def update_product_rating(sender, instance, **kwargs):
+def update_product_rating(sender, instance, signal, origin=None, **kwargs):
+    if signal is post_delete and deleted_with_product(instance, origin):
+        return
     product = instance.product
     reviews = Review.objects.filter(product=product)
     
@@ -317,9 +350,9 @@ def update_product_rating(sender, instance, **kwargs):
         }
     )
     
-    product.rating_field = avg_rating
+    product.rating = avg_rating
     product.review_count = reviews.count()
-    product.save(update_fields=['rating_field', 'review_count'])
+    product.save(update_fields=['rating', 'review_count'])
 
 class Wishlist(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="wishlists")
@@ -332,6 +365,23 @@ class Wishlist(models.Model):
     def __str__(self):
         return f"{self.user.email} - {self.product.name}"
 
+def variant_label(variant):
+    """'Red / M' for an order line or cart line."""
+    return ' / '.join(part for part in (variant.color.title(), variant.size.upper()) if part)
+
+# No 0/O or 1/I, so a number read out over the phone survives
+ORDER_NUMBER_ALPHABET = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+ORDER_NUMBER_LENGTH = 8
+
+
+def new_order_number():
+    return ''.join(secrets.choice(ORDER_NUMBER_ALPHABET) for _ in range(ORDER_NUMBER_LENGTH))
+
+
+def normalize_order_email(email):
+    """Order emails are stored and looked up lowercased, so lookups stay plain index equality."""
+    return (email or '').strip().lower()
+
 class Order(models.Model):
     STATUS_CHOICES = [
         ('pending', 'Pending'),
@@ -341,17 +391,40 @@ class Order(models.Model):
         ('cancelled', 'Cancelled'),
     ]
 
+    order_number = models.CharField(max_length=ORDER_NUMBER_LENGTH, unique=True, editable=False)
     paystack_checkout_id = models.CharField(max_length=255, unique=True, default=uuid.uuid4)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     currency = models.CharField(max_length=10, default='NGN')
     customer_email = models.EmailField()
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
     shipping_address = models.JSONField(null=True, blank=True)
+    # Whether the order is counted in SalesRollup (apiApp/sales.py)
+    sales_recorded = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Order history: one customer's orders, newest first
+            models.Index(fields=['customer_email', '-created_at', '-id'], name='order_history_idx'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.customer_email = normalize_order_email(self.customer_email)
+        if self.order_number:
+            return super().save(*args, **kwargs)
+        for attempt in range(5):
+            self.order_number = new_order_number()
+            try:
+                with transaction.atomic():
+                    return super().save(*args, **kwargs)
+            except IntegrityError:
+                # Retry only on a number collision (about 1 in a million at 1M orders)
+                if attempt == 4 or not Order.objects.filter(order_number=self.order_number).exists():
+                    raise
+
     def __str__(self):
-        return f"Order {self.paystack_checkout_id} - {self.status}"
+        return f"Order {self.order_number} - {self.status}"
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, related_name='items', on_delete=models.CASCADE)
@@ -359,6 +432,21 @@ class OrderItem(models.Model):
     variant = models.ForeignKey(ProductVariant, on_delete=models.SET_NULL, null=True, blank=True)
     quantity = models.PositiveIntegerField(default=1)
     price = models.DecimalField(max_digits=10, decimal_places=2)
+    # Taken at purchase so order history needs no product, variant or image lookups
+    product_name = models.CharField(max_length=200, blank=True)
+    variant_label = models.CharField(max_length=100, blank=True)
+    image_url = models.CharField(max_length=500, blank=True)
+
+    def save(self, *args, **kwargs):
+        if not self.product_name:
+            self.fill_snapshot()
+        super().save(*args, **kwargs)
+
+    def fill_snapshot(self):
+        self.product_name = self.product.name
+        self.variant_label = variant_label(self.variant) if self.variant else ''
+        image = self.product.images.order_by('-is_primary', 'id').first()
+        self.image_url = image.image.url if image and image.image else (self.product.thumbnail or '')
 
     def __str__(self):
         return f"{self.quantity}x {self.product.name} in order {self.order.id}"
@@ -434,8 +522,264 @@ class HelpCenterArticle(models.Model):
     
     def save(self, *args, **kwargs):
         if not self.slug:
-            self.slug = slugify(self.title)
+            self.slug = unique_slug(self, self.title)
         super().save(*args, **kwargs)
     
     def __str__(self):
-        return f"{self.title} ({self.get_category_display()})"
\ No newline at end of file
+        return f"{self.title} ({self.get_category_display()})"
+
+class OutboundEmail(models.Model):
+    """Email waiting to be delivered by `manage.py send_queued_mail` (see apiApp/mail.py)."""
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_PENDING, 'Pending'),
+        (STATUS_SENDING, 'Sending'),
+        (STATUS_SENT, 'Sent'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    subject = models.CharField(max_length=998)
+    body = models.TextField(blank=True)
+    html_body = models.TextField(blank=True)
+    from_email = models.CharField(max_length=320, blank=True)
+    to = models.JSONField(default=list)
+    cc = models.JSONField(default=list, blank=True)
+    bcc = models.JSONField(default=list, blank=True)
+    reply_to = models.JSONField(default=list, blank=True)
+    headers = models.JSONField(default=dict, blank=True)
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claim_token = models.UUIDField(null=True, blank=True, editable=False)
+    claimed_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{', '.join(self.to)} - {self.subject} ({self.status})"
+
+class Task(models.Model):
+    """A unit of deferred work for `manage.py run_worker` (see apiApp/taskqueue.py)."""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = (
+        (STATUS_QUEUED, 'Queued'),
+        (STATUS_RUNNING, 'Running'),
+        (STATUS_DONE, 'Done'),
+        (STATUS_FAILED, 'Failed'),
+    )
+
+    name = models.CharField(max_length=200)
+    queue = models.CharField(max_length=50, default='default')
+    args = models.JSONField(default=list, blank=True)
+    kwargs = models.JSONField(default=dict, blank=True)
+    priority = models.SmallIntegerField(default=0, help_text="Lower runs first")
+
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    run_at = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    locked_until = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    lock_token = models.UUIDField(null=True, blank=True, editable=False)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['priority', 'run_at']
+        indexes = [
+            models.Index(fields=['queue', 'status', 'priority', 'run_at'], name='task_due_idx'),
+            models.Index(fields=['status', 'locked_until'], name='task_lock_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
+
+
+class CatalogChange(models.Model):
+    """
+    One insert/update/delete of a catalog object, written by signals. The id
+    is the delta sync cursor of /api/catalog/changes/ (see apiApp/catalog_changes.py).
+    """
+    KIND_PRODUCT = 'product'
+    KIND_VARIANT = 'variant'
+    KIND_IMAGE = 'image'
+    KIND_CATEGORY = 'category'
+    KIND_CHOICES = (
+        (KIND_PRODUCT, 'Product'),
+        (KIND_VARIANT, 'Product variant'),
+        (KIND_IMAGE, 'Product image'),
+        (KIND_CATEGORY, 'Category'),
+    )
+    ACTION_UPSERT = 'upsert'
+    ACTION_DELETE = 'delete'
+    ACTION_CHOICES = (
+        (ACTION_UPSERT, 'Created or updated'),
+        (ACTION_DELETE, 'Deleted'),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    kind = models.CharField(max_length=10, choices=KIND_CHOICES)
+    object_id = models.PositiveBigIntegerField()
+    action = models.CharField(max_length=6, choices=ACTION_CHOICES)
+    # Owning product of a variant or image, so tombstones can be applied without a lookup
+    product_id = models.PositiveBigIntegerField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['kind', 'object_id'], name='catalog_change_obj_idx'),
+        ]
+
+    def __str__(self):
+        return f"#{self.pk} {self.action} {self.kind} {self.object_id}"
+
+class CatalogChangeHorizon(models.Model):
+    """Highest change id removed by retention; clients with an older cursor must resync."""
+    cursor = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Catalog changes expired up to #{self.cursor}"
+
+class SalesRollup(models.Model):
+    """
+    Sales of one day and currency for one dimension member: the whole shop
+    (key 0), a product, a variant or a category. Maintained incrementally by
+    apiApp/sales.py as orders become paid (or are cancelled after).
+    """
+    DIMENSION_TOTAL = 'total'
+    DIMENSION_PRODUCT = 'product'
+    DIMENSION_VARIANT = 'variant'
+    DIMENSION_CATEGORY = 'category'
+    DIMENSION_CHOICES = (
+        (DIMENSION_TOTAL, 'Total'),
+        (DIMENSION_PRODUCT, 'Product'),
+        (DIMENSION_VARIANT, 'Product variant'),
+        (DIMENSION_CATEGORY, 'Category'),
+    )
+
+    date = models.DateField()
+    currency = models.CharField(max_length=10)
+    dimension = models.CharField(max_length=10, choices=DIMENSION_CHOICES)
+    # Product, variant or category id; 0 for the total. Not a foreign key so
+    # history outlives deleted catalog rows
+    key = models.PositiveBigIntegerField(default=0)
+    orders = models.IntegerField(default=0)
+    units = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            # Also the index for date-range reports of one dimension and currency
+            models.UniqueConstraint(fields=['dimension', 'currency', 'date', 'key'], name='sales_rollup_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['dimension', 'key', 'date'], name='sales_rollup_key_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} {self.dimension} {self.key}: {self.revenue} {self.currency}"
+
+class ProductLeaderboard(models.Model):
+    """
+    Ranking inputs for the best-seller and top-rated rails, one row per
+    product that has sold or been reviewed. Kept current by
+    apiApp/leaderboards.py.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='leaderboard')
+    units_sold_30d = models.PositiveIntegerField(default=0)
+    units_sold_all = models.PositiveIntegerField(default=0)
+    # Bayesian average: the product's reviews shrunk towards the shop-wide mean; 0 without reviews
+    rating_score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-units_sold_30d', '-units_sold_all'], name='leaderboard_sales_idx'),
+            models.Index(fields=['-rating_score'], name='leaderboard_rating_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.units_sold_30d} sold in 30d, score {self.rating_score:.2f}"
+
+
+class ProductTrending(models.Model):
+    """
+    "Trending now" score of a product with recent views, carts, wishlists or
+    purchases. Kept off Product so product saves never write it; only
+    apiApp/trending.py does.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='trending')
+    # Forward-decayed log of the weighted events; only comparable with other products'
+    score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-score'], name='trending_score_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: trending {self.score:.2f}"
+
+
+class ProductNeighbor(models.Model):
+    """
+    "Customers also bought": a product's top-K co-purchased products, best
+    first. Rebuilt offline by apiApp/recommendations.py.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='neighbors')
+    neighbor = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    # Cosine similarity of the two products' baskets, 0-1
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            # Also the index the product page reads its neighbors through
+            models.UniqueConstraint(fields=['product', 'rank'], name='product_neighbor_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} -> {self.neighbor_id} (#{self.rank}, {self.score:.3f})"
+
+class SimilarProduct(models.Model):
+    """
+    "Similar items": a product's top-K products by attributes (categories,
+    gender, colors, sizes, price band), best first. Kept current by
+    apiApp/similarity.py.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='similar')
+    neighbor = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField()
+    # Cosine similarity of the two products' attribute vectors, 0-1
+    score = models.FloatField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='similar_product_rank_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} ~ {self.neighbor_id} (#{self.rank}, {self.score:.3f})"
+
+class SimilarProductCursor(models.Model):
+    """Last catalog change (CatalogChange id) the SimilarProduct lists reflect; null until the first full build."""
+    cursor = models.BigIntegerField(null=True)
+    updated_at = models.DateTimeField(auto_now=True)
@@ -0,0 +1,58 @@
+# apiApp/order_history.py
+"""
+Order history read path. Items carry a snapshot of the product (name,
+variant, image URL, unit price) taken at purchase, so a page of orders
+costs two queries however many orders or items a customer has: the
+orders, then their items.
+"""
+from django.db.models import Prefetch
+from rest_framework.pagination import CursorPagination
+
+from .models import Order, OrderItem, Product, ProductImage, ProductVariant, normalize_order_email, variant_label
+
+SNAPSHOT_FIELDS = ['product_name', 'variant_label', 'image_url']
+
+
+class OrderHistoryPagination(CursorPagination):
+    """Opaque cursors over created_at, newest first; stable while new orders arrive."""
+    page_size = 20
+    page_size_query_param = 'limit'
+    max_page_size = 100
+    ordering = ('-created_at', '-id')
+
+
+def history_queryset(email):
+    items = OrderItem.objects.only(
+        'id', 'order_id', 'product_id', 'variant_id', 'quantity', 'price',
+        'product_name', 'variant_label', 'image_url',
+    ).order_by('id')
+    return Order.objects.filter(customer_email=normalize_order_email(email)).only(
+        'id', 'paystack_checkout_id', 'amount', 'currency', 'status', 'created_at',
+    ).prefetch_related(Prefetch('items', queryset=items))
+
+
+def fill_snapshots(items):
+    """
+    Fill the snapshot fields of many OrderItems (saved or not) with three
+    queries in total. Used for bulk-created items, which skip save().
+    """
+    product_ids = {item.product_id for item in items}
+    variant_ids = {item.variant_id for item in items if item.variant_id}
+    products = {pk: (name, thumbnail) for pk, name, thumbnail in Product.objects.filter(
+        id__in=product_ids).values_list('id', 'name', 'thumbnail')}
+    labels = {
+        variant.id: variant_label(variant)
+        for variant in ProductVariant.objects.filter(id__in=variant_ids).only('id', 'color', 'size')
+    }
+    images = {}
+    for image in ProductImage.objects.filter(product_id__in=product_ids).only(
+        'id', 'product_id', 'image', 'is_primary',
+    ).order_by('product_id', '-is_primary', 'id'):
+        images.setdefault(image.product_id, image.image.url if image.image else '')
+
+    for item in items:
+        name, thumbnail = products.get(item.product_id, ('', ''))
+        item.product_name = name
+        item.variant_label = labels.get(item.variant_id, '')
+        item.image_url = images.get(item.product_id) or thumbnail or ''
+    return items
@@ -0,0 +1,68 @@
+# apiApp/order_lookup.py
+"""
+Order lookups that stay on an index at any table size.
+
+- by email: customer_email is stored lowercased (Order.save), so a lookup is
+  an equality on the leading column of order_history_idx
+  (customer_email, -created_at), which also serves "newest first".
+- by order number: exact match on the unique order_number index, after
+  uppercasing and dropping separators ("k7q2-m9xd" -> "K7Q2M9XD").
+- by payment reference: exact match on the unique paystack_checkout_id
+  index. Admin search falls back to a prefix search; public order tracking
+  never does, since references (order_<cart id>_<timestamp>) share long
+  predictable prefixes and a prefix would list other customers' orders.
+  `LIKE 'x%'` only uses an index on
+  SQLite with a NOCASE column and on Postgres with a pattern_ops index, so
+  the prefix is turned into the range [x, x + U+10FFFF) which any B-tree
+  index can seek; startswith is kept to filter the range exactly.
+"""
+from django.conf import settings
+
+from .models import ORDER_NUMBER_LENGTH, Order, normalize_order_email
+
+PREFIX_UPPER_BOUND = '\U0010ffff'
+
+
+def normalize_order_number(value):
+    return ''.join(ch for ch in (value or '').upper() if ch.isalnum())
+
+
+def prefix_filter(field, prefix):
+    return {
+        f'{field}__gte': prefix,
+        f'{field}__lt': prefix + PREFIX_UPPER_BOUND,
+        f'{field}__startswith': prefix,
+    }
+
+
+def orders_for_email(email, queryset=None):
+    queryset = Order.objects.all() if queryset is None else queryset
+    return queryset.filter(customer_email=normalize_order_email(email)).order_by('-created_at', '-id')
+
+
+def find_orders(value, queryset=None, prefix=False):
+    """
+    Orders matching an order number or payment reference exactly. With
+    prefix=True (staff only), no exact match falls back to up to
+    ORDER_LOOKUP_MAX_RESULTS references starting with `value` when it is at
+    least ORDER_REFERENCE_MIN_PREFIX characters long. Returns a list.
+    """
+    queryset = Order.objects.all() if queryset is None else queryset
+    value = (value or '').strip()
+    if not value:
+        return []
+
+    number = normalize_order_number(value)
+    if len(number) == ORDER_NUMBER_LENGTH:
+        orders = list(queryset.filter(order_number=number))
+        if orders:
+            return orders
+
+    orders = list(queryset.filter(paystack_checkout_id=value))
+    if orders or not prefix or len(value) < settings.ORDER_REFERENCE_MIN_PREFIX:
+        return orders
+
+    return list(
+        queryset.filter(**prefix_filter('paystack_checkout_id', value))
+        .order_by('paystack_checkout_id')[:settings.ORDER_LOOKUP_MAX_RESULTS]
+    )
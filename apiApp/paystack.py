@@ -1,7 +1,11 @@
 # apiApp/paystack.py
+import time
+
 import requests
 from django.conf import settings
 
+from .metrics import paystack_errors, paystack_latency
+
 class Paystack:
     def __init__(self):
         self.secret_key = settings.PAYSTACK_SECRET_KEY
@@ -13,23 +17,30 @@ class Paystack:
 
     def initialize_transaction(self, **kwargs):
         endpoint = "/transaction/initialize"
-        return self._make_request("POST", endpoint, kwargs)
+        return self._make_request("POST", endpoint, kwargs, operation="initialize")
 
     def verify_transaction(self, reference):
         """Verify a transaction using the reference"""
         endpoint = f"/transaction/verify/{reference}"
-        return self._make_request("GET", endpoint)
+        return self._make_request("GET", endpoint, operation="verify")
 
-    def _make_request(self, method, endpoint, data=None):
+    def _make_request(self, method, endpoint, data=None, operation="other"):
         url = f"{self.base_url}{endpoint}"
+        started = time.perf_counter()
         try:
             if method.upper() == 'GET':
                 response = requests.get(url, headers=self.headers)
             else:
                 response = requests.post(url, json=data, headers=self.headers)
-            return response.json()
+            result = response.json()
+            if result.get('status') is False:
+                paystack_errors.labels(operation, f'http_{response.status_code}').inc()
+            return result
         except requests.exceptions.RequestException as e:
+            paystack_errors.labels(operation, type(e).__name__).inc()
             return {
                 'status': False,
                 'message': str(e)
-            }
\ No newline at end of file
+            }
+        finally:
+            paystack_latency.labels(operation).observe(time.perf_counter() - started)
@@ -0,0 +1,228 @@
+# apiApp/recommendations.py
+"""
+"Customers also bought", computed offline and served from ProductNeighbor.
+
+build() reads the baskets of the last RECOMMENDATIONS_WINDOW_DAYS as
+(basket, product) pairs:
+
+- paid orders and their OrderItems,
+- open carts and their CartItems (an ordered cart repeats its order),
+- each user's wishlist,
+
+and turns them into a sparse product x product co-occurrence matrix with
+NumPy. The products of every basket are paired off, each pair (a, b) is
+encoded as the int64 key a * n + b, and equal keys are summed with
+np.unique and np.bincount, weighted per source by RECOMMENDATIONS_WEIGHTS.
+A pair is scored by cosine similarity,
+
+    score(a, b) = together(a, b) / sqrt(baskets(a) * baskets(b))
+
+so best-sellers don't become every product's neighbor. Pairs sharing fewer
+than RECOMMENDATIONS_MIN_COUNT (weighted) baskets are dropped, and each
+product keeps its RECOMMENDATIONS_TOP_K best neighbors.
+
+The matrix is recomputed on every build (seconds for millions of lines),
+but only the products whose neighbor list changed are rewritten, so a
+daily refresh touches a small part of the table. It is queued by the first
+product page view of the day, or run from cron with
+`manage.py build_recommendations`.
+"""
+import itertools
+import logging
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Cart, CartItem, OrderItem, Product, ProductNeighbor, Wishlist
+from .sales import PAID_STATUSES
+
+logger = logging.getLogger(__name__)
+
+# Scores are stored rounded so an unchanged neighbor list compares equal
+SCORE_DIGITS = 4
+
+
+def _sources(since):
+    """(weight, queryset of (basket, product) pairs) per basket source."""
+    weights = settings.RECOMMENDATIONS_WEIGHTS
+    return [
+        (weights.get('order', 0), OrderItem.objects.filter(
+            order__status__in=PAID_STATUSES, order__created_at__gte=since,
+        ).values_list('order_id', 'product_id')),
+        (weights.get('cart', 0), CartItem.objects.filter(
+            cart__status=Cart.STATUS_OPEN, cart__updated_at__gte=since,
+        ).values_list('cart_id', 'product_id')),
+        (weights.get('wishlist', 0), Wishlist.objects.filter(
+            created__gte=since,
+        ).values_list('user_id', 'product_id')),
+    ]
+
+
+def _pairs(queryset):
+    """A values_list of (basket, product) as an int64 array of shape (n, 2), without a list of tuples in between."""
+    flat = itertools.chain.from_iterable(queryset.order_by().iterator(chunk_size=10_000))
+    return np.fromiter(flat, dtype=np.int64).reshape(-1, 2)
+
+
+def _ranges(sizes):
+    """np.concatenate([np.arange(size) for size in sizes]), without the loop."""
+    ends = np.cumsum(sizes)
+    return np.arange(ends[-1] if len(ends) else 0) - np.repeat(ends - sizes, sizes)
+
+
+def _cooccurrence(pairs, catalog, max_basket):
+    """
+    One source's contribution: the number of baskets each catalog product
+    is in, and the key a * n + b of every ordered pair of distinct
+    products sharing a basket, once per basket.
+    """
+    n = len(catalog)
+    # Matrix row of each product; products outside the catalog are dropped
+    index = np.minimum(np.searchsorted(catalog, pairs[:, 1]), n - 1)
+    known = catalog[index] == pairs[:, 1]
+    baskets, items = pairs[known, 0], index[known]
+
+    # Group by basket, one entry per product and basket
+    order = np.lexsort((items, baskets))
+    baskets, items = baskets[order], items[order]
+    first = np.ones(len(baskets), dtype=bool)
+    first[1:] = (baskets[1:] != baskets[:-1]) | (items[1:] != items[:-1])
+    baskets, items = baskets[first], items[first]
+
+    starts = np.flatnonzero(np.r_[True, baskets[1:] != baskets[:-1]]) if len(baskets) else np.zeros(0, dtype=np.int64)
+    sizes = np.diff(np.r_[starts, len(baskets)])
+    # Bulk buys pair everything with everything; leave them out altogether
+    counted = sizes <= max_basket
+    occurrences = np.bincount(items[np.repeat(counted, sizes)], minlength=n)
+
+    paired = counted & (sizes > 1)
+    starts, sizes = starts[paired], sizes[paired]
+    # Every member of a basket against every member, itself included and dropped below
+    members = np.repeat(starts, sizes) + _ranges(sizes)
+    partners = np.repeat(sizes, sizes)
+    left = np.repeat(members, partners)
+    right = np.repeat(np.repeat(starts, sizes), partners) + _ranges(partners)
+    distinct = left != right
+    return occurrences, items[left[distinct]] * n + items[right[distinct]]
+
+
+def _top_neighbors(catalog, occurrences, keys, weights):
+    """{product_id: [(neighbor_id, score), ...]}, best first."""
+    n = len(catalog)
+    keys, inverse = np.unique(keys, return_inverse=True)
+    together = np.bincount(inverse, weights=weights, minlength=len(keys))
+    strong = together >= settings.RECOMMENDATIONS_MIN_COUNT
+    keys, together = keys[strong], together[strong]
+
+    rows, cols = np.divmod(keys, n)
+    scores = np.round(together / np.sqrt(occurrences[rows] * occurrences[cols]), SCORE_DIGITS)
+    # By product, then best score first; equal scores by neighbor id
+    order = np.lexsort((cols, -scores, rows))
+    rows, cols, scores = rows[order], cols[order], scores[order]
+    starts = np.flatnonzero(np.r_[True, rows[1:] != rows[:-1]])
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    top = rank < settings.RECOMMENDATIONS_TOP_K
+
+    neighbors = defaultdict(list)
+    for product_id, neighbor_id, score in zip(
+        catalog[rows[top]].tolist(), catalog[cols[top]].tolist(), scores[top].tolist(),
+    ):
+        neighbors[product_id].append((neighbor_id, score))
+    return neighbors
+
+
+def compute():
+    """Every published product's neighbors, from the baskets of the window."""
+    since = timezone.now() - timedelta(days=settings.RECOMMENDATIONS_WINDOW_DAYS)
+    catalog = np.fromiter(
+        Product.objects.filter(status='published').order_by('id').values_list('id', flat=True).iterator(),
+        dtype=np.int64,
+    )
+    if not len(catalog):
+        return {}
+
+    occurrences = np.zeros(len(catalog))
+    keys, weights = [np.zeros(0, dtype=np.int64)], [np.zeros(0)]
+    for weight, queryset in _sources(since):
+        if not weight:
+            continue
+        counts, pair_keys = _cooccurrence(_pairs(queryset), catalog, settings.RECOMMENDATIONS_MAX_BASKET)
+        occurrences += weight * counts
+        keys.append(pair_keys)
+        weights.append(np.full(len(pair_keys), float(weight)))
+    return _top_neighbors(catalog, occurrences, np.concatenate(keys), np.concatenate(weights))
+
+
+def _store(neighbors, full=False):
+    stored = defaultdict(list)
+    if not full:
+        for product_id, neighbor_id, score in ProductNeighbor.objects.order_by('product_id', 'rank').values_list(
+            'product_id', 'neighbor_id', 'score',
+        ).iterator(chunk_size=10_000):
+            stored[product_id].append((neighbor_id, score))
+    changed = sorted(pk for pk in neighbors.keys() | stored.keys() if neighbors.get(pk) != stored.get(pk))
+
+    rows = [
+        ProductNeighbor(product_id=pk, neighbor_id=neighbor_id, rank=rank, score=score)
+        for pk in changed
+        for rank, (neighbor_id, score) in enumerate(neighbors.get(pk, []))
+    ]
+    with transaction.atomic():
+        if full:
+            ProductNeighbor.objects.all().delete()
+        else:
+            for start in range(0, len(changed), 500):
+                ProductNeighbor.objects.filter(product_id__in=changed[start:start + 500]).delete()
+        ProductNeighbor.objects.bulk_create(rows, batch_size=1000)
+    return len(changed), len(rows)
+
+
+def build(full=False):
+    """
+    Recompute every product's neighbors and rewrite the products whose list
+    changed; all of them with full=True. Returns (products rewritten, rows written).
+    """
+    started = time.monotonic()
+    neighbors = compute()
+    computed = time.monotonic()
+    products, rows = _store(neighbors, full=full)
+    logger.info(
+        f"Recommendations built for {len(neighbors)} products in {computed - started:.1f}s; "
+        f"rewrote {products} products ({rows} rows) in {time.monotonic() - computed:.1f}s"
+    )
+    return products, rows
+
+
+def schedule_daily_build():
+    """Queue build() once per day, from whichever request notices first."""
+    from .tasks import build_recommendations
+
+    if cache.add(f'recommendations:built:{timezone.localdate().isoformat()}', 1, 2 * 24 * 3600):
+        build_recommendations.delay()
+
+
+def neighbor_rows(neighbors, user=None, limit=None):
+    """
+    Published neighbors from a ProductNeighbor or SimilarProduct queryset
+    filtered to one product, best first, as values() rows: one query, read
+    through the (product, rank) unique index.
+    """
+    neighbors = neighbors.filter(neighbor__status='published')
+    if not (user and user.is_authenticated):
+        neighbors = neighbors.filter(neighbor__is_exclusive=False)
+    return list(neighbors.order_by('rank').values(
+        'score', 'neighbor_id', 'neighbor__name', 'neighbor__slug', 'neighbor__price',
+        'neighbor__old_price', 'neighbor__rating', 'neighbor__thumbnail',
+    )[:limit])
+
+
+def also_bought(product, user=None, limit=None):
+    return neighbor_rows(
+        ProductNeighbor.objects.filter(product=product), user, limit or settings.RECOMMENDATIONS_TOP_K,
+    )
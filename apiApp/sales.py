@@ -0,0 +1,192 @@
+# apiApp/sales.py
+"""
+Daily sales rollups: revenue, orders and units per day and currency for
+the whole shop, each product, each variant and each category (SalesRollup).
+
+An order counts while its status is in PAID_STATUSES. Saving an order
+(signals.py) calls record_orders() after commit when the status has moved
+into or out of that set. record_orders() locks the orders, flips
+Order.sales_recorded and applies the order's contribution, or its
+negation, in one transaction. An order is therefore counted at most once,
+however often it is saved. Existing rows are locked, added to and
+written back in bulk; missing ones are inserted.
+
+Days are the local date (TIME_ZONE) of Order.created_at. Lines are counted
+under the categories their product has when the order is recorded. Orders
+are recorded after commit, so an order and its items must be created in
+the same transaction (fulfill_checkout does this). Counted orders also
+record a purchase of each of their products for the trending score
+(apiApp/trending.py).
+
+`manage.py backfill_sales_rollups` counts historical orders in chunks.
+"""
+import logging
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Q, Sum
+from django.utils import timezone
+
+from .leaderboards import update_sales
+from .models import Category, Order, OrderItem, Product, ProductVariant, SalesRollup, variant_label
+from .trending import record_event
+
+logger = logging.getLogger(__name__)
+
+PAID_STATUSES = ('paid', 'shipped', 'delivered')
+
+ORDER_FIELDS = ('id', 'currency', 'amount', 'created_at')
+
+
+def _deltas(orders, sign, deltas=None):
+    """Add each order's contribution times `sign` to {(dimension, currency, date, key): [orders, units, revenue]}."""
+    deltas = defaultdict(lambda: [0, 0, Decimal('0')]) if deltas is None else deltas
+    if not orders:
+        return deltas
+
+    lines = defaultdict(list)
+    for order_id, product_id, variant_id, quantity, price in OrderItem.objects.filter(
+        order_id__in=[order.id for order in orders],
+    ).values_list('order_id', 'product_id', 'variant_id', 'quantity', 'price'):
+        lines[order_id].append((product_id, variant_id, quantity, price))
+
+    categories = defaultdict(list)
+    for product_id, category_id in Product.category.through.objects.filter(
+        product_id__in={line[0] for order_lines in lines.values() for line in order_lines},
+    ).values_list('product_id', 'category_id'):
+        categories[product_id].append(category_id)
+
+    for order in orders:
+        day = timezone.localtime(order.created_at).date()
+        # Units and revenue of every dimension member this order touches
+        members = defaultdict(lambda: [0, Decimal('0')])
+        for product_id, variant_id, quantity, price in lines[order.id]:
+            keys = [(SalesRollup.DIMENSION_PRODUCT, product_id)]
+            if variant_id:
+                keys.append((SalesRollup.DIMENSION_VARIANT, variant_id))
+            keys += [(SalesRollup.DIMENSION_CATEGORY, category_id) for category_id in categories[product_id]]
+            for key in keys:
+                members[key][0] += quantity
+                members[key][1] += price * quantity
+
+        total = deltas[(SalesRollup.DIMENSION_TOTAL, order.currency, day, 0)]
+        total[0] += sign
+        total[1] += sign * sum(quantity for _, _, quantity, _ in lines[order.id])
+        total[2] += sign * order.amount
+        for (dimension, key), (units, revenue) in members.items():
+            row = deltas[(dimension, order.currency, day, key)]
+            row[0] += sign
+            row[1] += sign * units
+            row[2] += sign * revenue
+    return deltas
+
+
+def _apply(deltas):
+    """Add deltas to their rows: lock and update the existing ones in bulk, insert the rest."""
+    if not deltas:
+        return
+    groups = defaultdict(list)
+    for dimension, currency, day, key in deltas:
+        groups[(dimension, currency, day)].append(key)
+    query = Q()
+    for (dimension, currency, day), keys in groups.items():
+        query |= Q(dimension=dimension, currency=currency, date=day, key__in=keys)
+
+    existing = {
+        (row.dimension, row.currency, row.date, row.key): row
+        for row in SalesRollup.objects.select_for_update().filter(query)
+    }
+    rows = []
+    for lookup, row in existing.items():
+        orders, units, revenue = deltas[lookup]
+        rows.append((row.orders + orders, row.units + units, row.revenue + revenue, row.id))
+    if rows:
+        # One prepared statement; bulk_update's CASE expressions cost more than the writes
+        table = connection.ops.quote_name(SalesRollup._meta.db_table)
+        with connection.cursor() as cursor:
+            cursor.executemany(f"UPDATE {table} SET orders = %s, units = %s, revenue = %s WHERE id = %s", rows)
+
+    missing = {lookup: delta for lookup, delta in deltas.items() if lookup not in existing}
+    try:
+        with transaction.atomic():
+            SalesRollup.objects.bulk_create([
+                SalesRollup(dimension=dimension, currency=currency, date=day, key=key,
+                            orders=orders, units=units, revenue=revenue)
+                for (dimension, currency, day, key), (orders, units, revenue) in missing.items()
+            ], batch_size=500)
+    except IntegrityError:
+        # Another transaction inserted some of these rows first; they exist now
+        _apply(missing)
+
+
+def record_orders(order_ids, trending=True):
+    """
+    Count the given orders that are paid and not yet counted, and uncount
+    counted ones that no longer are. Returns (counted, uncounted).
+    trending=False leaves the trending score alone (recounting after a rebuild).
+    """
+    with transaction.atomic():
+        orders = Order.objects.select_for_update().filter(id__in=order_ids).only(*ORDER_FIELDS)
+        counted = list(orders.filter(sales_recorded=False, status__in=PAID_STATUSES))
+        uncounted = list(orders.filter(sales_recorded=True).exclude(status__in=PAID_STATUSES))
+        if not counted and not uncounted:
+            return 0, 0
+
+        Order.objects.filter(id__in=[order.id for order in counted]).update(sales_recorded=True)
+        Order.objects.filter(id__in=[order.id for order in uncounted]).update(sales_recorded=False)
+        deltas = _deltas(uncounted, -1, _deltas(counted, 1))
+        _apply(deltas)
+        update_sales(key for dimension, _, _, key in deltas if dimension == SalesRollup.DIMENSION_PRODUCT)
+
+    # Purchases trend once per order, like they are counted once; uncounting leaves them to decay
+    created = {order.id: order.created_at for order in counted} if trending else {}
+    for order_id, product_id in OrderItem.objects.filter(order_id__in=created).values_list('order_id', 'product_id'):
+        record_event(product_id, 'purchase', at=created[order_id])
+    return len(counted), len(uncounted)
+
+
+def record_order_after_commit(order_id):
+    def record():
+        try:
+            record_orders([order_id])
+        except Exception as e:
+            # The backfill command picks the order up later
+            logger.error(f"Failed to update sales rollups for order {order_id}: {str(e)}", exc_info=True)
+
+    transaction.on_commit(record)
+
+
+def _names(dimension, keys):
+    if dimension == SalesRollup.DIMENSION_PRODUCT:
+        return dict(Product.objects.filter(id__in=keys).values_list('id', 'name'))
+    if dimension == SalesRollup.DIMENSION_CATEGORY:
+        return dict(Category.objects.filter(id__in=keys).values_list('id', 'name'))
+    return {
+        variant.id: f"{variant.product.name} ({variant_label(variant)})"
+        for variant in ProductVariant.objects.filter(id__in=keys).select_related('product').only(
+            'id', 'color', 'size', 'product__name',
+        )
+    }
+
+
+def sales_report(dimension, start, end, currency=None, limit=50):
+    """
+    Sales between two dates (inclusive) from the rollups. The total is a
+    daily series; products, variants and categories are ranked by revenue
+    over the whole range.
+    """
+    rows = SalesRollup.objects.filter(dimension=dimension, date__range=(start, end))
+    if currency:
+        rows = rows.filter(currency=currency)
+    sums = {'orders': Sum('orders'), 'units': Sum('units'), 'revenue': Sum('revenue')}
+
+    if dimension == SalesRollup.DIMENSION_TOTAL:
+        return list(rows.values('date', 'currency').annotate(**sums).order_by('date', 'currency'))
+
+    results = list(rows.values('key', 'currency').annotate(**sums).order_by('-revenue', 'key')[:limit])
+    names = _names(dimension, [row['key'] for row in results])
+    for row in results:
+        row['id'] = row.pop('key')
+        row['name'] = names.get(row['id'], '')
+    return results
@@ -11,6 +11,8 @@ from rest_framework import serializers
 from django.db.models import Avg, Count
 from django.core.exceptions import ValidationError
 from django.db.models import Sum
+from .images import image_srcset, thumbnail_url
+from .recommendations import also_bought
 
 User = get_user_model()
 
@@ -112,6 +114,7 @@ class ProductListSerializer(serializers.ModelSerializer):
     status = serializers.SerializerMethodField()
     quantity = serializers.SerializerMethodField()
     images = serializers.SerializerMethodField()
+    imageSet = serializers.SerializerMethodField()
     colors = serializers.SerializerMethodField()
     sizes = serializers.SerializerMethodField()
     createdAt = serializers.DateTimeField(source='created_at', format='%Y-%m-%dT%H:%M:%S.000Z')
@@ -121,7 +124,7 @@ class ProductListSerializer(serializers.ModelSerializer):
         fields = [
             'id', 'name', 'slug', 'isExclusive', 'gender', 'price', 'oldPrice',
             'discount', 'category', 'subCategory', 'rating', 'status', 'quantity',
-            'images', 'colors', 'sizes', 'description', 'createdAt'
+            'images', 'imageSet', 'colors', 'sizes', 'description', 'createdAt'
         ]
 
     def get_category(self, obj):
@@ -142,22 +145,26 @@ class ProductListSerializer(serializers.ModelSerializer):
     def get_quantity(self, obj):
         return sum(v.quantity for v in obj.variants.all())
 
-    def get_images(self, obj):
+    def _ordered_images(self, obj):
+        # Sort the prefetched images in Python rather than issuing two filtered queries
+        images = sorted(obj.images.all(), key=lambda img: (not img.is_primary, img.id))
+        images = [img for img in images if img and img.image]
         request = self.context.get('request')
         if obj.is_exclusive and (not request or not request.user.is_authenticated):
             # Return only the first image or a placeholder for exclusive products
-            first_image = obj.images.filter(is_primary=True).first() or obj.images.first()
-            if first_image and first_image.image:
-                return [request.build_absolute_uri(first_image.image.url)] if request else [first_image.image.url]
-            return []
-            
-        primary_images = obj.images.filter(is_primary=True).order_by('id')
-        other_images = obj.images.filter(is_primary=False).order_by('id')
-        all_images = list(primary_images) + list(other_images)
-        
+            return images[:1]
+        return images
+
+    def get_images(self, obj):
+        request = self.context.get('request')
+        images = self._ordered_images(obj)
         if request:
-            return [request.build_absolute_uri(img.image.url) for img in all_images if img and img.image]
-        return [img.image.url for img in all_images if img and img.image]
+            return [request.build_absolute_uri(img.image.url) for img in images]
+        return [img.image.url for img in images]
+
+    def get_imageSet(self, obj):
+        request = self.context.get('request')
+        return [image_srcset(img, request) for img in self._ordered_images(obj)]
 
     def get_colors(self, obj):
         if obj.is_exclusive and not self.context.get('request', None) or not self.context['request'].user.is_authenticated:
@@ -181,6 +188,7 @@ class ProductListSerializer(serializers.ModelSerializer):
                 'isExclusive': True,
                 'slug': instance.slug,
                 'images': self.get_images(instance),  # Limited images
+                'imageSet': self.get_imageSet(instance),
                 'message': 'Login to view this exclusive product',
                 'requires_auth': True
             }
@@ -213,11 +221,26 @@ class ProductRatingSerializer(serializers.ModelSerializer):
         fields =[ "id", "average_rating", "total_reviews"]
 
 
+def related_product(row):
+    """Compact product card for a neighbor_rows() row (also bought, similar items)."""
+    return {
+        'id': str(row['neighbor_id']),
+        'name': row['neighbor__name'],
+        'slug': row['neighbor__slug'],
+        'price': str(round(float(row['neighbor__price']), 2)),
+        'oldPrice': str(round(float(row['neighbor__old_price']), 2)) if row['neighbor__old_price'] is not None else None,
+        'rating': float(row['neighbor__rating']),
+        'thumbnail': row['neighbor__thumbnail'] or '',
+        'score': row['score'],
+    }
+
+
 class ProductDetailSerializer(ProductListSerializer):
     variants = serializers.SerializerMethodField()
     available_colors = serializers.SerializerMethodField()
     available_sizes = serializers.SerializerMethodField()
     reviewStats = serializers.SerializerMethodField()
+    alsoBought = serializers.SerializerMethodField()
     
     class Meta(ProductListSerializer.Meta):
         fields = ProductListSerializer.Meta.fields + [
@@ -225,6 +248,7 @@ class ProductDetailSerializer(ProductListSerializer):
             'available_colors',
             'available_sizes',
             'reviewStats',
+            'alsoBought',
             'description'
         ]
     
@@ -267,6 +291,11 @@ class ProductDetailSerializer(ProductListSerializer):
             'totalReviews': rating_count,
             'breakdown': breakdown
         }
+
+    def get_alsoBought(self, obj):
+        # Precomputed co-purchases (apiApp/recommendations.py), one query
+        request = self.context.get('request')
+        return [related_product(row) for row in also_bought(obj, request.user if request else None)]
         
 
 class ProductImageSerializer(serializers.ModelSerializer):
@@ -318,13 +347,16 @@ class CartItemSerializer(serializers.ModelSerializer):
         fields = ["id", "product", "variant", "quantity", "sub_total"]
     
     def get_product(self, obj):
+        request = self.context.get('request')
+        first_image = obj.product.images.first()
         return {
             "id": obj.product.id,
             "name": obj.product.name,
             "price": str(obj.product.price),
-            "image": self.context['request'].build_absolute_uri(
-                obj.product.images.first().image.url
-            ) if obj.product.images.exists() else None
+            "image": (
+                request.build_absolute_uri(first_image.image.url) if request else first_image.image.url
+            ) if first_image and first_image.image else None,
+            "thumbnail": thumbnail_url(first_image, request) if first_image else None,
         }
     
     def get_variant(self, obj):
@@ -408,7 +440,46 @@ class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(read_only=True, many=True)
     class Meta:
         model = Order 
-        fields = ["id", "stripe_checkout_id", "amount", "items", "status", "created_at"]
+        fields = ["id", "order_number", "paystack_checkout_id", "amount", "items", "status", "created_at"]
+
+
+class OrderHistoryItemSerializer(serializers.ModelSerializer):
+    """An order line from its purchase-time snapshot; no product queries."""
+    product = serializers.IntegerField(source='product_id')
+    variant = serializers.IntegerField(source='variant_id', allow_null=True)
+    name = serializers.CharField(source='product_name')
+    image = serializers.SerializerMethodField()
+    unitPrice = serializers.DecimalField(source='price', max_digits=10, decimal_places=2, coerce_to_string=False)
+    lineTotal = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderItem
+        fields = ['id', 'product', 'variant', 'name', 'variant_label', 'image', 'quantity', 'unitPrice', 'lineTotal']
+
+    def get_image(self, obj):
+        request = self.context.get('request')
+        if obj.image_url and request and obj.image_url.startswith('/'):
+            return request.build_absolute_uri(obj.image_url)
+        return obj.image_url
+
+    def get_lineTotal(self, obj):
+        return float(obj.price * obj.quantity)
+
+
+class OrderHistorySerializer(serializers.ModelSerializer):
+    number = serializers.CharField(source='order_number')
+    reference = serializers.CharField(source='paystack_checkout_id')
+    amount = serializers.DecimalField(max_digits=10, decimal_places=2, coerce_to_string=False)
+    itemCount = serializers.SerializerMethodField()
+    items = OrderHistoryItemSerializer(many=True, read_only=True)
+    createdAt = serializers.DateTimeField(source='created_at')
+
+    class Meta:
+        model = Order
+        fields = ['id', 'number', 'reference', 'status', 'amount', 'currency', 'itemCount', 'items', 'createdAt']
+
+    def get_itemCount(self, obj):
+        return sum(item.quantity for item in obj.items.all())
 
 
 
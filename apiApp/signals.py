@@ -1,8 +1,22 @@
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import m2m_changed, post_save, post_delete, pre_delete
+from django.db.backends.signals import connection_created
+from django.db import transaction
 from django.dispatch import receiver
-from django.db.models import Avg, Count
+from django.utils import timezone
+from django.db.models import Avg, Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.contrib.auth import get_user_model
-from apiApp.models import ProductRating, Review, Product
+from rest_framework.authtoken.models import Token
+from apiApp.models import (
+    CatalogChange, Category, Order, ProductImage, ProductRating, ProductVariant, Review, Product, deleted_with_product,
+)
+from apiApp.authentication import invalidate_token, invalidate_user_tokens
+from apiApp.slow_queries import attach as attach_slow_query_sampler
+from apiApp.db_tuning import configure_connection
+from apiApp.catalog_changes import record_change, record_changes
+from apiApp.sales import PAID_STATUSES, record_order_after_commit
+from apiApp.leaderboards import update_rating
+from apiApp.similarity import schedule_update as schedule_similar_update
 
 User = get_user_model()
 
@@ -12,6 +26,22 @@ def update_user_profile(sender, instance, created, **kwargs):
         # Any additional logic when a user is created
         pass
 
+@receiver(post_save, sender=User)
+def invalidate_cached_auth(sender, instance, created, update_fields=None, **kwargs):
+    """
+    Drop cached token lookups when a user changes (deactivation, staff
+    flags, profile edits) so CachedTokenAuthentication never serves a stale
+    user. Logins only touch last_login and keep the cache warm.
+    """
+    if created or (update_fields and set(update_fields) <= {'last_login'}):
+        return
+    invalidate_user_tokens(instance.pk)
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(sender, instance, **kwargs):
+    # logout_user deletes request.auth; the token must stop working everywhere at once
+    invalidate_token(instance.key)
+
 def update_product_rating_stats(product):
     """
     Helper function to update rating stats for a product
@@ -39,20 +69,68 @@ def update_product_rating_stats(product):
     )
     
     # Update the product's rating fields
-    product.rating_field = rating_avg
+    product.rating = rating_avg
     product.review_count = total_reviews
-    product.save(update_fields=['rating_field', 'review_count'])
+    product.save(update_fields=['rating', 'review_count'])
     
     return product_rating
 
+def rebuild_product_rating_stats(products=None, batch_size=1000):
+    """
+    Recompute ProductRating rows and Product.rating/review_count for a whole
+    queryset of products in one pass. Used after bulk inserts, which skip
+    the per-review signal.
+    """
+    if products is None:
+        products = Product.objects.all()
+    reviews = Review.objects.filter(product__in=products.values('id'))
+
+    product_reviews = Review.objects.filter(product=OuterRef('pk')).values('product')
+    products.update(
+        rating=Coalesce(Subquery(product_reviews.annotate(avg=Avg('rating')).values('avg')), 0.0),
+        review_count=Coalesce(Subquery(product_reviews.annotate(count=Count('id')).values('count')), 0),
+    )
+
+    breakdowns = {}
+    for row in reviews.values('product_id', 'rating').annotate(count=Count('id')).order_by():
+        breakdown = breakdowns.setdefault(row['product_id'], {str(r): 0 for r in range(1, 6)})
+        breakdown[str(row['rating'])] = row['count']
+
+    ProductRating.objects.filter(product__in=products.values('id')).delete()
+    stats = []
+    for product_id in products.values_list('id', flat=True).iterator(chunk_size=batch_size):
+        breakdown = breakdowns.get(product_id, {str(r): 0 for r in range(1, 6)})
+        total = sum(breakdown.values())
+        average = sum(int(r) * c for r, c in breakdown.items()) / total if total else 0.0
+        stats.append(ProductRating(
+            product_id=product_id,
+            average_rating=round(average, 1),
+            total_reviews=total,
+            rating_breakdown=breakdown,
+        ))
+        if len(stats) >= batch_size:
+            ProductRating.objects.bulk_create(stats)
+            stats = []
+    ProductRating.objects.bulk_create(stats)
+
 @receiver([post_save, post_delete], sender=Review)
-def handle_review_update(sender, instance, **kwargs):
+def handle_review_update(sender, instance, signal, origin=None, **kwargs):
     """
     Handle both save and delete operations for reviews
     """
+    if signal is post_delete and deleted_with_product(instance, origin):
+        return
     product = instance.product
     update_product_rating_stats(product)
 
+@receiver([post_save, post_delete], sender=Review)
+def update_rating_leaderboard(sender, instance, raw=False, **kwargs):
+    # After commit: a review deleted with its product must not recreate the product's row
+    if raw:
+        return
+    product_id = instance.product_id
+    transaction.on_commit(lambda: update_rating(product_id))
+
 @receiver(post_save, sender=Product)
 def create_product_rating(sender, instance, created, **kwargs):
     """
@@ -64,4 +142,100 @@ def create_product_rating(sender, instance, created, **kwargs):
             average_rating=0.0,
             total_reviews=0,
             rating_breakdown={'1': 0, '2': 0, '3': 0, '4': 0, '5': 0}
-        )
\ No newline at end of file
+        )
+
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver([post_save, post_delete], sender=ProductImage)
+def touch_product(sender, instance, **kwargs):
+    """
+    Stock, prices and images live on variants and images; bump the product's
+    updated_at so incremental feed builds (apiApp/feeds.py) pick it up.
+    """
+    Product.objects.filter(pk=instance.product_id).update(updated_at=timezone.now())
+
+
+@receiver(post_save, sender=Category)
+@receiver(pre_delete, sender=Category)
+def touch_category_products(sender, instance, raw=False, **kwargs):
+    # Feed product_type is built from category names; before a delete, while the links still exist
+    if raw:
+        return
+    Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+
+@receiver(m2m_changed, sender=Product.category.through)
+def touch_recategorized_products(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            Product.objects.filter(pk=instance.pk).update(updated_at=timezone.now())
+    elif action in ('post_add', 'post_remove') and pk_set:
+        Product.objects.filter(pk__in=pk_set).update(updated_at=timezone.now())
+    elif action == 'pre_clear':
+        Product.objects.filter(category=instance).update(updated_at=timezone.now())
+
+CATALOG_KINDS = {
+    Product: CatalogChange.KIND_PRODUCT,
+    ProductVariant: CatalogChange.KIND_VARIANT,
+    ProductImage: CatalogChange.KIND_IMAGE,
+    Category: CatalogChange.KIND_CATEGORY,
+}
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_save, sender=ProductImage)
+@receiver(post_save, sender=Category)
+def log_catalog_save(sender, instance, raw=False, **kwargs):
+    # Delta sync log for /api/catalog/changes/ (apiApp/catalog_changes.py)
+    if raw:
+        return
+    record_change(CATALOG_KINDS[sender], instance.pk, product_id=getattr(instance, 'product_id', None))
+
+@receiver(post_delete, sender=Product)
+@receiver(post_delete, sender=ProductVariant)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_delete, sender=Category)
+def log_catalog_delete(sender, instance, **kwargs):
+    record_change(
+        CATALOG_KINDS[sender], instance.pk, CatalogChange.ACTION_DELETE,
+        product_id=getattr(instance, 'product_id', None),
+    )
+
+@receiver(m2m_changed, sender=Product.category.through)
+def log_product_categories(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ('post_add', 'post_remove', 'post_clear'):
+            record_change(CatalogChange.KIND_PRODUCT, instance.pk)
+    elif action in ('post_add', 'post_remove') and pk_set:
+        # category.products.add(...): every product whose categories changed
+        record_changes(CatalogChange.KIND_PRODUCT, sorted(pk_set))
+    elif action == 'pre_clear':
+        # pk_set is not sent for clear(), so read the products before they go
+        record_changes(CatalogChange.KIND_PRODUCT, list(instance.products.values_list('id', flat=True)))
+
+@receiver([post_save, post_delete], sender=Product)
+@receiver([post_save, post_delete], sender=ProductVariant)
+@receiver(m2m_changed, sender=Product.category.through)
+def queue_similar_products(sender, raw=False, action=None, **kwargs):
+    # Similar items (apiApp/similarity.py) catch up with attribute edits shortly after
+    if raw or action not in (None, 'post_add', 'post_remove', 'post_clear'):
+        return
+    transaction.on_commit(schedule_similar_update)
+
+@receiver(post_save, sender=Order)
+def record_order_sales(sender, instance, raw=False, **kwargs):
+    # Sales rollups (apiApp/sales.py): count an order once paid, uncount it if cancelled later
+    if raw:
+        return
+    if (instance.status in PAID_STATUSES) != instance.sales_recorded:
+        record_order_after_commit(instance.pk)
+
+@receiver(connection_created)
+def install_slow_query_sampler(sender, connection, **kwargs):
+    # Every new connection (requests, commands, task workers) gets the sampler
+    attach_slow_query_sampler(connection)
+
+
+@receiver(connection_created)
+def tune_connection(sender, connection, **kwargs):
+    # WAL, busy_timeout and cache pragmas on SQLite (see apiApp/db_tuning.py)
+    configure_connection(connection)
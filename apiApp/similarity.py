@@ -0,0 +1,272 @@
+# apiApp/similarity.py
+"""
+"Similar items" by product attributes, for products without the purchase
+history "customers also bought" (apiApp/recommendations.py) needs.
+
+Every published product becomes a float32 feature vector with one group of
+columns per attribute:
+
+- category: a column per category the product is in,
+- gender: men and women columns; unisex sets both,
+- color, size: a column per value (case-insensitive),
+- price: a column per price band, each band SIMILAR_PRODUCTS_PRICE_STEP
+  times wider than the one below; the bands either side get half weight
+  so that close prices across a band edge still match.
+
+Each group is scaled to unit length times its SIMILAR_PRODUCTS_WEIGHTS
+weight, so ten colors count no more than two, and the whole vector to unit
+length, so a dot product is the cosine similarity. Scores are computed as
+X[block] @ X.T, SIMILAR_PRODUCTS_BLOCK_MB of scores at a time, and each
+product keeps its SIMILAR_PRODUCTS_TOP_K best (ties to the lower id).
+
+A vector depends on nothing but the product's own attributes, so when some
+products change only these lists can change: the changed products' own,
+those listing a changed product, and those where a changed product now
+scores at least as well as their last entry. update() reads the changed
+products from the catalog change log (apiApp/catalog_changes.py) after
+the cursor it saved last time (SimilarProductCursor) and recomputes only
+those lists, outside any transaction. Saving a product, a
+variant or a product's categories queues it (signals.py), at most once per
+SIMILAR_PRODUCTS_DEBOUNCE_SECONDS; `manage.py build_similar_products
+--full` rebuilds everything.
+"""
+import logging
+import math
+import time
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, Min
+
+from .catalog_changes import current_cursor, horizon
+from .models import CatalogChange, Product, SimilarProduct, SimilarProductCursor
+from .recommendations import neighbor_rows
+
+logger = logging.getLogger(__name__)
+
+QUEUED_CACHE_KEY = 'similar-products:queued'
+# Scores are kept to 4 decimals; as integers they also break ties exactly
+SCORE_SCALE = 10_000
+# Peak bytes per score cell in _top_k: float32 scores, their partitioned copy, a mask
+BYTES_PER_SCORE = 12
+GENDERS = {'men': ('men',), 'women': ('women',), 'unisex': ('men', 'women')}
+
+
+def price_band(price):
+    return math.floor(math.log(max(float(price), 1.0)) / math.log(settings.SIMILAR_PRODUCTS_PRICE_STEP))
+
+
+def vectors():
+    """(ids, X): published product ids, ascending, and one unit attribute vector per row of X."""
+    products = list(Product.objects.filter(status='published').order_by('id').values_list(
+        'id', 'gender', 'colors', 'sizes', 'price',
+    ))
+    ids = np.array([row[0] for row in products], dtype=np.int64)
+    position = {pk: i for i, pk in enumerate(ids.tolist())}
+
+    # (rows, tokens, values) per attribute group
+    groups = {name: ([], [], []) for name in settings.SIMILAR_PRODUCTS_WEIGHTS}
+
+    def add(group, row, token, value=1.0):
+        if group in groups:
+            groups[group][0].append(row)
+            groups[group][1].append(token)
+            groups[group][2].append(value)
+
+    for row, (pk, gender, colors, sizes, price) in enumerate(products):
+        for token in GENDERS.get(gender, ()):
+            add('gender', row, token)
+        for color in {str(color).strip().lower() for color in colors or []} - {''}:
+            add('color', row, color)
+        for size in {str(size).strip().upper() for size in sizes or []} - {''}:
+            add('size', row, size)
+        band = price_band(price)
+        add('price', row, band)
+        add('price', row, band - 1, 0.5)
+        add('price', row, band + 1, 0.5)
+    for pk, category_id in Product.category.through.objects.filter(
+        product__status='published',
+    ).values_list('product_id', 'category_id'):
+        if pk in position:
+            add('category', position[pk], category_id)
+
+    rows, cols, values, width = [], [], [], 0
+    for name, weight in settings.SIMILAR_PRODUCTS_WEIGHTS.items():
+        group_rows, tokens, group_values = groups[name]
+        if not weight or not group_rows:
+            continue
+        vocabulary = {token: column for column, token in enumerate(dict.fromkeys(tokens))}
+        group_rows = np.array(group_rows, dtype=np.int64)
+        group_values = np.array(group_values)
+        lengths = np.sqrt(np.bincount(group_rows, weights=group_values ** 2, minlength=len(ids)))
+        rows.append(group_rows)
+        cols.append(width + np.array([vocabulary[token] for token in tokens], dtype=np.int64))
+        values.append(weight * group_values / lengths[group_rows])
+        width += len(vocabulary)
+
+    X = np.zeros((len(ids), width), dtype=np.float32)
+    if rows:
+        X[np.concatenate(rows), np.concatenate(cols)] = np.concatenate(values)
+    X /= np.maximum(np.linalg.norm(X, axis=1), 1e-12)[:, None]
+    return ids, X
+
+
+def _block_rows(n):
+    return max(1, settings.SIMILAR_PRODUCTS_BLOCK_MB * 2 ** 20 // (max(n, 1) * BYTES_PER_SCORE))
+
+
+def _top_k(X, rows):
+    """{row: [(row, score), ...]} for the given rows of X: their best other rows, best first."""
+    n = len(X)
+    k = min(settings.SIMILAR_PRODUCTS_TOP_K, n - 1)
+    if k <= 0:
+        return {row: [] for row in rows.tolist()}
+
+    block = _block_rows(n)
+    results = {row: [] for row in rows.tolist()}
+    for start in range(0, len(rows), block):
+        chunk = rows[start:start + block]
+        scores = X[chunk] @ X.T
+        scores[np.arange(len(chunk)), chunk] = -1
+        # Everything that can round to the k-th best score or above, then
+        # rank just those exactly: rounded score, then lower row first
+        kth = np.partition(scores, n - k, axis=1)[:, n - k]
+        block_rows, cols = np.nonzero(scores >= (kth - 1 / SCORE_SCALE)[:, None])
+        rounded = np.rint(scores[block_rows, cols] * SCORE_SCALE).astype(np.int64)
+        order = np.lexsort((cols, -rounded, block_rows))
+        block_rows, cols, rounded = block_rows[order], cols[order], rounded[order]
+        starts = np.flatnonzero(np.r_[True, block_rows[1:] != block_rows[:-1]])
+        rank = np.arange(len(block_rows)) - np.repeat(starts, np.diff(np.r_[starts, len(block_rows)]))
+        keep = (rank < k) & (rounded > 0)
+        for row, col, score in zip(chunk[block_rows[keep]].tolist(), cols[keep].tolist(), (rounded[keep] / SCORE_SCALE).tolist()):
+            results[row].append((col, score))
+    return results
+
+
+def _changed_products(cursor, upto):
+    changes = CatalogChange.objects.filter(id__gt=cursor, id__lte=upto)
+    product_ids = set(changes.filter(kind=CatalogChange.KIND_PRODUCT).values_list('object_id', flat=True))
+    product_ids |= set(changes.filter(
+        kind=CatalogChange.KIND_VARIANT, product_id__isnull=False,
+    ).values_list('product_id', flat=True))
+    return product_ids
+
+
+def _affected(ids, X, changed):
+    """Rows whose list may differ after the products in `changed` changed."""
+    position = {pk: i for i, pk in enumerate(ids.tolist())}
+    changed_rows = np.array(sorted(position[pk] for pk in changed if pk in position), dtype=np.int64)
+    listing = SimilarProduct.objects.filter(neighbor_id__in=changed).values_list('product_id', flat=True)
+    affected = set(changed_rows.tolist()) | {position[pk] for pk in listing if pk in position}
+    if not len(changed_rows):
+        return affected
+
+    # A full list is beaten by scoring at least its last entry, a short one by any match
+    threshold = np.ones(len(ids), dtype=np.int64)
+    for pk, low, count in SimilarProduct.objects.values('product_id').annotate(
+        low=Min('score'), count=Count('id'),
+    ).values_list('product_id', 'low', 'count'):
+        if pk in position and count >= settings.SIMILAR_PRODUCTS_TOP_K:
+            threshold[position[pk]] = round(low * SCORE_SCALE)
+
+    best = np.zeros(len(ids), dtype=np.int64)
+    block = _block_rows(len(ids))
+    for start in range(0, len(changed_rows), block):
+        scores = np.rint(X @ X[changed_rows[start:start + block]].T * SCORE_SCALE).astype(np.int64)
+        best = np.maximum(best, scores.max(axis=1))
+    return affected | set(np.flatnonzero(best >= threshold).tolist())
+
+
+def _store(lists, full=False, clear=()):
+    rows = [
+        (pk, neighbor_id, rank, score)
+        for pk, neighbors in lists.items()
+        for rank, (neighbor_id, score) in enumerate(neighbors)
+    ]
+    clear = sorted(set(clear) | set(lists))
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(SimilarProduct._meta.get_field(name).column) for name in ('product', 'neighbor', 'rank', 'score'))
+    with transaction.atomic():
+        if full:
+            SimilarProduct.objects.all().delete()
+        else:
+            for start in range(0, len(clear), 500):
+                SimilarProduct.objects.filter(product_id__in=clear[start:start + 500]).delete()
+        # One prepared statement; a full build writes TOP_K rows per product, 5x faster than bulk_create
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {quote(SimilarProduct._meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s)", rows,
+            )
+    return len(rows)
+
+
+def _advance(since, upto):
+    """Move the cursor from `since` to `upto`; False if another update moved it first. Call in a transaction."""
+    state = SimilarProductCursor.objects.select_for_update().get(pk=1)
+    if state.cursor != since:
+        return False
+    state.cursor = upto
+    state.save(update_fields=['cursor', 'updated_at'])
+    return True
+
+
+def update(full=False):
+    """
+    Recompute the lists the catalog changes since the last run can have
+    altered; every list with full=True, or when there is no usable cursor.
+    Returns (products recomputed, rows written).
+
+    The lists are computed outside any transaction, so writers are not
+    held up by the cursor lock. They are stored, and the cursor advanced,
+    in one short transaction, and only if no other update moved the cursor
+    in the meantime; otherwise this one starts over from where that one ended.
+    """
+    started = time.monotonic()
+    since = SimilarProductCursor.objects.get_or_create(pk=1)[0].cursor
+    upto = current_cursor()
+    rebuild = full or since is None or since < horizon()
+    changed = set() if rebuild else _changed_products(since, upto)
+    if not rebuild and not changed:
+        with transaction.atomic():
+            if not _advance(since, upto):
+                return update(full=full)
+        return 0, 0
+
+    ids, X = vectors()
+    rows = np.arange(len(ids)) if rebuild else np.array(sorted(_affected(ids, X, changed)), dtype=np.int64)
+    lists = {
+        int(ids[row]): [(int(ids[neighbor]), score) for neighbor, score in neighbors]
+        for row, neighbors in _top_k(X, rows).items()
+    }
+    with transaction.atomic():
+        moved = not _advance(since, upto)
+        if not moved:
+            written = _store(lists, full=rebuild, clear=changed)
+    if moved:
+        logger.info("Similar products: another update ran meanwhile, starting over")
+        return update(full=full)
+
+    logger.info(
+        f"Similar products: recomputed {len(lists)} of {len(ids)} products "
+        f"({'full' if rebuild else f'{len(changed)} changed'}), {X.shape[1]} features, "
+        f"{written} rows in {time.monotonic() - started:.1f}s"
+    )
+    return len(lists), written
+
+
+def schedule_update():
+    """Queue update() for recent catalog edits, at most once per debounce window."""
+    from .tasks import update_similar_products
+
+    debounce = settings.SIMILAR_PRODUCTS_DEBOUNCE_SECONDS
+    if cache.add(QUEUED_CACHE_KEY, 1, debounce):
+        # Runs once every edit made while the key lives has settled in the change log
+        update_similar_products.schedule(countdown=debounce + settings.CATALOG_CHANGES_SETTLE_SECONDS)
+
+
+def similar_to(product, user=None, limit=None):
+    return neighbor_rows(
+        SimilarProduct.objects.filter(product=product), user, limit or settings.SIMILAR_PRODUCTS_TOP_K,
+    )
@@ -0,0 +1,183 @@
+# apiApp/slow_queries.py
+import json
+import logging
+import logging.handlers
+import os
+import random
+import re
+import sys
+import threading
+import time
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+
+from . import instrumentation
+from .instrumentation import current_metrics
+
+_logger = None
+_logger_lock = threading.Lock()
+_local = threading.local()
+
+PROJECT_ROOT = str(settings.BASE_DIR)
+# Our own wrappers sit on the stack of every query; never blame them
+IGNORED_FILES = {os.path.abspath(__file__), os.path.abspath(instrumentation.__file__)}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def _get_logger():
+    """A private logger writing JSON lines to SLOW_QUERY_LOG_FILE, rotated by size."""
+    global _logger
+    if _logger is None:
+        with _logger_lock:
+            if _logger is None:
+                path = _setting('SLOW_QUERY_LOG_FILE', os.path.join(PROJECT_ROOT, 'logs', 'slow_queries.log'))
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(
+                    path,
+                    maxBytes=_setting('SLOW_QUERY_LOG_MAX_BYTES', 10 * 1024 * 1024),
+                    backupCount=_setting('SLOW_QUERY_LOG_BACKUPS', 5),
+                    encoding='utf-8',
+                )
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                logger = logging.getLogger('apiApp.slow_queries')
+                logger.setLevel(logging.INFO)
+                logger.propagate = False
+                logger.addHandler(handler)
+                _logger = logger
+    return _logger
+
+
+def params_shape(params, many=False):
+    """Describe parameters without their values: ['int', 'str(12)', 'list[40]']."""
+    if params is None:
+        return None
+    if many:
+        params = list(params)
+        return {'rows': len(params), 'first': params_shape(params[0]) if params else None}
+    if isinstance(params, dict):
+        return {key: params_shape([value])[0] for key, value in params.items()}
+    shape = []
+    for value in params:
+        if isinstance(value, str):
+            shape.append(f'str({len(value)})')
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            shape.append(f'bytes({len(value)})')
+        elif isinstance(value, (list, tuple, set)):
+            shape.append(f'{type(value).__name__}[{len(value)}]')
+        else:
+            shape.append(type(value).__name__)
+    return shape
+
+
+def originating_frame():
+    """
+    First frame in project code (not Django/DRF, not this module), e.g.
+    'apiApp/views.py:531 create_checkout_session'. Views and serializers
+    are preferred over helpers they call into when both are on the stack.
+    """
+    frame = sys._getframe(2)
+    first = None
+    while frame is not None:
+        filename = os.path.abspath(frame.f_code.co_filename)
+        if filename.startswith(PROJECT_ROOT) and filename not in IGNORED_FILES and 'site-packages' not in filename:
+            label = f'{os.path.relpath(filename, PROJECT_ROOT)}:{frame.f_lineno} {frame.f_code.co_name}'
+            if first is None:
+                first = label
+            if filename.endswith(('views.py', 'serializers.py')):
+                return label if label == first else f'{label} -> {first}'
+        frame = frame.f_back
+    return first
+
+
+def explain(connection, sql, params):
+    if not sql.lstrip().upper().startswith('SELECT'):
+        return None
+    if connection.vendor == 'postgresql' and connection.needs_rollback:
+        return None
+    _local.explaining = True
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'{connection.ops.explain_query_prefix()} {sql}', params)
+            return [' '.join(str(col) for col in row) for row in cursor.fetchall()]
+    except Exception as e:
+        return [f'EXPLAIN failed: {str(e)}']
+    finally:
+        _local.explaining = False
+
+
+def slow_query_wrapper(execute, sql, params, many, context):
+    if getattr(_local, 'explaining', False):
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration_ms = (time.perf_counter() - started) * 1000
+        if duration_ms >= _setting('SLOW_QUERY_THRESHOLD_MS', 100) \
+                and random.random() < _setting('SLOW_QUERY_SAMPLE_RATE', 1.0):
+            try:
+                record_slow_query(context['connection'], sql, params, many, duration_ms)
+            except Exception:
+                # Never let the sampler break the query it is observing
+                logging.getLogger(__name__).exception('Could not record slow query')
+
+
+def record_slow_query(connection, sql, params, many, duration_ms):
+    metrics = current_metrics()
+    entry = {
+        'ts': datetime.now(dt_timezone.utc).isoformat(timespec='milliseconds'),
+        'duration_ms': round(duration_ms, 2),
+        'alias': connection.alias,
+        'sql': sql,
+        'params': params_shape(params, many),
+        'many': many,
+        'origin': originating_frame(),
+        'endpoint': metrics.endpoint if metrics else None,
+    }
+    if _setting('SLOW_QUERY_EXPLAIN', False) and not many:
+        entry['plan'] = explain(connection, sql, params)
+    _get_logger().info(json.dumps(entry, default=str))
+
+
+def attach(connection):
+    """Add the sampler to a freshly created DB connection (called from the connection_created signal)."""
+    if not _setting('SLOW_QUERY_LOG_ENABLED', True):
+        return
+    if slow_query_wrapper not in connection.execute_wrappers:
+        # Outermost position: execute_wrapper() context managers push and pop
+        # at the end of the list, so they must never find this one there
+        connection.execute_wrappers.insert(0, slow_query_wrapper)
+
+
+# --- Reading the log back -------------------------------------------------------
+
+_NUMBER = re.compile(r'\b\d+(\.\d+)?\b')
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_IN_LIST = re.compile(r'IN \((?:%s|\?|\d+)(?:, ?(?:%s|\?|\d+))*\)', re.IGNORECASE)
+_WHITESPACE = re.compile(r'\s+')
+
+
+def fingerprint(sql):
+    """Collapse literals and IN lists so the same query shape groups together."""
+    sql = _STRING.sub('?', sql)
+    sql = _IN_LIST.sub('IN (...)', sql)
+    sql = _NUMBER.sub('?', sql)
+    return _WHITESPACE.sub(' ', sql).strip()
+
+
+def read_log_entries(path=None):
+    path = path or _setting('SLOW_QUERY_LOG_FILE', os.path.join(PROJECT_ROOT, 'logs', 'slow_queries.log'))
+    files = [path] + [f'{path}.{i}' for i in range(1, _setting('SLOW_QUERY_LOG_BACKUPS', 5) + 1)]
+    for name in files:
+        if not os.path.exists(name):
+            continue
+        with open(name, encoding='utf-8') as fh:
+            for line in fh:
+                try:
+                    yield json.loads(line)
+                except ValueError:
+                    continue
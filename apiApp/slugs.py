@@ -0,0 +1,90 @@
+# apiApp/slugs.py
+from django.db.models import Q
+from django.utils.text import slugify
+
+
+def _base_slug(model, value):
+    # Names made only of symbols slugify to "", fall back to the model name
+    return slugify(value) or model._meta.model_name
+
+
+def _taken_slugs(model, bases, field='slug', exclude_pk=None, chunk_size=200):
+    """Fetch every existing slug that starts with one of `bases` using LIKE 'base%'."""
+    taken = set()
+    bases = list(bases)
+    for start in range(0, len(bases), chunk_size):
+        query = Q()
+        for base in bases[start:start + chunk_size]:
+            query |= Q(**{f'{field}__startswith': base})
+        queryset = model._default_manager.filter(query)
+        if exclude_pk is not None:
+            queryset = queryset.exclude(pk=exclude_pk)
+        taken.update(queryset.values_list(field, flat=True))
+    return taken
+
+
+def _next_free(base, taken, start=1):
+    """Return (slug, next_counter) for the first free `base` or `base-N`."""
+    if start == 1 and base not in taken:
+        return base, 1
+    counter = start
+    while f'{base}-{counter}' in taken:
+        counter += 1
+    return f'{base}-{counter}', counter + 1
+
+
+def unique_slug(instance, value, field='slug'):
+    """
+    Return a unique slug for `instance` built from `value`, probing
+    `slug`, `slug-1`, `slug-2`, … against a single prefix query instead of
+    one exists() query per attempt.
+    """
+    model = type(instance)
+    base = _base_slug(model, value)
+    taken = _taken_slugs(model, [base], field=field, exclude_pk=instance.pk)
+    slug, _ = _next_free(base, taken)
+    return slug
+
+
+class SlugAllocator:
+    """
+    Batch slug allocation ahead of bulk_create (which does not call save()).
+    Existing slugs are loaded with one prefix query per new base, and the
+    allocator remembers everything it has handed out, so a large import can
+    be fed through it chunk by chunk without re-reading the table.
+    """
+
+    def __init__(self, model, source_field='name', field='slug'):
+        self.model = model
+        self.source_field = source_field
+        self.field = field
+        self.taken = set()
+        self.loaded_bases = set()
+        self.counters = {}
+
+    def assign(self, objects):
+        pending = [obj for obj in objects if not getattr(obj, self.field)]
+        self.taken.update(getattr(obj, self.field) for obj in objects if getattr(obj, self.field))
+        if not pending:
+            return objects
+
+        bases = {id(obj): _base_slug(self.model, getattr(obj, self.source_field)) for obj in pending}
+        new_bases = set(bases.values()) - self.loaded_bases
+        if new_bases:
+            self.taken.update(_taken_slugs(self.model, new_bases, field=self.field))
+            self.loaded_bases.update(new_bases)
+
+        for obj in pending:
+            base = bases[id(obj)]
+            slug, self.counters[base] = _next_free(base, self.taken, self.counters.get(base, 1))
+            self.taken.add(slug)
+            setattr(obj, self.field, slug)
+        return objects
+
+
+def assign_unique_slugs(objects, source_field='name', field='slug'):
+    """Give every object in `objects` without a slug a unique one before bulk_create."""
+    objects = list(objects)
+    if not objects:
+        return objects
+    return SlugAllocator(type(objects[0]), source_field, field).assign(objects)
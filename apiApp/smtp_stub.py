@@ -0,0 +1,115 @@
+# apiApp/smtp_stub.py
+import email
+import socketserver
+import threading
+from email import policy
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough SMTP for Django's smtp backend: HELO/EHLO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+
+    def reply(self, line):
+        self.wfile.write(f'{line}\r\n'.encode())
+
+    def handle(self):
+        stub = self.server.stub
+        stub.connections += 1
+        self.reply('220 localhost smtp stub ready')
+        mail_from, rcpt_to = None, []
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line.decode('utf-8', 'replace').strip()
+            verb = command[:4].upper()
+            if verb == 'EHLO':
+                self.reply('250-localhost')
+                self.reply('250 8BITMIME')
+            elif verb == 'HELO':
+                self.reply('250 localhost')
+            elif verb == 'MAIL':
+                mail_from, rcpt_to = command.split(':', 1)[1].strip().strip('<>'), []
+                self.reply('250 OK')
+            elif verb == 'RCPT':
+                rcpt_to.append(command.split(':', 1)[1].strip().strip('<>'))
+                self.reply('250 OK')
+            elif verb == 'DATA':
+                self.reply('354 End data with <CR><LF>.<CR><LF>')
+                lines = []
+                while True:
+                    data_line = self.rfile.readline()
+                    if data_line in (b'.\r\n', b'.\n', b''):
+                        break
+                    lines.append(data_line[1:] if data_line.startswith(b'..') else data_line)
+                with stub.lock:
+                    if stub.fail_next > 0:
+                        stub.fail_next -= 1
+                        self.reply('451 Temporary failure, try again later')
+                        continue
+                    stub.messages.append({
+                        'from': mail_from,
+                        'to': rcpt_to,
+                        'message': email.message_from_bytes(b''.join(lines), policy=policy.default),
+                    })
+                if stub.on_message:
+                    stub.on_message(stub.messages[-1])
+                self.reply('250 OK: queued')
+            elif verb == 'RSET':
+                mail_from, rcpt_to = None, []
+                self.reply('250 OK')
+            elif verb == 'NOOP':
+                self.reply('250 OK')
+            elif verb == 'QUIT':
+                self.reply('221 Bye')
+                return
+            else:
+                self.reply('502 Command not implemented')
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.TCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class SMTPStub:
+    """
+    In-process SMTP server that records what it receives instead of relaying
+    it. Point EMAIL_HOST/EMAIL_PORT at it (port 0 picks a free one):
+
+        with SMTPStub() as smtp:
+            with override_settings(EMAIL_HOST='127.0.0.1', EMAIL_PORT=smtp.port, EMAIL_USE_TLS=False):
+                call_command('send_queued_mail')
+            assert smtp.messages[0]['message']['Subject'] == '...'
+
+    Set `fail_next` to answer that many DATA commands with a 451 to
+    exercise the outbox retry path.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, on_message=None):
+        self.messages = []
+        self.connections = 0
+        self.fail_next = 0
+        self.on_message = on_message
+        self.lock = threading.Lock()
+        self._server = _Server((host, port), _SMTPHandler)
+        self._server.stub = self
+        self.host, self.port = self._server.server_address
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,83 @@
+# apiApp/storage.py
+import hashlib
+import os
+import posixpath
+import uuid
+
+from django.conf import settings
+from django.core.files.storage import FileSystemStorage
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+def file_digest(content, chunk_size=64 * 1024):
+    """sha256 hex digest of a Django File or plain file object, rewound afterwards."""
+    digest = hashlib.sha256()
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    if hasattr(content, 'chunks'):
+        for chunk in content.chunks(chunk_size):
+            digest.update(chunk)
+    else:
+        for chunk in iter(lambda: content.read(chunk_size), b''):
+            digest.update(chunk)
+    if hasattr(content, 'seek'):
+        content.seek(0)
+    return digest.hexdigest()
+
+
+def content_addressed_name(digest, original_name, prefix=None):
+    """cas/3f/3fa9...e1.jpg, the extension is kept so the URL keeps its content type."""
+    prefix = prefix or getattr(settings, 'CONTENT_ADDRESSED_MEDIA_PREFIX', 'cas')
+    ext = os.path.splitext(original_name)[1].lower()
+    if ext == '.jpeg':
+        ext = '.jpg'
+    return posixpath.join(prefix, digest[:2], f'{digest}{ext}')
+
+
+def is_content_addressed(name):
+    prefix = getattr(settings, 'CONTENT_ADDRESSED_MEDIA_PREFIX', 'cas')
+    return bool(name) and name.startswith(prefix + '/')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    Stores every upload under the sha256 of its bytes instead of its
+    original filename. Uploading the same picture twice reuses the file on
+    disk, and because a name can never point at different bytes the URLs
+    can be cached forever.
+    """
+
+    def _save(self, name, content):
+        final_name = content_addressed_name(file_digest(content), name)
+        if self.exists(final_name):
+            return final_name
+
+        # Write under a throwaway name and rename into place so a
+        # concurrent upload of the same bytes never sees a partial file
+        tmp_name = posixpath.join(posixpath.dirname(final_name), f'.{uuid.uuid4().hex}.tmp')
+        tmp_name = super()._save(tmp_name, content)
+        os.replace(self.path(tmp_name), self.path(final_name))
+        return final_name
+
+    def delete(self, name):
+        # Files are shared between rows, removing them is left to dedupe_media --delete-orphans
+        return None
+
+
+def content_addressed_storage():
+    return ContentAddressedStorage()
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """
+    Hashed, precompressed static files once collectstatic has written
+    staticfiles.json; until then (or for a file missing from it) the plain
+    name is used instead of raising, so pages still render.
+    """
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Not in the manifest; the plain file is what STATIC_ROOT holds
+            return name
@@ -0,0 +1,218 @@
+# apiApp/taskqueue.py
+import functools
+import importlib
+import logging
+import os
+import socket
+import traceback
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Task
+
+logger = logging.getLogger(__name__)
+
+registry = {}
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def worker_name():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class TaskFunction:
+    """What `@task` returns: still callable inline, plus `.delay()` and `.schedule()`."""
+
+    def __init__(self, func, name, queue, max_attempts, retry_backoff, timeout):
+        self.func = func
+        self.name = name
+        self.queue = queue
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff
+        self.timeout = timeout
+        functools.update_wrapper(self, func)
+
+    def __call__(self, *args, **kwargs):
+        return self.func(*args, **kwargs)
+
+    def delay(self, *args, **kwargs):
+        return enqueue(self.name, args, kwargs)
+
+    def schedule(self, run_at=None, countdown=None, priority=0, args=(), kwargs=None):
+        if run_at is None:
+            run_at = timezone.now() + timedelta(seconds=countdown or 0)
+        return enqueue(self.name, args, kwargs, run_at=run_at, priority=priority)
+
+
+def task(name=None, queue='default', max_attempts=3, retry_backoff=30, timeout=None):
+    """
+    Register a function as a background task:
+
+        @task(max_attempts=5)
+        def recompute_rating(product_id): ...
+
+        recompute_rating.delay(product.id)
+
+    Arguments must be JSON serialisable. `timeout` is the visibility timeout
+    in seconds: a task still marked running after that long is assumed to
+    have lost its worker and is handed to another one.
+    """
+    def decorator(func):
+        task_name = name or f'{func.__module__}.{func.__name__}'
+        wrapped = TaskFunction(
+            func, task_name, queue, max_attempts, retry_backoff,
+            timeout or _setting('TASK_VISIBILITY_TIMEOUT', 300),
+        )
+        registry[task_name] = wrapped
+        return wrapped
+    return decorator
+
+
+def enqueue(name, args=(), kwargs=None, run_at=None, priority=0):
+    definition = registry.get(name)
+    if definition is None:
+        raise KeyError(f"Unknown task '{name}', is its module imported?")
+    return Task.objects.create(
+        name=name,
+        queue=definition.queue,
+        args=list(args),
+        kwargs=kwargs or {},
+        priority=priority,
+        run_at=run_at or timezone.now(),
+        max_attempts=definition.max_attempts,
+    )
+
+
+def enqueue_many(name, arg_list, priority=0):
+    """Bulk insert one task per args tuple, much faster than calling delay() in a loop."""
+    definition = registry[name]
+    now = timezone.now()
+    return Task.objects.bulk_create([
+        Task(name=name, queue=definition.queue, args=list(args), priority=priority,
+             run_at=now, max_attempts=definition.max_attempts)
+        for args in arg_list
+    ], batch_size=1000)
+
+
+def _due(queues, now):
+    # Queued and due, or running past its visibility timeout (the worker died)
+    return Task.objects.filter(queue__in=queues).filter(
+        Q(status=Task.STATUS_QUEUED, run_at__lte=now)
+        | Q(status=Task.STATUS_RUNNING, locked_until__lt=now)
+    ).order_by('priority', 'run_at', 'id')
+
+
+def claim_tasks(limit, queues=('default',), worker=None):
+    """
+    Atomically take up to `limit` due tasks for this worker.
+
+    Postgres uses SELECT ... FOR UPDATE SKIP LOCKED, so concurrent workers
+    skip each other's rows instead of blocking. SQLite has no row locks; a
+    single UPDATE ... WHERE id IN (SELECT ... LIMIT n) runs under the
+    database write lock, so it is already exclusive, and the rows are read
+    back by the lock token it wrote.
+    """
+    now = timezone.now()
+    token = uuid.uuid4()
+    worker = worker or worker_name()
+    updates = dict(
+        status=Task.STATUS_RUNNING, lock_token=token, locked_by=worker,
+        locked_until=now + timedelta(seconds=_setting('TASK_VISIBILITY_TIMEOUT', 300)),
+        # attempts counts claims, so a task that keeps killing its worker still runs out
+        attempts=F('attempts') + 1,
+    )
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            ids = list(_due(queues, now).select_for_update(skip_locked=True).values_list('id', flat=True)[:limit])
+            if not ids:
+                return []
+            Task.objects.filter(id__in=ids).update(**updates)
+    else:
+        claimed = Task.objects.filter(id__in=_due(queues, now).values('id')[:limit]).update(**updates)
+        if not claimed:
+            return []
+
+    tasks = list(Task.objects.filter(lock_token=token).order_by('priority', 'run_at', 'id'))
+    for t in tasks:
+        definition = registry.get(t.name)
+        if definition and definition.timeout != _setting('TASK_VISIBILITY_TIMEOUT', 300):
+            # Long-running tasks declare their own visibility timeout
+            t.locked_until = now + timedelta(seconds=definition.timeout)
+            Task.objects.filter(pk=t.pk).update(locked_until=t.locked_until)
+    return tasks
+
+
+def release(tasks):
+    """Hand claimed-but-unstarted tasks back to the queue (worker shutting down)."""
+    for task_obj in tasks:
+        Task.objects.filter(pk=task_obj.pk, lock_token=task_obj.lock_token).update(
+            status=Task.STATUS_QUEUED, attempts=F('attempts') - 1,
+            lock_token=None, locked_by='', locked_until=None,
+        )
+
+
+def execute(task_obj):
+    """Run one claimed task and record the outcome. Never raises."""
+    if task_obj.name not in registry:
+        # Fresh worker processes have not imported the task modules yet
+        autodiscover_modules('tasks')
+    if task_obj.name not in registry:
+        # Defined outside a tasks module (e.g. bench_taskqueue's noop): its name is module.function
+        try:
+            importlib.import_module(task_obj.name.rpartition('.')[0])
+        except ImportError:
+            pass
+    definition = registry.get(task_obj.name)
+    if task_obj.attempts > task_obj.max_attempts:
+        # Reclaimed after a visibility timeout with no attempts left
+        Task.objects.filter(pk=task_obj.pk, lock_token=task_obj.lock_token).update(
+            status=Task.STATUS_FAILED, finished_at=timezone.now(), lock_token=None, locked_until=None,
+            last_error=task_obj.last_error or 'Visibility timeout exceeded on every attempt',
+        )
+        return False
+    try:
+        if definition is None:
+            raise KeyError(f"Unknown task '{task_obj.name}'")
+        definition.func(*task_obj.args, **task_obj.kwargs)
+    except Exception as e:
+        error = f'{type(e).__name__}: {str(e)}\n{traceback.format_exc()}'[:5000]
+        if definition is not None and task_obj.attempts < task_obj.max_attempts:
+            delay = definition.retry_backoff * 2 ** (task_obj.attempts - 1)
+            Task.objects.filter(pk=task_obj.pk, lock_token=task_obj.lock_token).update(
+                status=Task.STATUS_QUEUED, run_at=timezone.now() + timedelta(seconds=delay),
+                last_error=error, lock_token=None, locked_by='', locked_until=None,
+            )
+            logger.warning(f"Task {task_obj.name} #{task_obj.pk} failed (attempt {task_obj.attempts}), retrying in {delay}s: {str(e)}")
+        else:
+            Task.objects.filter(pk=task_obj.pk, lock_token=task_obj.lock_token).update(
+                status=Task.STATUS_FAILED, finished_at=timezone.now(),
+                last_error=error, lock_token=None, locked_until=None,
+            )
+            logger.error(f"Task {task_obj.name} #{task_obj.pk} failed permanently: {str(e)}")
+        return False
+    Task.objects.filter(pk=task_obj.pk, lock_token=task_obj.lock_token).update(
+        status=Task.STATUS_DONE, finished_at=timezone.now(), lock_token=None, locked_until=None,
+    )
+    return True
+
+
+def execute_claimed(task_obj):
+    """
+    Entry point for pool workers. The connection is kept across tasks (one
+    per thread/process) and only dropped if a query broke it.
+    """
+    try:
+        return execute(task_obj)
+    finally:
+        if connection.errors_occurred:
+            connection.close_if_unusable_or_obsolete()
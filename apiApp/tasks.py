@@ -0,0 +1,104 @@
+# apiApp/tasks.py
+"""
+Background tasks run by `manage.py run_worker`. Call them inline as before,
+or defer them with `.delay(...)` / `.schedule(countdown=...)`.
+"""
+import logging
+
+from .taskqueue import task
+
+logger = logging.getLogger(__name__)
+
+
+@task(max_attempts=5, retry_backoff=60)
+def deliver_queued_mail(batch_size=None):
+    """Drain the email outbox (same as `manage.py send_queued_mail`)."""
+    from django.conf import settings
+    from .mail import claim_batch, deliver_batch
+
+    batch_size = batch_size or settings.OUTBOX_BATCH_SIZE
+    while True:
+        rows = claim_batch(batch_size)
+        if not rows:
+            return
+        deliver_batch(rows)
+
+
+@task()
+def recompute_product_rating(product_id):
+    from .models import Product
+    from .signals import rebuild_product_rating_stats
+
+    rebuild_product_rating_stats(Product.objects.filter(pk=product_id))
+
+
+@task()
+def refresh_variant_attributes(product_id):
+    from .models import Product
+
+    product = Product.objects.filter(pk=product_id).first()
+    if product is not None:
+        product.update_variant_attributes()
+
+
+@task(max_attempts=6, retry_backoff=30)
+def verify_paystack_transaction(reference):
+    """
+    Confirm a payment with Paystack and fulfil the cart it was for. Network
+    errors raise so the task is retried with backoff.
+    """
+    from .paystack import Paystack
+    from .views import fulfill_checkout
+
+    response = Paystack().verify_transaction(reference)
+    if response.get('status') is False:
+        raise RuntimeError(f"Paystack verification failed for {reference}: {response.get('message')}")
+
+    data = response.get('data', {})
+    cart_code = (data.get('metadata') or {}).get('cart_code')
+    if data.get('status') == 'success' and cart_code:
+        if not fulfill_checkout(data, cart_code):
+            raise RuntimeError(f"Could not fulfil cart {cart_code} for {reference}")
+    else:
+        logger.info(f"Paystack transaction {reference} is {data.get('status')}, nothing to fulfil")
+
+
+@task(max_attempts=3, retry_backoff=300)
+def build_product_feeds(full=False):
+    """Refresh every shopping channel feed (same as `manage.py build_product_feeds`)."""
+    from .feeds import FEEDS, build_feed
+
+    for name in FEEDS:
+        build_feed(name, full=full)
+
+
+@task(max_attempts=3, retry_backoff=300)
+def refresh_leaderboards():
+    """Slide the best-seller window and re-score ratings (same as `manage.py refresh_leaderboards`)."""
+    from .leaderboards import refresh
+
+    refresh()
+
+
+@task(max_attempts=3, retry_backoff=300)
+def build_recommendations(full=False):
+    """Rebuild "customers also bought" neighbors (same as `manage.py build_recommendations`)."""
+    from .recommendations import build
+
+    build(full=full)
+
+
+@task(max_attempts=3, retry_backoff=300)
+def update_similar_products(full=False):
+    """Bring "similar items" up to date with catalog edits (same as `manage.py build_similar_products`)."""
+    from .similarity import update
+
+    update(full=full)
+
+
+@task(max_attempts=3, retry_backoff=30)
+def apply_trending_events(contributions):
+    """Add one process's buffered trending events, {product_id: log weight}, to the scores."""
+    from .trending import apply_contributions
+
+    apply_contributions({int(pk): value for pk, value in contributions.items()})
@@ -1,3 +1,167 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth.models import AnonymousUser
+from django.test import RequestFactory, TestCase, override_settings
+
+from . import trending
+from .catalog_changes import CursorExpired, changes_since, compact
+from .models import (
+    Cart, CartItem, CatalogChange, Category, Order, OrderItem, Product, ProductVariant, SalesRollup, SimilarProduct,
+)
+from .sales import record_orders
+from .similarity import update as update_similar_products
+from .views import fulfill_checkout
+
+
+def make_product(name, price, status='published', **kwargs):
+    return Product.objects.create(name=name, price=Decimal(price), status=status, **kwargs)
+
+
+class FulfillCheckoutTests(TestCase):
+    def setUp(self):
+        self.product = make_product('Linen Shirt', '5000.00')
+        self.cart = Cart.objects.create(cart_code='cart0000001')
+        CartItem.objects.create(cart=self.cart, product=self.product, quantity=2)
+
+    def payment(self, reference):
+        return {'reference': reference, 'amount': 1000000, 'currency': 'NGN', 'customer': {'email': 'Ada@Example.com'}}
+
+    def test_same_payment_twice_creates_one_order(self):
+        self.assertTrue(fulfill_checkout(self.payment('ref-1'), self.cart.cart_code))
+        self.assertTrue(fulfill_checkout(self.payment('ref-1'), self.cart.cart_code))
+
+        order = Order.objects.get()
+        self.assertEqual(order.status, 'paid')
+        self.assertEqual(order.amount, Decimal('10000.00'))
+        self.assertEqual([(item.product_id, item.quantity) for item in order.items.all()], [(self.product.id, 2)])
+        self.cart.refresh_from_db()
+        self.assertEqual(self.cart.status, Cart.STATUS_ORDERED)
+        self.assertEqual(self.cart.order_id, order.id)
+        self.assertFalse(self.cart.cartitems.exists())
+
+    def test_ordered_cart_is_not_fulfilled_again(self):
+        # The redirect and the webhook can report the same cart under different references
+        self.assertTrue(fulfill_checkout(self.payment('ref-1'), self.cart.cart_code))
+        self.assertTrue(fulfill_checkout(self.payment('ref-2'), self.cart.cart_code))
+
+        self.assertEqual(Order.objects.count(), 1)
+        self.assertEqual(OrderItem.objects.count(), 1)
+
+    def test_unknown_cart_creates_no_order(self):
+        self.assertFalse(fulfill_checkout(self.payment('ref-1'), 'missing0000'))
+        self.assertFalse(Order.objects.exists())
+
+
+class SalesRollupTests(TestCase):
+    def setUp(self):
+        self.category = Category.objects.create(name='Shirts')
+        self.product = make_product('Linen Shirt', '5000.00')
+        self.product.category.add(self.category)
+        self.variant = ProductVariant.objects.create(product=self.product, color='Blue', size='M', quantity=5)
+
+    def rollup(self, dimension, key=0):
+        row = SalesRollup.objects.filter(dimension=dimension, key=key).values('orders', 'units', 'revenue').first()
+        return row and (row['orders'], row['units'], row['revenue'])
+
+    def test_paid_then_cancelled_order_is_counted_then_uncounted(self):
+        # Saving the order records it after commit (signals.py)
+        with self.captureOnCommitCallbacks(execute=True):
+            order = Order.objects.create(amount=Decimal('15000.00'), customer_email='ada@example.com', status='paid')
+            OrderItem.objects.create(order=order, product=self.product, variant=self.variant, quantity=3,
+                                     price=Decimal('5000.00'))
+
+        # Counted once, however often it is recorded
+        self.assertEqual(record_orders([order.id], trending=False), (0, 0))
+        counted = (1, 3, Decimal('15000.00'))
+        self.assertEqual(self.rollup(SalesRollup.DIMENSION_TOTAL), counted)
+        self.assertEqual(self.rollup(SalesRollup.DIMENSION_PRODUCT, self.product.id), counted)
+        self.assertEqual(self.rollup(SalesRollup.DIMENSION_VARIANT, self.variant.id), counted)
+        self.assertEqual(self.rollup(SalesRollup.DIMENSION_CATEGORY, self.category.id), counted)
+        # and its purchase queued for the trending score
+        self.assertEqual(trending._buffer.flush(), 1)
+
+        order.refresh_from_db()
+        order.status = 'cancelled'
+        with self.captureOnCommitCallbacks(execute=True):
+            order.save()
+        self.assertEqual(record_orders([order.id], trending=False), (0, 0))
+        for dimension, key in ((SalesRollup.DIMENSION_TOTAL, 0), (SalesRollup.DIMENSION_PRODUCT, self.product.id),
+                               (SalesRollup.DIMENSION_VARIANT, self.variant.id),
+                               (SalesRollup.DIMENSION_CATEGORY, self.category.id)):
+            self.assertEqual(self.rollup(dimension, key), (0, 0, Decimal('0.00')))
+        order.refresh_from_db()
+        self.assertFalse(order.sales_recorded)
+
+
+@override_settings(CATALOG_CHANGES_SETTLE_SECONDS=0, SIMILAR_PRODUCTS_TOP_K=3)
+class SimilarProductsTests(TestCase):
+    def setUp(self):
+        shirts = Category.objects.create(name='Shirts')
+        shoes = Category.objects.create(name='Shoes')
+        self.products = []
+        for i in range(12):
+            product = make_product(
+                f'Product {i}', f'{1000 + 700 * i}.00',
+                gender=('men', 'women', 'unisex')[i % 3], colors=[('red', 'blue', 'black')[i % 3]], sizes=['M'],
+            )
+            product.category.add(shirts if i % 2 else shoes)
+            self.products.append(product)
+
+    def lists(self):
+        lists = {}
+        for product_id, neighbor_id, score in SimilarProduct.objects.order_by('product_id', 'rank').values_list(
+            'product_id', 'neighbor_id', 'score',
+        ):
+            lists.setdefault(product_id, []).append((neighbor_id, score))
+        return lists
+
+    def test_incremental_update_matches_full_rebuild(self):
+        update_similar_products(full=True)
+        self.assertEqual(len(self.lists()), 12)
+
+        moved, recolored, unpublished = self.products[0], self.products[5], self.products[7]
+        moved.price = Decimal('8000.00')
+        moved.save()
+        recolored.colors = ['red']
+        recolored.save()
+        unpublished.status = 'draft'
+        unpublished.save()
+
+        recomputed, _ = update_similar_products()
+        self.assertLess(recomputed, 11)
+        incremental = self.lists()
+        self.assertNotIn(unpublished.id, incremental)
+
+        update_similar_products(full=True)
+        self.assertEqual(incremental, self.lists())
+
+    def test_nothing_changed_recomputes_nothing(self):
+        update_similar_products(full=True)
+        self.assertEqual(update_similar_products(), (0, 0))
+
+
+@override_settings(CATALOG_CHANGES_SETTLE_SECONDS=0)
+class CatalogChangesTests(TestCase):
+    def setUp(self):
+        self.request = RequestFactory().get('/api/catalog/changes/')
+        self.request.user = AnonymousUser()
+
+    def test_draft_products_and_their_variants_are_sent_as_deletes(self):
+        draft = make_product('Draft Shirt', '5000.00', status='draft')
+        variant = ProductVariant.objects.create(product=draft, color='Blue', size='M', quantity=5)
+
+        changes = changes_since(0, self.request)['changes']
+        sent = {(change['type'], change['id']): change for change in changes}
+        for kind, object_id in ((CatalogChange.KIND_PRODUCT, draft.id), (CatalogChange.KIND_VARIANT, variant.id)):
+            self.assertEqual(sent[(kind, object_id)]['action'], CatalogChange.ACTION_DELETE)
+            self.assertIsNone(sent[(kind, object_id)]['data'])
+
+    def test_cursor_before_the_horizon_expires(self):
+        make_product('Linen Shirt', '5000.00')
+        cursor = changes_since(0, self.request)['cursor']
+        self.assertGreater(cursor, 0)
+
+        compact(retention_days=0)
+        with self.assertRaises(CursorExpired):
+            changes_since(cursor - 1, self.request)
+        self.assertEqual(changes_since(cursor, self.request)['changes'], [])
@@ -0,0 +1,150 @@
+# apiApp/trending.py
+"""
+"Trending now": an exponentially decayed score per product from product
+views, add-to-carts, wishlist adds and purchases.
+
+Decaying every score as time passes would mean rewriting the whole product
+table. Scores use forward decay instead: an event of weight w at time t
+adds w * exp(rate * (t - EPOCH)), with rate = ln 2 / TRENDING_HALF_LIFE_HOURS.
+Every product's decayed score at `now` is its sum times the same factor
+exp(-rate * (now - EPOCH)), so the sums rank exactly like the decayed
+scores and only products with new events are ever written. The sums double
+every half-life, so ProductTrending.score holds their natural log, which
+grows linearly and never overflows; decayed_score() turns it back into
+"weighted events as of now". Products without events have no row.
+
+record_event() adds to a per-process buffer without a query. Once the
+buffer is TRENDING_FLUSH_SECONDS old or holds TRENDING_FLUSH_EVENTS
+events, whichever call notices queues its sums as one
+apply_trending_events task (a single INSERT), and so does process exit.
+The worker applies them in one transaction that locks the products' rows,
+log-adds the new events and updates them with a single executemany, so
+no request waits on those locks. Events buffered in a process that dies
+are lost, which a popularity signal can afford. Purchases are recorded by
+sales.record_orders(), once per order line, at the order's time.
+
+product_list?ordering=trending sorts through the join to ProductTrending.
+"""
+import atexit
+import logging
+import math
+import threading
+import time
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db import connection, transaction
+
+from .metrics import trending_flushes
+from .models import Product, ProductTrending
+
+logger = logging.getLogger(__name__)
+
+EPOCH = datetime(2025, 1, 1, tzinfo=dt_timezone.utc).timestamp()
+# Score of a row created just to be log-added to; log_add(NO_EVENTS, x) == x
+NO_EVENTS = -1e300
+
+
+def _rate():
+    return math.log(2) / (settings.TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def log_add(a, b):
+    """log(exp(a) + exp(b)) without overflow."""
+    high, low = max(a, b), min(a, b)
+    return high + math.log1p(math.exp(low - high))
+
+
+def decayed_score(trending_score, now=None):
+    """Weighted events as of `now`, each halved for every half-life since it happened."""
+    now = time.time() if now is None else now
+    return math.exp(trending_score - _rate() * (now - EPOCH))
+
+
+def apply_contributions(contributions):
+    """Log-add {product_id: log of forward-decayed weight} to the products' ProductTrending.score."""
+    quote = connection.ops.quote_name
+    table = quote(ProductTrending._meta.db_table)
+    score = quote(ProductTrending._meta.get_field('score').column)
+    key = quote(ProductTrending._meta.get_field('product').column)
+    with transaction.atomic():
+        # Rows for products trending for the first time; deleted products are skipped
+        ProductTrending.objects.bulk_create([
+            ProductTrending(product_id=pk, score=NO_EVENTS)
+            for pk in Product.objects.filter(id__in=contributions).values_list('id', flat=True)
+        ], batch_size=500, ignore_conflicts=True)
+        # Locked in id order so concurrent flushes queue instead of deadlocking
+        current = ProductTrending.objects.select_for_update().filter(
+            product_id__in=contributions,
+        ).order_by('product_id').values_list('product_id', 'score')
+        rows = [(log_add(value, contributions[pk]), pk) for pk, value in current]
+        with connection.cursor() as cursor:
+            cursor.executemany(f"UPDATE {table} SET {score} = %s WHERE {key} = %s", rows)
+    return len(rows)
+
+
+class EventBuffer:
+    """Per-process sums of event weights, forward-decayed to when the buffer was started."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        self._started = time.time()
+        self._sums = defaultdict(float)
+        self._events = 0
+
+    def add(self, product_id, weight, at=None):
+        at = time.time() if at is None else at
+        with self._lock:
+            # Relative to the buffer's start, so the terms stay near 1
+            self._sums[product_id] += weight * math.exp(_rate() * (at - self._started))
+            self._events += 1
+            due = (
+                self._events >= settings.TRENDING_FLUSH_EVENTS
+                or time.time() - self._started >= settings.TRENDING_FLUSH_SECONDS
+            )
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Queue the buffered events for the worker. Returns the number of products queued."""
+        from .tasks import apply_trending_events
+
+        with self._lock:
+            sums, started = self._sums, self._started
+            self._reset()
+        offset = _rate() * (started - EPOCH)
+        # Events far older than the buffer (backfilled orders) can underflow to 0
+        contributions = {pk: math.log(total) + offset for pk, total in sums.items() if total > 0}
+        if not contributions:
+            return 0
+        try:
+            # JSON object keys are strings
+            apply_trending_events.delay({str(pk): value for pk, value in contributions.items()})
+        except Exception as e:
+            trending_flushes.labels('error').inc()
+            logger.error(f"Failed to queue trending events for {len(contributions)} products: {str(e)}", exc_info=True)
+            return 0
+        trending_flushes.labels('ok').inc()
+        return len(contributions)
+
+
+_buffer = EventBuffer()
+atexit.register(_buffer.flush)
+
+
+def record_event(product_id, event, at=None):
+    """
+    Count a 'view', 'cart', 'wishlist' or 'purchase' of a product towards
+    its trending score, now or at datetime `at`. Does not touch the database.
+    """
+    weight = settings.TRENDING_EVENT_WEIGHTS.get(event, 0)
+    if weight > 0 and product_id:
+        _buffer.add(product_id, weight, at.timestamp() if at is not None else None)
+
+
+def flush():
+    return _buffer.flush()
@@ -24,8 +24,14 @@ urlpatterns = [
 
     # Products
     path('products/', product_list, name='product-list'),
+    path('products/export/', views.export_catalog, name='product-export'),
+    path('products/best-sellers/', views.best_sellers, name='product-best-sellers'),
+    path('products/top-rated/', views.top_rated, name='product-top-rated'),
+    path('feeds/<str:name>/', views.product_feed, name='product-feed'),
+    path('catalog/changes/', views.catalog_changes, name='catalog-changes'),
     path('products/<slug:slug>/', ProductDetailView.as_view(), name='product-detail'),
     path('products/<slug:product_slug>/variants/', ProductVariantView.as_view(), name='product-variants'),
+    path('products/<slug:slug>/similar/', views.similar_products, name='product-similar'),
     
     
     # Categories
@@ -49,6 +55,8 @@ urlpatterns = [
     path("checkout/", views.create_checkout_session, name="create-checkout"),
     path("webhook/", csrf_exempt(views.paystack_webhook), name="webhook"),
     path("orders/", views.get_orders, name="order-list"),
+    path("orders/history/", views.order_history, name="order-history"),
+    path("reports/sales/", views.sales_report, name="sales-report"),
     path('verify-payment/', views.verify_payment, name='verify-payment'),
     
     # User Management
@@ -122,6 +130,9 @@ urlpatterns = [
     # Search
     path("search/", views.product_search, name="search"),
 
+    # Admin: per-endpoint latency percentiles
+    path("admin/performance/", views.performance_stats, name="performance-stats"),
+
     # Home
     path("", views.home, name="home"),
     
@@ -6,6 +6,7 @@ from dj_rest_auth.registration.views import SocialLoginView
 from rest_framework import status
 from django.utils import timezone
 import json
+from datetime import date, timedelta
 import uuid
 import hmac
 import hashlib
@@ -21,8 +22,9 @@ from django.core.mail import send_mail
 from django.utils.encoding import force_str
 from rest_framework import generics
 from rest_framework.exceptions import ValidationError
+from django.db import IntegrityError, transaction
 from django.db.models import Avg, Count
-from django.db.models import Q
+from django.db.models import F, Q
 from django.utils.translation import gettext_lazy as _
 from rest_framework.views import APIView
 from rest_framework.response import Response
@@ -32,11 +34,27 @@ from rest_framework.permissions import AllowAny, IsAuthenticated, IsAdminUser
 from django.core.paginator import Paginator, EmptyPage, PageNotAnInteger
 from django.http import Http404
 from .paystack import Paystack  # Add this import at the top with other imports
-from .models import Cart, CartItem, Category, CustomerAddress, Order, OrderItem, Product, Review, Wishlist, Notification, ContactMessage, HelpCenterArticle, ProductVariant
-from .serializers import CartItemSerializer, CartSerializer, CategoryDetailSerializer, CategoryListSerializer, CustomerAddressSerializer, OrderSerializer, ProductListSerializer, ProductDetailSerializer, ReviewSerializer, SimpleCartSerializer, UserSerializer, WishlistSerializer,NotificationSerializer, ContactMessageSerializer, HelpCenterArticleSerializer, CartStatSerializer, ProductVariantSerializer
-from django.http import HttpResponse
+from .mail import queue_mail
+from .instrumentation import latency_histograms
+from .metrics import checkouts, fulfillments
+from .exports import FORMATS as EXPORT_FORMATS, export_lines
+from .feeds import FEEDS, feed_path
+from .catalog_changes import CursorExpired, changes_since, current_cursor
+from .order_history import OrderHistoryPagination, history_queryset
+from .order_lookup import find_orders, orders_for_email
+from .sales import sales_report as rollup_sales_report
+from .leaderboards import best_sellers as best_seller_products, schedule_daily_refresh, top_rated as top_rated_products
+from .recommendations import schedule_daily_build as schedule_recommendations
+from .similarity import similar_to
+from .trending import record_event
+from .media import serve_file
+from .models import Cart, CartItem, Category, CustomerAddress, Order, OrderItem, Product, Review, Wishlist, Notification, ContactMessage, HelpCenterArticle, ProductVariant, SalesRollup
+from .serializers import CartItemSerializer, CartSerializer, CategoryDetailSerializer, CategoryListSerializer, CustomerAddressSerializer, OrderSerializer, ProductListSerializer, ProductDetailSerializer, related_product, ReviewSerializer, SimpleCartSerializer, UserSerializer, WishlistSerializer,NotificationSerializer, ContactMessageSerializer, HelpCenterArticleSerializer, CartStatSerializer, ProductVariantSerializer, OrderHistorySerializer
+from django.http import HttpResponse, StreamingHttpResponse
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_http_methods
+from django.views.decorators.http import require_http_methods, require_safe
+from django.core.cache import cache
+import os
 from django.urls import reverse
 import time
 
@@ -106,7 +124,11 @@ def product_list(request):
             products = products.filter(gender__iexact=gender)
  
         # Ordering
-        products = products.order_by('-is_featured', '-created_at')
+        if request.query_params.get('ordering') == 'trending':
+            # Hottest first (apiApp/trending.py); products without events last
+            products = products.order_by(F('trending__score').desc(nulls_last=True), '-id')
+        else:
+            products = products.order_by('-is_featured', '-created_at')
         
         # Remove pagination and return all results
         serializer = ProductListSerializer(products, many=True, context={'request': request})
@@ -203,7 +225,9 @@ class ProductDetailView(generics.RetrieveAPIView):
                     "code": "authentication_required",
                     "requires_login": True
                 })
-                
+
+            schedule_recommendations()
+            record_event(product.id, 'view')
             return product
             
         except Product.DoesNotExist:
@@ -295,6 +319,10 @@ def add_to_cart(request):
             cart_code=cart_code,
             defaults={'cart_code': cart_code}
         )
+        if cart.status != Cart.STATUS_OPEN:
+            # Already paid for; this session starts a new cart
+            cart_code = request.session['cart_code'] = str(uuid.uuid4())
+            cart = Cart.objects.create(cart_code=cart_code)
         
         # Get the product
         try:
@@ -359,6 +387,7 @@ def add_to_cart(request):
             cart_item.quantity += quantity
             cart_item.save()
             logger.info(f"Updated cart item quantity to {cart_item.quantity}")
+        record_event(product.id, 'cart')
 
         # Get updated cart items
         cart_items = CartItem.objects.filter(cart=cart).select_related('product', 'variant')
@@ -481,6 +510,7 @@ def add_to_wishlist(request):
         return Response("Wishlist item deleted successfully!", status=204)
 
     new_wishlist = Wishlist.objects.create(user=user, product=product)
+    record_event(product.id, 'wishlist')
     serializer = WishlistSerializer(new_wishlist)
     return Response(serializer.data)
 
@@ -508,20 +538,22 @@ def create_checkout_session(request):
             cart = Cart.objects.filter(user=request.user).latest('created_at')
             
             # Check if this cart is already associated with an order
-            cart_product_ids = cart.cartitems.values_list('product_id', flat=True)
-            if OrderItem.objects.filter(product_id__in=cart_product_ids).exists():
+            if cart.status == Cart.STATUS_ORDERED:
+                checkouts.labels('already_processed').inc()
                 return Response(
                     {"error": "This cart has already been processed. Please add items to a new cart."},
                     status=status.HTTP_400_BAD_REQUEST
                 )
                 
         except Cart.DoesNotExist:
+            checkouts.labels('no_cart').inc()
             return Response(
                 {"error": "No active cart found. Please add items to your cart first."},
                 status=status.HTTP_400_BAD_REQUEST
             )
  
         if cart.cartitems.count() == 0:
+            checkouts.labels('empty_cart').inc()
             return Response(
                 {"error": "Your cart is empty. Please add items before checking out."},
                 status=status.HTTP_400_BAD_REQUEST
@@ -552,11 +584,13 @@ def create_checkout_session(request):
 
         if not response.get('status'):
             logger.error(f"Paystack error: {response.get('message', 'Unknown error')}")
+            checkouts.labels('paystack_error').inc()
             return Response(
                 {"error": "Failed to initialize payment. Please try again."},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        checkouts.labels('success').inc()
         # Return the authorization URL to the frontend
         return Response({
             "authorization_url": response['data']['authorization_url'],
@@ -567,6 +601,7 @@ def create_checkout_session(request):
 
     except Exception as e:
         logger.error(f"Checkout error: {str(e)}", exc_info=True)
+        checkouts.labels('error').inc()
         return Response(
             {"error": "An error occurred while processing your payment. Please try again."},
             status=status.HTTP_500_INTERNAL_SERVER_ERROR
@@ -642,48 +677,74 @@ def fulfill_checkout(session_data, cart_code):
         reference = session_data.get('reference')
         if not reference:
             logger.error("No reference found in session")
+            fulfillments.labels('no_reference').inc()
             return False
 
         if Order.objects.filter(paystack_checkout_id=reference).exists():
             logger.info(f"Order with reference {reference} already exists")
+            fulfillments.labels('duplicate').inc()
             return True
 
-        # Get the cart
+        # Get customer email from session data
+        customer_email = session_data.get('customer', {}).get('email', '') or session_data.get('customer_email', '')
+
+        # Order, items and the cart's status commit together, so a cart is
+        # either still open or linked to exactly the order that paid for it
         try:
-            cart = Cart.objects.get(cart_code=cart_code)
-        except Cart.DoesNotExist:
-            logger.error(f"Cart with code {cart_code} not found")
+            with transaction.atomic():
+                try:
+                    cart = Cart.objects.select_for_update().get(cart_code=cart_code)
+                except Cart.DoesNotExist:
+                    logger.error(f"Cart with code {cart_code} not found")
+                    fulfillments.labels('cart_missing').inc()
+                    return False
+
+                if cart.status == Cart.STATUS_ORDERED:
+                    logger.info(f"Cart {cart_code} already fulfilled by order {cart.order_id}")
+                    fulfillments.labels('duplicate').inc()
+                    return True
+
+                # Create order
+                order = Order.objects.create(
+                    paystack_checkout_id=reference,
+                    amount=float(session_data.get('amount', 0)) / 100,  # Convert from kobo to Naira
+                    currency=session_data.get('currency', 'NGN'),
+                    customer_email=customer_email,
+                    status='paid'
+                )
+
+                # Add cart items to order
+                for item in cart.cartitems.select_related('product', 'variant'):
+                    OrderItem.objects.create(
+                        order=order,
+                        product=item.product,
+                        variant=item.variant,
+                        quantity=item.quantity,
+                        price=item.product.price  # Store the price at time of purchase
+                    )
+
+                # Clear the cart and close it
+                cart.cartitems.all().delete()
+                cart.status = Cart.STATUS_ORDERED
+                cart.order = order
+                cart.save(update_fields=['status', 'order', 'updated_at'])
+        except IntegrityError as e:
+            if Order.objects.filter(paystack_checkout_id=reference).exists():
+                # The redirect and the webhook reported the same payment at once; the other one won
+                logger.info(f"Order with reference {reference} created concurrently")
+                fulfillments.labels('duplicate').inc()
+                return True
+            logger.error(f"Integrity error fulfilling checkout {reference} for cart {cart_code}: {str(e)}", exc_info=True)
+            fulfillments.labels('error').inc()
             return False
 
-        # Get customer email from session data
-        customer_email = session_data.get('customer', {}).get('email', '') or session_data.get('customer_email', '')
-        
-        # Create order
-        order = Order.objects.create(
-            paystack_checkout_id=reference,
-            amount=float(session_data.get('amount', 0)) / 100,  # Convert from kobo to Naira
-            currency=session_data.get('currency', 'NGN'),
-            customer_email=customer_email,
-            status='Paid'
-        )
-        
-        # Add cart items to order
-        for item in cart.cartitems.all():
-            OrderItem.objects.create(
-                order=order,
-                product=item.product,
-                quantity=item.quantity,
-                price=item.product.price  # Store the price at time of purchase
-            )
-            
-        # Clear the cart
-        cart.cartitems.all().delete()
-        
         logger.info(f"Order {order.id} created successfully for cart {cart_code}")
+        fulfillments.labels('created').inc()
         return True
         
     except Exception as e:
         logger.error(f"Error fulfilling checkout: {str(e)}", exc_info=True)
+        fulfillments.labels('error').inc()
         return False
 
 
@@ -787,7 +848,7 @@ def password_reset_request(request):
 
     reset_link = f"https://patrick-cavannii.netlify.app/reset-password/{uid}/{token}/"
 
-    send_mail(
+    queue_mail(
         'Password Reset Request',
         f'Please click the link below to reset your password:\n{reset_link}',
         'no-reply@example.com',
@@ -819,10 +880,22 @@ def reset_password(request, uidb64, token):
 @permission_classes([IsAuthenticated])
 def get_orders(request):
     email = request.query_params.get("email")
-    orders = Order.objects.filter(customer_email=email)
-    serializer = OrderSerializer(orders, many=True)
+    orders = orders_for_email(email)
+    serializer = OrderSerializer(orders, many=True, context={'request': request})
     return Response(serializer.data)
 
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def order_history(request):
+    """
+    The signed-in customer's orders, newest first, with item snapshots.
+    Cursor paginated: follow `next` (?cursor=...&limit=<=100).
+    """
+    paginator = OrderHistoryPagination()
+    orders = paginator.paginate_queryset(history_queryset(request.user.email), request)
+    serializer = OrderHistorySerializer(orders, many=True, context={'request': request})
+    return paginator.get_paginated_response(serializer.data)
+
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def add_address(request):
@@ -961,7 +1034,7 @@ def register(request):
         frontend_url = f"http://localhost:5173/verify-email?token={user.verification_token}"
         
         # Send verification email with frontend URL
-        send_mail(
+        queue_mail(
             'Verify Your Email - Patrick Cavanni',
             f'Please click the following link to verify your email:\n\n{frontend_url}\n\n'
             'This link will expire in 24 hours.',
@@ -1083,7 +1156,7 @@ def resend_verification_email(request):
             reverse('verify-email', args=[user.verification_token])
         )
         
-        send_mail(
+        queue_mail(
             'Verify Your Email - Patrick Cavanni',
             f'Please click the following link to verify your email:\n\n{verification_url}\n\n'
             'This link will expire in 24 hours.',
@@ -1181,22 +1254,23 @@ def track_order(request):
     order_id = request.query_params.get('order_id')
     
     if email:
-        orders = Order.objects.filter(customer_email=email).order_by('-created_at')
+        orders = list(orders_for_email(email))
     elif order_id:
-        orders = Order.objects.filter(paystack_checkout_id__icontains=order_id)
+        # Exact order number or payment reference only; prefixes are staff-only
+        orders = find_orders(order_id)
     else:
         return Response(
             {"error": "Please provide email or order_id parameter"}, 
             status=status.HTTP_400_BAD_REQUEST
         )
     
-    if not orders.exists():
+    if not orders:
         return Response(
             {"error": "No orders found"}, 
             status=status.HTTP_404_NOT_FOUND
         )
     
-    serializer = OrderSerializer(orders, many=True)
+    serializer = OrderSerializer(orders, many=True, context={'request': request})
     return Response(serializer.data)
 
 # Notifications
@@ -1528,7 +1602,7 @@ class PasswordResetRequestView(APIView):
         If you didn't request this, please ignore this email.
         """
         
-        send_mail(
+        queue_mail(
             subject,
             message,
             settings.DEFAULT_FROM_EMAIL,
@@ -1712,4 +1786,193 @@ class ProductVariantView(APIView):
             return Response(
                 {"error": "An error occurred while creating the variant"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
+            )
+
+
+@api_view(['GET', 'DELETE'])
+@permission_classes([IsAdminUser])
+def performance_stats(request):
+    """
+    Rolling p50/p95/p99 latency (ms) per endpoint for the worker process
+    that answers (its pid is in the response), slowest p95 first; across
+    workers use http_request_duration_seconds on /metrics. DELETE clears
+    this worker's window.
+    """
+    if request.method == 'DELETE':
+        latency_histograms.reset()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    stats = latency_histograms.snapshot()
+    endpoints = [
+        {'endpoint': endpoint, **values}
+        for endpoint, values in sorted(stats.items(), key=lambda item: item[1]['p95'], reverse=True)
+    ]
+    return Response({
+        'pid': os.getpid(),
+        'window_seconds': settings.PERF_HISTOGRAM_WINDOW,
+        'endpoints': endpoints,
+    })
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def export_catalog(request):
+    """
+    Stream the whole catalog as NDJSON (default) or CSV: ?output=csv.
+    Optional ?status=published|draft|archived. Memory use does not grow
+    with the catalog size, see apiApp/exports.py.
+    """
+    output = request.query_params.get('output', 'ndjson')
+    if output not in EXPORT_FORMATS:
+        return Response(
+            {"error": f"output must be one of: {', '.join(EXPORT_FORMATS)}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    product_status = request.query_params.get('status')
+    if product_status and product_status not in dict(Product.STATUS_CHOICES):
+        return Response({"error": "Invalid status"}, status=status.HTTP_400_BAD_REQUEST)
+
+    content_type, _ = EXPORT_FORMATS[output]
+    response = StreamingHttpResponse(
+        export_lines(output, status=product_status, build_url=request.build_absolute_uri),
+        content_type=content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="catalog-{timezone.now():%Y%m%d}.{output}"'
+    # Let nginx pass rows through as they are generated
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@require_safe
+def product_feed(request, name):
+    """
+    Download a shopping channel feed (gzipped), with ETag/Last-Modified
+    revalidation. If it has never been built, a build is queued and the
+    client is asked to retry.
+    """
+    if name not in FEEDS:
+        raise Http404('Unknown feed')
+    path = feed_path(name)
+    try:
+        stat = os.stat(path)
+    except OSError:
+        from .tasks import build_product_feeds
+        if cache.add('feeds:build-queued', 1, timeout=300):
+            build_product_feeds.delay()
+        response = HttpResponse('Feed is being generated, retry shortly.', status=503, content_type='text/plain')
+        response['Retry-After'] = '60'
+        return response
+
+    response = serve_file(
+        request, path, stat, '"%x-%x"' % (stat.st_mtime_ns, stat.st_size),
+        f'public, max-age={settings.PRODUCT_FEED_CACHE_MAX_AGE}', content_type=FEEDS[name].content_type,
+    )
+    response['Content-Disposition'] = f'attachment; filename="{FEEDS[name].filename}"'
+    return response
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def catalog_changes(request):
+    """
+    Catalog delta sync. Without `since`, returns the cursor to keep: fetch it
+    before downloading /api/products/ in full. With `since=<cursor>`, returns
+    the product, variant, image and category changes after it (paged, see
+    `has_more`), or 410 once the cursor is older than the retention window.
+    """
+    since = request.query_params.get('since')
+    if since is None:
+        return Response({'cursor': current_cursor(), 'has_more': False, 'changes': []})
+    try:
+        since = int(since)
+        limit = int(request.query_params.get('limit', settings.CATALOG_CHANGES_PAGE_SIZE))
+    except ValueError:
+        return Response({"error": "since and limit must be integers"}, status=status.HTTP_400_BAD_REQUEST)
+    if since < 0 or limit < 1:
+        return Response({"error": "since and limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+    try:
+        return Response(changes_since(since, request, limit))
+    except CursorExpired:
+        return Response({
+            "error": "This cursor has expired. Download the catalog again and continue from the new cursor.",
+            "reset": True,
+            "cursor": current_cursor(),
+        }, status=status.HTTP_410_GONE)
+
+
+@api_view(['GET'])
+@permission_classes([IsAdminUser])
+def sales_report(request):
+    """
+    Revenue, orders and units between `start` and `end` (YYYY-MM-DD,
+    inclusive; default the last 30 days), read from the daily rollups.
+    `by=total` (default) gives a daily series; `by=product|variant|category`
+    ranks members by revenue (`limit`, default 50). Optional `currency`.
+    """
+    dimension = request.query_params.get('by', SalesRollup.DIMENSION_TOTAL)
+    if dimension not in dict(SalesRollup.DIMENSION_CHOICES):
+        return Response(
+            {"error": f"by must be one of {', '.join(dict(SalesRollup.DIMENSION_CHOICES))}"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    try:
+        end = date.fromisoformat(request.query_params['end']) if 'end' in request.query_params else timezone.localdate()
+        start = date.fromisoformat(request.query_params['start']) if 'start' in request.query_params else end - timedelta(days=29)
+        limit = min(int(request.query_params.get('limit', 50)), 500)
+    except ValueError:
+        return Response(
+            {"error": "start and end must be YYYY-MM-DD dates and limit an integer"},
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    if start > end or limit < 1:
+        return Response({"error": "start must not be after end, and limit must be positive"}, status=status.HTTP_400_BAD_REQUEST)
+
+    currency = request.query_params.get('currency')
+    return Response({
+        'by': dimension,
+        'start': start,
+        'end': end,
+        'currency': currency,
+        'results': rollup_sales_report(dimension, start, end, currency, limit),
+    })
+
+
+def _leaderboard_rail(request, products):
+    try:
+        limit = min(int(request.query_params.get('limit', settings.LEADERBOARD_RAIL_SIZE)), 50)
+    except ValueError:
+        return Response({"error": "limit must be an integer"}, status=status.HTTP_400_BAD_REQUEST)
+    schedule_daily_refresh()
+    products = products.prefetch_related('variants', 'images', 'category', 'variants__images')[:max(limit, 1)]
+    serializer = ProductListSerializer(products, many=True, context={'request': request})
+    return Response(serializer.data)
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def best_sellers(request):
+    """Published products by units sold in the last 30 days."""
+    return _leaderboard_rail(request, best_seller_products())
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def top_rated(request):
+    """Published products by Bayesian-adjusted rating."""
+    return _leaderboard_rail(request, top_rated_products())
+
+
+@api_view(['GET'])
+@permission_classes([AllowAny])
+def similar_products(request, slug):
+    """Products like this one by categories, gender, colors, sizes and price band."""
+    product = get_object_or_404(Product.objects.only('id', 'is_exclusive'), slug=slug, status='published')
+    if product.is_exclusive and not request.user.is_authenticated:
+        raise PermissionDenied({
+            "detail": "Authentication required to view this product",
+            "code": "authentication_required",
+            "requires_login": True
+        })
+    return Response([related_product(row) for row in similar_to(product, request.user)])
+
@@ -20,6 +20,8 @@ from django.conf import settings
 from django.conf.urls.static import static
 from blog.admin import blog_admin_site
 from rest_framework.authtoken.views import obtain_auth_token
+from apiApp.media import serve_media
+from apiApp.metrics import metrics_view
 from django.views.generic import RedirectView
 from django.urls import re_path
 from rest_framework import permissions
@@ -49,6 +51,9 @@ urlpatterns = [
     # API
     path('api/', include('apiApp.urls')),  # Directly include apiApp.urls
     path('api/token/', obtain_auth_token, name='api_token_auth'),  # Move token endpoint
+
+    # Prometheus scrape endpoint (staff or METRICS_ALLOWED_IPS)
+    path('metrics', metrics_view, name='metrics'),
     
     # Auth
     path('accounts/', include('allauth.urls')),
@@ -70,7 +75,12 @@ urlpatterns = [
          name='schema-redoc'),
 ]
 
-# This is only needed during development
+# Media goes through serve_media so browsers can revalidate and resume downloads
+if settings.SERVE_MEDIA:
+    urlpatterns += [
+        re_path(r'^%s(?P<path>.*)$' % settings.MEDIA_URL.lstrip('/'), serve_media, name='media'),
+    ]
+
+# Static files are served by WhiteNoiseMiddleware; this only helps with DEBUG and no collectstatic
 if settings.DEBUG:
-    urlpatterns += static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
     urlpatterns += static(settings.STATIC_URL, document_root=settings.STATIC_ROOT)
\ No newline at end of file
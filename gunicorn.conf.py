@@ -0,0 +1,25 @@
+# gunicorn.conf.py
+"""
+gunicorn picks this file up from the working directory. It gives the
+Prometheus client a shared directory so /metrics reports the totals of all
+workers, not just the one that happened to answer the scrape.
+"""
+import os
+import shutil
+import tempfile
+
+prometheus_dir = os.environ.setdefault(
+    'PROMETHEUS_MULTIPROC_DIR', os.path.join(tempfile.gettempdir(), 'ecommerce-prometheus')
+)
+
+
+def on_starting(server):
+    # Files left by a previous master would be summed into the new counters
+    shutil.rmtree(prometheus_dir, ignore_errors=True)
+    os.makedirs(prometheus_dir, exist_ok=True)
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+
+    multiprocess.mark_process_dead(worker.pid)